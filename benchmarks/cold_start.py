@@ -0,0 +1,141 @@
+"""
+Cold start benchmark: from process spawn to the first served answer.
+
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --embeddings model --modes blocking,background,off --trials 5
+
+Each trial starts a fresh interpreter that imports the app, runs its
+startup (lifespan) under one prewarm mode, polls /ready and asks one
+question, recording the seconds since spawn at every step. Model stacks
+(torch, Sentence-Transformers, LangChain integrations) that the import
+alone loaded are listed, since they should only load when first needed.
+With the default hashing embeddings only framework and import costs are
+measured; --embeddings model includes loading the real model.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+from benchmarks.run import GROQ_API_KEY, configure_environment, git_commit
+
+HEAVY_MODULES = ("torch", "transformers", "sentence_transformers", "langchain_groq", "langchain_community",
+                 "onnxruntime")
+PHASES = ("interpreter", "import", "startup", "ready", "first_answer")
+
+
+def child(mode: str, work_dir: str, embeddings: str, spawned_at: float) -> dict:
+    """Run one cold start in this (fresh) process and report the elapsed time of each step."""
+    marks = {"interpreter": time.time() - spawned_at}
+    configure_environment(work_dir)
+    os.environ["prewarm"] = mode
+
+    import httpx
+    from src.app import app
+    marks["import"] = time.time() - spawned_at
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    logging.getLogger().setLevel(logging.WARNING)
+
+    from benchmarks.fakes import FakeChatModel, HashingEmbeddings, install_fakes
+    install_fakes(HashingEmbeddings() if embeddings == "hashing" else None,
+                  FakeChatModel(latency_ms=0, tokens_per_second=1e6, answer_tokens=1), GROQ_API_KEY)
+
+    async def serve():
+        async with app.router.lifespan_context(app):
+            marks["startup"] = time.time() - spawned_at
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+                while (await client.get("/ready")).status_code != 200:
+                    await asyncio.sleep(0.01)
+                marks["ready"] = time.time() - spawned_at
+                response = await client.post("/ask/", json={"question": "What are the payment terms?"})
+                response.raise_for_status()
+                marks["first_answer"] = time.time() - spawned_at
+
+    asyncio.run(serve())
+    return {"seconds": {phase: round(marks[phase], 4) for phase in PHASES}, "loaded_by_import": loaded}
+
+
+def prepare(work_dir: str, embeddings: str):
+    """Ingest a small corpus once, so that the measured processes can answer."""
+    configure_environment(work_dir)
+    from benchmarks.corpus import make_corpus
+    from benchmarks.fakes import FakeChatModel, HashingEmbeddings, install_fakes
+    from src import registry
+    from src.preprocessing import ingest_document
+
+    install_fakes(HashingEmbeddings() if embeddings == "hashing" else None, FakeChatModel(), GROQ_API_KEY)
+    try:
+        corpus = make_corpus(os.path.join(work_dir, "corpus"), [10])
+        ingest_document(corpus[10], None, None, document_id="corpus.pdf")
+    finally:
+        registry.shutdown()
+
+
+def run_trial(mode: str, work_dir: str, embeddings: str) -> dict:
+    spawned_at = time.time()
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.cold_start", "--child", mode, work_dir, embeddings, repr(spawned_at)],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_cold_start(args, work_dir: str) -> dict:
+    prepare(work_dir, args.embeddings)
+    results = {}
+    for mode in args.modes:
+        trials = [run_trial(mode, work_dir, args.embeddings) for _ in range(args.trials)]
+        results[mode] = {
+            "median_seconds": {phase: round(statistics.median(trial["seconds"][phase] for trial in trials), 4)
+                               for phase in PHASES},
+            "max_seconds": {phase: round(max(trial["seconds"][phase] for trial in trials), 4) for phase in PHASES},
+            "loaded_by_import": trials[0]["loaded_by_import"],
+        }
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "embeddings": args.embeddings,
+            "trials": args.trials,
+        },
+        "cold_start": results,
+    }
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "--child":
+        mode, work_dir, embeddings, spawned_at = argv[1:5]
+        print(json.dumps(child(mode, work_dir, embeddings, float(spawned_at))))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Cold start to first answer, per prewarm mode.")
+    parser.add_argument("--modes", type=lambda value: [item for item in value.split(",") if item],
+                        default=["blocking", "background", "off"])
+    parser.add_argument("--trials", type=int, default=3)
+    parser.add_argument("--embeddings", choices=("hashing", "model"), default="hashing")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="rag-cold-start-") as work_dir:
+        results = run_cold_start(args, work_dir)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
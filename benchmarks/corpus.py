@@ -0,0 +1,80 @@
+import os
+import random
+
+# Vocabulary of the synthetic documents; identifiers such as "4.2" are added per line
+WORDS = (
+    "agreement party notice term payment invoice delivery warranty liability clause section schedule "
+    "service level report access data security incident review period renewal termination fee rate "
+    "customer supplier contract obligation requirement approval change request record audit policy "
+    "employee manager office system network backup recovery storage document version release update"
+).split()
+
+
+def write_pdf(path: str, pages: list):
+    """Write a minimal one-font PDF with one page per string of pages."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>")
+    font = 3 + 2 * len(pages)
+    for i, text in enumerate(pages):
+        lines = " ".join(f"({line.replace('(', '').replace(')', '')}) '" for line in text.split("\n"))
+        stream = f"BT /F1 11 Tf 50 750 Td 14 TL {lines} ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {4 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    out, offsets = "%PDF-1.4\n", []
+    for i, obj in enumerate(objects):
+        offsets.append(len(out))
+        out += f"{i + 1} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    with open(path, "w", encoding="latin-1") as f:
+        f.write(out)
+
+
+def synthetic_pages(count: int, lines_per_page: int = 40, words_per_line: int = 12, seed: int = 0) -> list:
+    """
+    Deterministic page texts for a synthetic corpus.
+
+    Args:
+        count (int): Number of pages.
+        lines_per_page (int): Lines of text per page.
+        words_per_line (int): Words per line.
+        seed (int): Random seed; the same seed gives the same pages.
+
+    Returns:
+        list: One text per page, lines separated by newlines.
+    """
+    rng = random.Random(seed)
+    pages = []
+    for page in range(count):
+        lines = []
+        for line in range(lines_per_page):
+            words = rng.choices(WORDS, k=words_per_line)
+            words.insert(rng.randrange(words_per_line), f"{page + 1}.{line + 1}")
+            lines.append(" ".join(words))
+        pages.append("\n".join(lines))
+    return pages
+
+
+def make_corpus(directory: str, sizes: list, seed: int = 0) -> dict:
+    """
+    Write one synthetic PDF per corpus size.
+
+    Args:
+        directory (str): Output directory.
+        sizes (list): Page counts.
+        seed (int): Random seed of the texts.
+
+    Returns:
+        dict: Page count -> PDF path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for size in sizes:
+        path = os.path.join(directory, f"corpus_{size}.pdf")
+        write_pdf(path, synthetic_pages(size, seed=seed + size))
+        paths[size] = path
+    return paths
@@ -0,0 +1,97 @@
+"""
+Throughput and parity of the embedding inference backends.
+
+    python -m benchmarks.embedding_backends
+    python -m benchmarks.embedding_backends --backends torch,onnx,onnx-int8 --texts 2000 --threads 4
+
+Embeds the same synthetic chunks (mixed lengths, as produced by the
+splitter) with every backend and reports texts per second, and the cosine
+similarity of each backend's embeddings to those of the PyTorch model.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import numpy as np
+from benchmarks.corpus import synthetic_pages
+from benchmarks.run import git_commit
+
+
+def sample_texts(count: int, seed: int = 0) -> list:
+    """Chunks of 20 to 1000 characters cut from synthetic pages."""
+    rng = random.Random(seed)
+    pages = synthetic_pages(max(1, count // 4), seed=seed)
+    texts = []
+    while len(texts) < count:
+        page = rng.choice(pages)
+        start = rng.randrange(0, max(1, len(page) - 20))
+        texts.append(page[start:start + rng.randint(20, 1000)])
+    return texts
+
+
+def build_backend(backend: str, model_name: str):
+    if backend == "torch":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model_name)
+    from src.onnx_embeddings import onnx_embeddings_from_env
+    return onnx_embeddings_from_env(model_name, quantized=backend == "onnx-int8")
+
+
+def measure(embeddings, texts: list, repeats: int) -> tuple:
+    embeddings.embed_documents(texts[:8])  # first call pays graph and allocator setup
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        vectors = embeddings.embed_documents(texts)
+        best = min(best, time.perf_counter() - started)
+    return np.asarray(vectors, dtype=np.float32), best
+
+
+def main(argv=None) -> int:
+    from src.registry import EMBEDDING_MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Compare embedding inference backends.")
+    parser.add_argument("--backends", type=lambda value: [item for item in value.split(",") if item],
+                        default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--texts", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, help="Sets onnx_intra_op_threads for the ONNX backends.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.threads is not None:
+        os.environ["onnx_intra_op_threads"] = str(args.threads)
+    texts = sample_texts(args.texts, args.seed)
+    results, reference = {}, None
+    for backend in args.backends:
+        vectors, seconds = measure(build_backend(backend, args.model), texts, args.repeats)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        if backend == "torch":
+            reference = vectors
+        result = {"texts_per_second": round(len(texts) / seconds, 1), "seconds": round(seconds, 4)}
+        if reference is not None and backend != "torch":
+            cosine = (vectors * reference).sum(axis=1)
+            result["cosine_to_torch"] = {"min": round(float(cosine.min()), 5), "mean": round(float(cosine.mean()), 5)}
+        results[backend] = result
+
+    print(json.dumps({
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "model": args.model,
+            "texts": len(texts),
+        },
+        "backends": results,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import re
+import time
+import zlib
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic offline stand-in for the embedding model.
+
+    Every word is hashed to a signed dimension and the counts are
+    normalized, so texts sharing words get similar vectors, as with a real
+    model, and the same text always gets the same vector.
+    """
+
+    def __init__(self, size: int = 768):
+        self.size = size
+
+    def _embed(self, text: str) -> list:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            h = zlib.crc32(word.encode("utf-8"))
+            vector[h % self.size] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self._embed(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model answering after a fixed latency at a fixed token rate.
+
+    latency_ms models the time to first token and tokens_per_second the
+    generation speed; the answer is answer_tokens words long.
+    """
+
+    latency_ms: float = 200.0
+    tokens_per_second: float = 500.0
+    answer_tokens: int = 100
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-fake"
+
+    def _tokens(self) -> list:
+        return [f"word{i} " for i in range(self.answer_tokens)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tokens = self._tokens()
+        time.sleep(self.latency_ms / 1000 + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        for token in self._tokens():
+            time.sleep(1 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def install_fakes(embeddings, llm, groq_api_key: str):
+    """
+    Put the stand-ins in the model registry in place of the real models.
+
+    The embeddings go under the default model name, so the micro-batching
+    scheduler and the embedding cache still wrap them as in production.
+
+    Args:
+        embeddings (Embeddings): Stand-in for the Hugging Face model, or None to keep it.
+        llm (BaseChatModel): Stand-in for ChatGroq.
+        groq_api_key (str): The key the answer chain is built with.
+    """
+    from src import registry
+
+    if embeddings is not None:
+        registry._embeddings[registry.EMBEDDING_MODEL_NAME] = embeddings
+    registry._llms[(groq_api_key, registry.LLM_MODEL_NAME)] = llm
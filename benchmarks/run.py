@@ -0,0 +1,286 @@
+"""
+Offline benchmark of ingestion and question answering.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 10,100,500 --concurrency 1,4,16 --output bench.json
+
+Everything runs in-process against the embedded local vector store in a
+temporary directory, with deterministic hashing embeddings (or the real
+model with --embeddings model) and a fake LLM of configurable latency and
+token rate, on synthetic PDFs. The results are written as JSON so that runs
+on different commits can be compared.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+from benchmarks.corpus import WORDS, make_corpus
+from benchmarks.fakes import FakeChatModel, HashingEmbeddings, install_fakes
+
+GROQ_API_KEY = "benchmark"
+
+
+def configure_environment(work_dir: str):
+    """Point every store at the work directory and select the offline backends."""
+    os.environ.update({
+        "vector_store": "local",
+        "local_store_dir": os.path.join(work_dir, "vector_store"),
+        "lexical_index_dir": os.path.join(work_dir, "lexical_index"),
+        "embedding_cache_dir": os.path.join(work_dir, "embedding_cache"),
+        "answer_cache_dir": os.path.join(work_dir, "answer_cache"),
+        # Every question is new; a threshold above 1 never matches a similar one.
+        "answer_cache_threshold": "2",
+        "rerank_enabled": "false",
+        "groq_api": GROQ_API_KEY,
+    })
+
+
+def latency_summary(latencies: list) -> dict:
+    """
+    Percentiles of request latencies.
+
+    Args:
+        latencies (list): Latencies in seconds.
+
+    Returns:
+        dict: p50_ms, p95_ms, p99_ms, mean_ms and max_ms.
+    """
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "mean_ms": round(float(values.mean()), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+def rate(count: int, seconds: float) -> float:
+    return round(count / seconds, 2) if seconds > 0 else None
+
+
+def benchmark_ingestion(pages: int, pdf_path: str, batch_size: int = 256) -> dict:
+    """
+    Time each ingestion stage on one corpus, in its own collection.
+
+    Args:
+        pages (int): Pages of the corpus.
+        pdf_path (str): The corpus PDF.
+        batch_size (int): Points per upsert, as in upload_to_qdrant.
+
+    Returns:
+        dict: Durations and throughputs of loading, splitting, embedding,
+        upserting and lexical indexing.
+    """
+    from src import registry
+    from src.chunk_ids import assign_chunk_ids
+    from src.preprocessing import load_documents, split_documents, upsert_chunks
+
+    started = time.perf_counter()
+    documents = load_documents(pdf_path)
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    chunks = split_documents(documents, chunk_size=2000, chunk_overlap=400)
+    split_seconds = time.perf_counter() - started
+
+    texts = [chunk.page_content for chunk in chunks]
+    embeddings = registry.get_embeddings()
+    started = time.perf_counter()
+    vectors = []
+    for start in range(0, len(texts), 64):
+        vectors.extend(embeddings.embed_documents(texts[start:start + 64]))
+    embed_seconds = time.perf_counter() - started
+
+    collection = f"bench_{pages}"
+    ids = [point_id for _, point_id in assign_chunk_ids(chunks, document_id=os.path.basename(pdf_path))]
+    store = registry.get_store(collection_name=collection)
+    store.ensure()
+    started = time.perf_counter()
+    for start in range(0, len(chunks), batch_size):
+        end = start + batch_size
+        upsert_chunks(store, chunks[start:end], vectors[start:end], ids[start:end])
+    upsert_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    registry.get_lexical_index(collection).add(ids, texts)
+    index_seconds = time.perf_counter() - started
+
+    return {
+        "pages": len(documents),
+        "chunks": len(chunks),
+        "load_s": round(load_seconds, 4),
+        "load_pages_per_s": rate(len(documents), load_seconds),
+        "split_s": round(split_seconds, 4),
+        "split_chunks_per_s": rate(len(chunks), split_seconds),
+        "embed_s": round(embed_seconds, 4),
+        "embeddings_per_s": rate(len(texts), embed_seconds),
+        "upsert_s": round(upsert_seconds, 4),
+        "upserts_per_s": rate(len(chunks), upsert_seconds),
+        "lexical_index_s": round(index_seconds, 4),
+        "lexical_index_chunks_per_s": rate(len(chunks), index_seconds),
+    }
+
+
+def make_questions(pages: int, seed: int = 0):
+    """Endless stream of distinct questions about the corpus."""
+    rng = random.Random(seed)
+    number = 0
+    while True:
+        number += 1
+        first, second = rng.sample(WORDS, 2)
+        yield (f"What does clause {rng.randint(1, pages)}.{rng.randint(1, 40)} say about "
+               f"{first} and {second}? (question {number})")
+
+
+async def benchmark_ask(client, questions, concurrency: int, requests: int) -> dict:
+    """
+    Send requests to /ask/ from concurrency clients in a closed loop.
+
+    Args:
+        client (httpx.AsyncClient): Client bound to the app.
+        questions: Iterator of questions.
+        concurrency (int): Requests in flight at any time.
+        requests (int): Total number of requests.
+
+    Returns:
+        dict: Latency percentiles, throughput and error count.
+    """
+    latencies, errors, remaining = [], 0, [requests]
+
+    async def worker():
+        nonlocal errors
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            response = await client.post("/ask/", json={"question": next(questions)})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": rate(requests, elapsed),
+        **latency_summary(latencies),
+    }
+
+
+async def benchmark_questions(pages: int, levels: list, requests: int) -> list:
+    import httpx
+    from src.app import app
+
+    questions = make_questions(pages)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        # The first requests build the chain and load the indexes.
+        await benchmark_ask(client, questions, 1, 3)
+        return [await benchmark_ask(client, questions, level, requests) for level in levels]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args, work_dir: str) -> dict:
+    configure_environment(work_dir)
+    from src import registry
+    from src.preprocessing import ingest_document
+
+    # Importing the app configures logging at INFO.
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    embeddings = HashingEmbeddings() if args.embeddings == "hashing" else None
+    llm = FakeChatModel(
+        latency_ms=args.llm_latency_ms, tokens_per_second=args.llm_tokens_per_second, answer_tokens=args.answer_tokens
+    )
+    install_fakes(embeddings, llm, GROQ_API_KEY)
+    try:
+        corpus = make_corpus(os.path.join(work_dir, "corpus"), args.sizes, seed=args.seed)
+        ingestion = [benchmark_ingestion(size, corpus[size]) for size in args.sizes]
+
+        # Questions go to the largest corpus, ingested end to end into the default collection.
+        largest = max(args.sizes)
+        started = time.perf_counter()
+        ingest_document(corpus[largest], None, None, chunk_size=2000, chunk_overlap=400, document_id="corpus.pdf")
+        ingest_seconds = time.perf_counter() - started
+        ask = asyncio.run(benchmark_questions(largest, args.concurrency, args.requests))
+    finally:
+        registry.shutdown()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "embeddings": args.embeddings,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_tokens_per_second": args.llm_tokens_per_second,
+            "answer_tokens": args.answer_tokens,
+            "seed": args.seed,
+        },
+        "ingestion": ingestion,
+        "ingest_document": {"pages": largest, "seconds": round(ingest_seconds, 4)},
+        "ask": ask,
+    }
+
+
+def int_list(value: str) -> list:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline ingestion and query benchmark.")
+    parser.add_argument("--sizes", type=int_list, default=[10, 100, 500], help="Corpus sizes in pages.")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16], help="Concurrent /ask/ clients.")
+    parser.add_argument("--requests", type=int, default=100, help="/ask/ requests per concurrency level.")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--answer-tokens", type=int, default=100)
+    parser.add_argument("--embeddings", choices=("hashing", "model"), default="hashing",
+                        help="Deterministic hashing stand-in or the real embedding model.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+    parser.add_argument("--work-dir", help="Keep stores and corpora here instead of a temporary directory.")
+    parser.add_argument("--verbose", action="store_true", help="Keep INFO logging (slows the measured paths).")
+    args = parser.parse_args(argv)
+
+    if args.work_dir:
+        results = run_benchmarks(args, args.work_dir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="rag-benchmark-") as work_dir:
+            results = run_benchmarks(args, work_dir)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Throughput and chunk sizes of the text splitters.
+
+    python -m benchmarks.splitter
+    python -m benchmarks.splitter --pages 5000 --batch 16 --tokenizer sentence-transformers/all-mpnet-base-v2
+
+Splits the same synthetic pages with the character-based recursive splitter
+(the default, 2000/400 characters as ingestion uses it), the recursive
+splitter measuring its pieces in tokens, and the token splitter, in batches
+of pages as the ingestion shards are. Reports pages per second, and the
+token counts of the chunks (with the tokenizer the token splitter uses),
+including the share of chunks longer than the embedding model reads.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from benchmarks.corpus import synthetic_pages
+from benchmarks.run import git_commit
+
+
+def make_pages(count: int, seed: int = 0) -> list:
+    return [Document(page_content=text, metadata={"source": "corpus.pdf", "page": page})
+            for page, text in enumerate(synthetic_pages(count, seed=seed))]
+
+
+def token_counts(tokenizer, texts: list) -> np.ndarray:
+    """Number of tokens of each text."""
+    from src.splitter import TextScan
+    scan = TextScan(texts)
+    return np.diff(np.searchsorted(tokenizer.token_starts(scan), scan.offsets))
+
+
+def measure(splitter, pages: list, batch: int, repeats: int) -> tuple:
+    best, chunks = float("inf"), []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        chunks = [chunk for start in range(0, len(pages), batch)
+                  for chunk in splitter.split_documents(pages[start:start + batch])]
+        best = min(best, time.perf_counter() - started)
+    return chunks, best
+
+
+def main(argv=None) -> int:
+    from src.splitter import TokenTextSplitter, load_tokenizer, splitter_settings
+
+    settings = splitter_settings()
+    parser = argparse.ArgumentParser(description="Compare the text splitters.")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=16, help="Pages per split_documents call (pages per shard).")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Characters per chunk (recursive).")
+    parser.add_argument("--chunk-overlap", type=int, default=400, help="Overlap in characters (recursive).")
+    parser.add_argument("--tokens", type=int, default=settings["tokens"], help="Tokens per chunk.")
+    parser.add_argument("--overlap", type=int, default=settings["overlap"], help="Overlap in tokens.")
+    parser.add_argument("--tokenizer", default=settings["tokenizer"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    tokenizer = load_tokenizer(args.tokenizer)
+
+    splitters = {
+        "recursive": RecursiveCharacterTextSplitter(
+            chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, add_start_index=True),
+        "recursive_tokens": RecursiveCharacterTextSplitter(
+            chunk_size=args.tokens, chunk_overlap=args.overlap, add_start_index=True,
+            length_function=lambda text: int(token_counts(tokenizer, [text])[0])),
+        "token": TokenTextSplitter(args.tokens, args.overlap, tokenizer),
+    }
+    pages = make_pages(args.pages, args.seed)
+    results = {}
+    for name, splitter in splitters.items():
+        chunks, seconds = measure(splitter, pages, args.batch, args.repeats)
+        counts = token_counts(tokenizer, [chunk.page_content for chunk in chunks])
+        results[name] = {
+            "pages_per_second": round(len(pages) / seconds, 1),
+            "seconds": round(seconds, 4),
+            "chunks": len(chunks),
+            "mean_tokens": round(float(counts.mean()), 1),
+            "max_tokens": int(counts.max()),
+            "over_limit": round(float((counts > args.tokens).mean()), 4),
+        }
+    results["speedup"] = round(results["token"]["pages_per_second"] / results["recursive"]["pages_per_second"], 2)
+
+    print(json.dumps({
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "tokenizer": tokenizer.name,
+            "pages": len(pages),
+            "batch": args.batch,
+            "token_limit": args.tokens,
+        },
+        "splitters": results,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 import logging
 import os
+from contextvars import ContextVar
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
 
@@ -11,6 +12,18 @@ os.makedirs(log_dir, exist_ok = True)
 log_file = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 log_file_path =  os.path.join(log_dir, log_file)
 
+# Trace id of the request being served, added to every log line ("-" outside requests)
+trace_id = ContextVar("trace_id", default="-")
+
+
+class TraceIdFilter(logging.Filter):
+    """Attach the current trace id to log records."""
+
+    def filter(self, record):
+        record.trace_id = trace_id.get()
+        return True
+
+
 #create logger
 logger=logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -23,9 +36,11 @@ file_handler.setLevel(logging.INFO)
 console_handler = logging.StreamHandler()
 console_handler.setLevel(logging.INFO)
 
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+formatter = logging.Formatter('%(asctime)s - %(levelname)s - [%(trace_id)s] - %(message)s')
 file_handler.setFormatter(formatter)
 console_handler.setFormatter(formatter)
+file_handler.addFilter(TraceIdFilter())
+console_handler.addFilter(TraceIdFilter())
 
 logger.addHandler(file_handler)
 logger.addHandler(console_handler)
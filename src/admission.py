@@ -0,0 +1,236 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from concurrent.futures import Future
+from dotenv import load_dotenv
+from custom_logger import logger
+from src.telemetry import COALESCED, LLM_ADMITTED, LLM_QUEUE_SECONDS, LLM_SHED
+
+load_dotenv()
+
+
+class OverloadedError(Exception):
+    """Raised when an LLM call is shed instead of queued; the app answers 503."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls.
+
+    While a call for a key is running, later callers with the same key
+    wait for it and receive its result (or its exception) instead of
+    repeating the work.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn unless a call for key is already in flight, then share its outcome.
+
+        Args:
+            key: Hashable identity of the call.
+            fn (callable): The work.
+
+        Returns:
+            The result of the (possibly shared) call.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            COALESCED.inc()
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded FIFO wait queue for LLM calls.
+
+    Up to limit calls run at once and up to max_queue wait for a slot,
+    which is handed over directly when a call finishes. Rather than letting
+    requests pile up until they time out, a call is shed at once (raising
+    OverloadedError) when the queue is full or when its expected wait,
+    estimated from the queue position and the average call duration,
+    already exceeds its deadline; a queued call that reaches its deadline
+    is shed as well. Threads and coroutines share the same queue.
+    """
+
+    def __init__(self, limit: int = 8, max_queue: int = 32, timeout: float = 10.0):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._in_flight = 0
+        self._waiters = deque()  # [granted, wake callable] in arrival order
+        self._service_seconds = None  # moving average of call durations
+        self._lock = threading.Lock()
+
+    def _shed(self, reason: str, message: str):
+        LLM_SHED.inc(reason=reason)
+        logger.warning("LLM call shed (%s): %s", reason, message)
+        raise OverloadedError(message, retry_after=max(1.0, round(self._service_seconds or 1.0)))
+
+    def _try_enter(self, deadline: float, wake):
+        """Take a slot, or register a waiter; returns None when admitted."""
+        with self._lock:
+            if self._in_flight < self.limit and not self._waiters:
+                self._in_flight += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                reason, message = "queue_full", f"{len(self._waiters)} LLM calls are already waiting."
+            else:
+                expected = (len(self._waiters) + 1) / self.limit * (self._service_seconds or 0.0)
+                if time.monotonic() + expected > deadline:
+                    reason, message = "deadline", f"Expected wait of {expected:.1f}s exceeds the deadline."
+                else:
+                    waiter = [False, wake]
+                    self._waiters.append(waiter)
+                    return waiter
+        self._shed(reason, message)
+
+    def _abandon(self, waiter) -> bool:
+        """Leave the queue after a timeout or cancellation; returns True if a slot was granted meanwhile."""
+        with self._lock:
+            if waiter[0]:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def _release(self, seconds: float = None):
+        """Free a slot, or pass it to the next waiter; seconds is the duration of the call that held it, if any."""
+        with self._lock:
+            if seconds is not None:
+                self._service_seconds = seconds if self._service_seconds is None else \
+                    0.8 * self._service_seconds + 0.2 * seconds
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter[0] = True  # the slot passes to the waiter; in_flight is unchanged
+                wake = waiter[1]
+            else:
+                self._in_flight -= 1
+                wake = None
+        if wake is not None:
+            wake()
+
+    def _deadline(self, deadline: float = None) -> float:
+        return deadline if deadline is not None else time.monotonic() + self.timeout
+
+    @contextmanager
+    def admit(self, deadline: float = None):
+        """
+        Hold an LLM slot for the duration of the block.
+
+        Args:
+            deadline (float): time.monotonic() by which the call must have
+                started (default: now + timeout).
+
+        Raises:
+            OverloadedError: If the call is shed.
+        """
+        deadline = self._deadline(deadline)
+        arrived = time.monotonic()
+        event = threading.Event()
+        waiter = self._try_enter(deadline, event.set)
+        if waiter is not None and not event.wait(max(0.0, deadline - time.monotonic())):
+            if not self._abandon(waiter):
+                self._shed("timeout", "Timed out waiting for an LLM slot.")
+        with self._holding(arrived):
+            yield
+
+    @asynccontextmanager
+    async def aadmit(self, deadline: float = None):
+        """
+        Async variant of admit for the event loop.
+
+        Raises:
+            OverloadedError: If the call is shed.
+        """
+        deadline = self._deadline(deadline)
+        arrived = time.monotonic()
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(True))
+
+        waiter = self._try_enter(deadline, wake)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(granted), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    self._shed("timeout", "Timed out waiting for an LLM slot.")
+            except BaseException:
+                # Cancelled while queued (e.g. the client disconnected): leave
+                # the queue, or pass on the slot granted meanwhile.
+                if self._abandon(waiter):
+                    self._release()
+                raise
+        with self._holding(arrived):
+            yield
+
+    @contextmanager
+    def _holding(self, arrived: float):
+        started = time.monotonic()
+        LLM_QUEUE_SECONDS.observe(started - arrived)
+        LLM_ADMITTED.inc()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        """
+        Current load of the controller.
+
+        Returns:
+            dict: limit, in_flight, queued and max_queue.
+        """
+        with self._lock:
+            return {"limit": self.limit, "in_flight": self._in_flight, "queued": len(self._waiters),
+                    "max_queue": self.max_queue}
+
+
+def admission_from_env() -> AdmissionController:
+    """
+    Build the LLM admission controller from environment settings.
+
+    Returns:
+        AdmissionController: Configured with llm_max_concurrency,
+        llm_max_queue and llm_queue_timeout (seconds).
+    """
+    return AdmissionController(
+        limit=int(os.getenv('llm_max_concurrency', "8")),
+        max_queue=int(os.getenv('llm_max_queue', "32")),
+        timeout=float(os.getenv('llm_queue_timeout', "10")),
+    )
+
+
+def coalescing_enabled() -> bool:
+    """Whether identical in-flight questions share one computation (coalesce_questions, default true)."""
+    return os.getenv('coalesce_questions', "true").strip().lower() in ("1", "true", "yes")
@@ -0,0 +1,218 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from filelock import FileLock
+from dotenv import load_dotenv
+from custom_logger import logger
+
+load_dotenv()
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for exact-match lookups.
+
+    Args:
+        question (str): The raw question.
+
+    Returns:
+        str: Lower-cased question with collapsed whitespace.
+    """
+    return " ".join(question.lower().split())
+
+
+class AnswerCache:
+    """
+    Answer cache keyed by question.
+
+    Exact (normalized) matches are served without embedding the question.
+    Otherwise a stored answer is returned when the cosine similarity between
+    the question embedding and a cached question embedding reaches the
+    threshold. Entries expire after ttl_seconds and the least recently used
+    entry is evicted beyond max_entries. The whole cache is invalidated when
+    the underlying collection changes.
+
+    With a generation_path the invalidation counter lives in that file, so
+    an invalidation in one process (FastAPI worker, Streamlit, main.py)
+    empties the cache of every process sharing the file. Without it the
+    counter is process-local.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 1000,
+                 generation_path: str = None):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.generation_path = generation_path
+        self._file_lock = FileLock(generation_path + ".lock") if generation_path else None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # normalized question -> (answer, unit vector or None, created_at, sources)
+        self._generation = 0
+        self._generation = self._read_generation()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _read_generation(self) -> int:
+        """Shared generation counter; 0 when it was never bumped."""
+        if not self.generation_path:
+            return self._generation
+        try:
+            with open(self.generation_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _refresh(self):
+        """Drop the entries if another process invalidated the cache; the caller holds _lock."""
+        generation = self._read_generation()
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped on every invalidation."""
+        with self._lock:
+            self._refresh()
+            return self._generation
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return now - created_at > self.ttl_seconds
+
+    def lookup_exact(self, question: str):
+        """
+        Look up an answer by normalized question text.
+
+        Args:
+            question (str): The question.
+
+        Returns:
+            dict or None: {"answer", "sources"} of the cached entry, or None on a miss.
+        """
+        key = normalize_question(question)
+        now = time.monotonic()
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[2], now):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return {"answer": entry[0], "sources": entry[3]}
+
+    def lookup_similar(self, vector):
+        """
+        Look up the answer of the most similar cached question.
+
+        Args:
+            vector: Embedding of the question.
+
+        Returns:
+            dict or None: {"answer", "sources"} of the cached entry, or None on a miss.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+        query /= norm
+        now = time.monotonic()
+        with self._lock:
+            self._refresh()
+            for key in [key for key, entry in self._entries.items() if self._expired(entry[2], now)]:
+                del self._entries[key]
+            candidates = [(key, entry[1]) for key, entry in self._entries.items() if entry[1] is not None]
+            if candidates:
+                similarities = np.stack([vec for _, vec in candidates]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key = candidates[best][0]
+                    self._entries.move_to_end(key)
+                    self.semantic_hits += 1
+                    entry = self._entries[key]
+                    return {"answer": entry[0], "sources": entry[3]}
+            self.misses += 1
+            return None
+
+    def store(self, question: str, vector, answer: str, generation: int = None, sources: list = None):
+        """
+        Store an answer.
+
+        Args:
+            question (str): The question.
+            vector: Embedding of the question, or None for exact-only entries.
+            answer (str): The generated answer.
+            generation (int): Generation observed before the answer was computed;
+                the answer is dropped if the cache was invalidated meanwhile.
+            sources (list): Metadata of the documents the answer was built from.
+        """
+        unit = None
+        if vector is not None:
+            unit = np.asarray(vector, dtype=np.float32)
+            norm = np.linalg.norm(unit)
+            unit = unit / norm if norm else None
+        with self._lock:
+            self._refresh()
+            if generation is not None and generation != self._generation:
+                return
+            key = normalize_question(question)
+            self._entries[key] = (answer, unit, time.monotonic(), sources or [])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Drop every cached answer, e.g. after the collection changed."""
+        with self._lock:
+            if self.generation_path:
+                with self._file_lock:
+                    generation = self._read_generation() + 1
+                    tmp_path = self.generation_path + ".tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        f.write(str(generation))
+                    os.replace(tmp_path, self.generation_path)
+            else:
+                generation = self._generation + 1
+            self._entries.clear()
+            self._generation = generation
+        logger.info("Answer cache invalidated.")
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters of the cache.
+
+        Returns:
+            dict: Counters and current size.
+        """
+        with self._lock:
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+def answer_cache_from_env(collection_name: str = "rag") -> AnswerCache:
+    """
+    Build an AnswerCache configured from environment variables.
+
+    Args:
+        collection_name (str): Collection whose changes invalidate the cache.
+
+    Returns:
+        AnswerCache: The configured cache.
+    """
+    cache_dir = os.getenv('answer_cache_dir', os.path.join(os.getcwd(), "answer_cache"))
+    os.makedirs(cache_dir, exist_ok=True)
+    return AnswerCache(
+        threshold=float(os.getenv('answer_cache_threshold', "0.95")),
+        ttl_seconds=float(os.getenv('answer_cache_ttl', "3600")),
+        max_entries=int(os.getenv('answer_cache_max_entries', "1000")),
+        generation_path=os.path.join(cache_dir, f"{collection_name}.generation"),
+    )
@@ -1,61 +1,207 @@
 import os
 import sys
+import json
+import time
+import uuid
+import threading
+from typing import Optional
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, File, UploadFile
+from fastapi import FastAPI, HTTPException, File, Form, UploadFile, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from src.preprocessing import load_documents, split_documents, upload_to_qdrant
-from src.retrieve import retrieve_answer_from_docs
+from src.preprocessing import ingest_document
+from src.retrieve import (answer_question, answer_questions, astream_answer_from_docs, retrieval_settings,
+                          list_documents, delete_document)
+from src.reindex import reindex
+from src.projection import parse_projection
+from src.filters import SearchFilter
 from custom_logger import logger
 from exception import CustomException
+from src import registry
+from src.jobs import QueueFullError
+from src.admission import OverloadedError
+from src.vector_store import qdrant_settings_missing
+from src import telemetry
+from contextlib import asynccontextmanager
 import shutil
 
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm the shared model registry as configured by prewarm and release it on shutdown.
+
+    The lexical index of this host is synced with the vector store in the
+    background, so a new replica serves hybrid search like the others.
+    """
+    threading.Thread(target=registry.sync_lexical_index, name="lexical-sync", daemon=True).start()
+    mode = registry.prewarm_mode()
+    if mode == "blocking":
+        await run_in_threadpool(registry.warm_up)
+    elif mode == "background":
+        # Serve at once; /ready reports when the models are loaded
+        threading.Thread(target=registry.warm_up, name="prewarm", daemon=True).start()
+    yield
+    await registry.ashutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Give every request a trace id (X-Request-ID if sent) and record its latency and status."""
+    trace_id = telemetry.new_trace_id(request.headers.get("x-request-id"))
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Trace-ID"] = trace_id
+        return response
+    finally:
+        # Route templates (e.g. /jobs/{job_id}) keep the number of series bounded
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        telemetry.REQUEST_SECONDS.observe(time.perf_counter() - started, route=path)
+        telemetry.REQUESTS.inc(route=path, status=str(status))
+
+def registry_metrics():
+    """Metrics collector exporting the statistics of the shared components."""
+    stats = registry.component_stats()
+    caches, schedulers = stats["answer_cache"], stats["embedding_scheduler"]
+    yield ("rag_answer_cache_entries", "gauge", "Entries in the answer cache.",
+           [({"collection": key}, cache["entries"]) for key, cache in caches.items()])
+    yield ("rag_embedding_batches_total", "counter", "Batches run by the embedding scheduler.",
+           [({"model": key}, scheduler["batches"]) for key, scheduler in schedulers.items()])
+    yield ("rag_embedded_texts_total", "counter", "Texts embedded by the embedding scheduler.",
+           [({"model": key}, scheduler["texts"]) for key, scheduler in schedulers.items()])
+    yield ("rag_embedding_queue_texts", "gauge", "Texts waiting for the embedding scheduler.",
+           [({"model": key}, scheduler["pending"]) for key, scheduler in schedulers.items()])
+    yield ("rag_local_store_points", "gauge", "Points in the local vector store.",
+           [({"collection": key}, points) for key, points in stats["store_points"].items()])
+    admission = stats["llm_admission"]
+    yield ("rag_llm_queue_depth", "gauge", "LLM calls waiting for an admission slot.",
+           [({}, admission["queued"])] if admission else [])
+    yield ("rag_llm_in_flight", "gauge", "LLM calls holding an admission slot.",
+           [({}, admission["in_flight"])] if admission else [])
+
+telemetry.REGISTRY.add_collector(registry_metrics)
+
+class FilterFields(BaseModel):
+    """
+    Optional restriction of the search, pushed down into the vector store.
+
+    Chunks must belong to one of the document_ids (uploaded file names) and
+    sources, lie on one of the pages (numbered from 0, as in the sources of
+    an answer) and have been uploaded within [uploaded_after,
+    uploaded_before); empty fields do not restrict. Times without a time
+    zone are taken as UTC.
+    """
+    document_ids: list[str] = []
+    sources: list[str] = []
+    pages: list[int] = []
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+
+    def search_filter(self):
+        """The SearchFilter of the request, or None when it restricts nothing."""
+        query_filter = SearchFilter(self.document_ids, self.sources, self.pages,
+                                    unix_time(self.uploaded_after), unix_time(self.uploaded_before))
+        return query_filter or None
 
-class QueryRequest(BaseModel):
+def unix_time(moment: datetime):
+    """Unix timestamp of a datetime (UTC when naive), or None."""
+    if moment is None:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+class QueryRequest(FilterFields):
     """Schema for query request validation."""
     question: str
 
-@app.post("/process/")
-async def process_documents(file: UploadFile = File(...)):
+class BatchQueryRequest(FilterFields):
+    """Schema for batch query request validation."""
+    questions: list[str]
+
+OVERLOADED_DETAIL = "The service is overloaded; retry later."
+
+def overloaded(error: OverloadedError):
+    """The 503 response of a shed request, telling the client when to retry."""
+    return HTTPException(status_code=503, detail=OVERLOADED_DETAIL,
+                         headers={"Retry-After": str(int(error.retry_after))})
+
+def save_upload(upload: UploadFile, filename: str):
+    """Copy an uploaded file to disk."""
+    with open(filename, "wb") as buffer:
+        shutil.copyfileobj(upload.file, buffer)
+
+def ingest_uploaded_file(temp_filename: str, qdrant_url: str, qdrant_api_key: str, document_id: str, progress=None):
+    """Background job: ingest a saved upload under its document id."""
+    chunk_size = 2000  # Adjust as necessary
+    chunk_overlap = 400  # Adjust as necessary
+    return ingest_document(temp_filename, qdrant_url, qdrant_api_key, chunk_size, chunk_overlap, progress=progress,
+                           document_id=document_id)
+
+def remove_file(filename: str):
+    """Remove a temporary file if it still exists."""
+    if os.path.exists(filename):
+        os.remove(filename)
+
+@app.post("/process/", status_code=202)
+async def process_documents(file: UploadFile = File(...), document_id: Optional[str] = Form(None)):
     """
     Endpoint to process and upload documents to Qdrant.
     
-    Accepts a PDF file upload, processes it, and uploads the document chunks to Qdrant.
+    Accepts a PDF file upload and queues it for background ingestion. Poll
+    /jobs/{job_id} for progress and the final outcome.
+
+    The document is stored under document_id, by default the file name.
+    Uploading again under an existing id replaces that document: its chunks
+    no longer produced by the new file are deleted. Give distinct ids to
+    different documents sharing a file name (e.g. two report.pdf files).
+
+    Args:
+        file (UploadFile): The PDF.
+        document_id (str): Optional form field identifying the document.
     """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="The uploaded file has no filename.")
+    document_id = (document_id or "").strip() or os.path.basename(file.filename)
+
     try:
         # Load environment variables
         qdrant_url = os.getenv('qdrant_url')
         qdrant_api_key = os.getenv('qdrant_api')
         
-        if not all([qdrant_url, qdrant_api_key]):
+        if qdrant_settings_missing(qdrant_url, qdrant_api_key):
             raise ValueError("One or more environment variables are missing.")
         
-        # Save the uploaded file temporarily
-        temp_filename = f"temp_{file.filename}"
-        with open(temp_filename, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Step 1: Load documents from the uploaded PDF
-        documents = load_documents(temp_filename)
-        
-        # Step 2: Split the documents into chunks
-        chunk_size = 2000  # Adjust as necessary
-        chunk_overlap = 400  # Adjust as necessary
-        chunks = split_documents(documents, chunk_size, chunk_overlap)
-        
-        # Step 3: Upload chunks to Qdrant
-        upload_to_qdrant(chunks, qdrant_url, qdrant_api_key)
+        # Save the uploaded file temporarily, off the event loop
+        temp_filename = f"temp_{uuid.uuid4().hex}_{os.path.basename(file.filename)}"
+        await run_in_threadpool(save_upload, file, temp_filename)
 
-        # Optionally, remove the temporary file after processing
-        os.remove(temp_filename)
+        try:
+            job_id = registry.get_job_queue().submit(
+                f"Ingest {document_id}", ingest_uploaded_file, temp_filename, qdrant_url, qdrant_api_key,
+                document_id, cleanup=lambda: remove_file(temp_filename),
+            )
+        except QueueFullError:
+            os.remove(temp_filename)
+            raise
 
-        return {"message": "Document processed and uploaded to Qdrant successfully."}
+        return {"job_id": job_id, "document_id": document_id, "status_url": f"/jobs/{job_id}",
+                "message": "Document queued for processing."}
 
     except ValueError as ve:
         logger.error("Environment variable error: %s", ve)
         raise HTTPException(status_code=400, detail=str(ve))
+    except QueueFullError as qe:
+        logger.warning("Ingestion queue full: %s", qe)
+        raise HTTPException(status_code=429, detail=str(qe))
     except CustomException as ce:
         logger.error("Custom exception occurred: %s", str(ce))
         raise HTTPException(status_code=500, detail=str(ce))
@@ -63,25 +209,225 @@ async def process_documents(file: UploadFile = File(...)):
         logger.error("An error occurred: %s", str(e))
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Endpoint reporting the progress and outcome of an ingestion job.
+
+    Args:
+        job_id (str): The id returned by /process/.
+
+    Returns:
+        dict: Status, pages parsed, chunks embedded, points upserted and result or error.
+    """
+    job = registry.get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+@app.get("/documents")
+async def get_documents():
+    """
+    Endpoint listing the stored documents.
+
+    Returns:
+        dict: The "documents" (uploaded file names).
+    """
+    try:
+        return {"documents": await run_in_threadpool(list_documents)}
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error("Error listing documents: %s", str(e))
+        raise HTTPException(status_code=500, detail="An error occurred while listing the documents.")
+
+@app.delete("/documents/{document_id:path}")
+async def remove_document(document_id: str):
+    """
+    Endpoint deleting one document, leaving the others searchable.
+
+    Args:
+        document_id (str): The uploaded file name.
+
+    Returns:
+        dict: The document and the number of chunks deleted.
+    """
+    try:
+        deleted = await run_in_threadpool(delete_document, document_id)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except CustomException as ce:
+        raise HTTPException(status_code=500, detail=str(ce))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Document not found.")
+    return {"document_id": document_id, "chunks_deleted": deleted}
+
+@app.post("/reindex", status_code=202)
+async def reindex_collection(projection: str = None):
+    """
+    Endpoint queueing a rebuild of the collection as a new version.
+
+    Questions keep being answered from the live version until the new one
+    is complete and the alias is switched. Poll /jobs/{job_id} for progress.
+
+    Args:
+        projection (str): Projection of the new version, e.g. "pca:256" or
+            "none" (default: vector_projection).
+    """
+    try:
+        parse_projection(projection)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    try:
+        job_id = registry.get_job_queue().submit(f"Reindex {registry.COLLECTION_NAME}", reindex,
+                                                 projection=projection)
+    except QueueFullError as qe:
+        logger.warning("Ingestion queue full: %s", qe)
+        raise HTTPException(status_code=429, detail=str(qe))
+    return {"job_id": job_id, "status_url": f"/jobs/{job_id}", "message": "Reindex queued."}
+
 @app.post("/ask/")
 async def ask_question(query: QueryRequest):
     """
     Endpoint to retrieve the answer from documents based on a query.
 
     Args:
-        query (QueryRequest): The input query containing a question string.
+        query (QueryRequest): The input query containing a question string,
+            and optional filters on the documents, pages and upload times
+            searched.
 
     Returns:
-        dict: A response containing the input question and the generated answer.
+        dict: A response containing the input question, the generated answer
+        and the durations of its stages (e.g. "dense_search_ms") in milliseconds.
     """
     try:
-        answer = retrieve_answer_from_docs(query.question)
-        return {"question": query.question, "answer": answer}
+        # Retrieval and generation block, so keep them off the event loop
+        result = await run_in_threadpool(answer_question, query.question, query.search_filter())
+        return {"question": query.question, "answer": result["answer"], "timings": result["timings"]}
 
+    except OverloadedError as oe:
+        raise overloaded(oe)
     except Exception as e:
         logger.error("Error retrieving answer: %s", str(e))
         raise HTTPException(status_code=500, detail="An error occurred while retrieving the answer.")
 
+@app.post("/ask/batch")
+async def ask_questions(query: BatchQueryRequest):
+    """
+    Endpoint answering a batch of questions in one request.
+
+    Questions are embedded and searched together, and answers are generated
+    with bounded concurrency (ask_batch_concurrency).
+
+    Args:
+        query (BatchQueryRequest): The questions, at most ask_batch_max_questions,
+            and optional filters applied to each of them.
+
+    Returns:
+        dict: "results" in the order of the questions, each with the question
+        and either its answer and stage timings or an error; and the
+        "timings" of the stages shared by the batch.
+    """
+    limit = retrieval_settings()["batch_max_questions"]
+    if len(query.questions) > limit:
+        raise HTTPException(status_code=413, detail=f"A batch holds at most {limit} questions.")
+    try:
+        batch = await run_in_threadpool(answer_questions, query.questions, query_filter=query.search_filter())
+    except Exception as e:
+        logger.error("Error retrieving answers: %s", str(e))
+        raise HTTPException(status_code=500, detail="An error occurred while retrieving the answers.")
+
+    results = []
+    for result in batch["results"]:
+        if result.get("overloaded"):
+            results.append({"question": result["question"], "error": OVERLOADED_DETAIL})
+        elif "error" in result:
+            # Details are logged; clients get the same message as from /ask/
+            results.append({"question": result["question"], "error": "An error occurred while retrieving the answer."})
+        else:
+            results.append({"question": result["question"], "answer": result["answer"], "timings": result["timings"]})
+    return {"results": results, "timings": batch["timings"]}
+
+@app.post("/ask/stream")
+async def ask_question_stream(query: QueryRequest):
+    """
+    Endpoint streaming the answer to a query as Server-Sent Events.
+
+    Emits a "sources" event with the metadata of the retrieved documents,
+    a "timings" event with the retrieval stage durations, then one "token" event per
+    generated token, and finally "done" (or "error" if generation failed
+    midway).
+
+    Args:
+        query (QueryRequest): The input query containing a question string,
+            and optional search filters.
+
+    Returns:
+        StreamingResponse: A text/event-stream response.
+    """
+    events = astream_answer_from_docs(query.question, query.search_filter())
+    # Wait for the first event (retrieval and LLM admission) before starting
+    # the response, so that shed requests get a 503 instead of a stream.
+    try:
+        first = [await events.__anext__()]
+    except OverloadedError as oe:
+        raise overloaded(oe)
+    except StopAsyncIteration:
+        first = []
+    except Exception as e:
+        first = e
+
+    async def event_stream():
+        try:
+            if isinstance(first, Exception):
+                raise first
+            for event, data in first:
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+            async for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.error("Error streaming answer: %s", str(e))
+            yield f"event: error\ndata: {json.dumps({'detail': 'An error occurred while retrieving the answer.'})}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Endpoint exposing latency histograms, counters and component statistics
+    in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The metrics.
+    """
+    return PlainTextResponse(telemetry.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 200 once warm-up has finished (see prewarm), 503 before.
+
+    A failed warm-up answers 200 with "degraded": the models it could not
+    load are loaded on first use.
+
+    Returns:
+        JSONResponse: Warm-up status and duration, and the loaded models.
+    """
+    state = registry.readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+@app.get("/cache/stats")
+async def answer_cache_stats():
+    """
+    Endpoint reporting the hit/miss counters of the answer cache.
+
+    Returns:
+        dict: Exact hits, semantic hits, misses and current number of entries.
+    """
+    return registry.get_answer_cache().stats()
+
 if __name__ == "__main__":
     import uvicorn
     # Run the FastAPI app using Uvicorn
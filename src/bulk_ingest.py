@@ -0,0 +1,223 @@
+"""
+Ingest a directory tree of PDFs into a collection, resuming where a previous run stopped.
+
+    python -m src.bulk_ingest /data/contracts
+    python -m src.bulk_ingest /data/contracts --workers 8 --batch-size 2048 --checkpoint contracts.sqlite3
+
+Files are hashed on a thread pool, parsed and split on a process pool,
+embedded in a background stage and upserted in large batches that span
+files. Progress is recorded per file in a SQLite checkpoint: a file is
+marked done only once all of its points are stored, and a done file whose
+content hash has not changed is skipped without being parsed. Each file is
+its own document, identified by its path relative to the directory, so
+re-ingesting a changed file only embeds its new chunks and deletes the
+stale ones. A throughput summary (JSON) is printed at the end.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from src import registry
+from src.chunk_ids import assign_chunk_ids
+from src.ingest_checkpoint import IngestCheckpoint, file_digest
+from src.parallel_parsing import iter_parse_files_parallel
+from src.pipeline import prefetch
+from src.preprocessing import embed_chunks, upsert_chunks
+from src.telemetry import span, CHUNKS, PAGES
+from custom_logger import logger
+
+
+def discover_pdfs(root: str) -> list:
+    """
+    PDF files under a directory, in a stable order.
+
+    Args:
+        root (str): The directory.
+
+    Returns:
+        list: Paths of the files whose name ends in .pdf (any case).
+    """
+    paths = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        paths.extend(os.path.join(directory, name) for name in sorted(files) if name.lower().endswith(".pdf"))
+    return paths
+
+
+def bulk_ingest(root: str, checkpoint: IngestCheckpoint, collection_name: str = registry.COLLECTION_NAME,
+                chunk_size: int = 2000, chunk_overlap: int = 400, batch_size: int = 1024, workers: int = None,
+                hash_workers: int = 8) -> dict:
+    """
+    Ingest every new or changed PDF under a directory.
+
+    Args:
+        root (str): The directory.
+        checkpoint (IngestCheckpoint): Per-file progress, read to skip and written as files complete.
+        collection_name (str): The target collection.
+        chunk_size (int): Maximum size of each chunk.
+        chunk_overlap (int): Overlap between consecutive chunks.
+        batch_size (int): Number of chunks embedded and upserted per batch.
+        workers (int): Parsing processes (default: CPU count).
+        hash_workers (int): Threads hashing files.
+
+    Returns:
+        dict: Throughput summary of the run.
+    """
+    started = time.perf_counter()
+    root = os.path.abspath(root)
+    paths = discover_pdfs(root)
+    store = registry.get_store(collection_name=collection_name)
+    store.ensure(registry.embedding_dimension())
+    lexical_index = registry.get_lexical_index(collection_name)
+    digests, failed = {}, []
+    totals = {"unchanged": 0, "ingested": 0, "pages": 0, "bytes": 0,
+              "upserted": 0, "skipped": 0, "deleted": 0}
+
+    def fail(path: str, error: Exception):
+        logger.error("Failed to ingest %s: %s", path, error)
+        checkpoint.mark_failed(path, digests.get(path), str(error))
+        failed.append(path)
+
+    def changed_paths(executor):
+        # Hashing reads whole files; the pool keeps several reads in flight.
+        futures = [(path, executor.submit(file_digest, path)) for path in paths]
+        for path, future in futures:
+            try:
+                digests[path] = future.result()
+            except OSError as e:
+                fail(path, e)
+                continue
+            if checkpoint.is_done(path, digests[path]):
+                totals["unchanged"] += 1
+            else:
+                totals["bytes"] += os.path.getsize(path)
+                yield path
+
+    def planned_files(parsed):
+        # Drop chunks already stored under their id; a file's stale points
+        # are deleted once its new points are stored.
+        for path, chunks, pages, error in parsed:
+            if error is not None:
+                fail(path, error)
+                continue
+            try:
+                document_id = os.path.relpath(path, root).replace(os.sep, "/")
+                known = store.document_point_ids(document_id)
+                pairs = list(assign_chunk_ids(chunks, document_id))
+                fresh = [(chunk, point_id) for chunk, point_id in pairs if point_id not in known]
+                unchanged = [point_id for _, point_id in pairs if point_id in known]
+                indexed = lexical_index.present_ids(unchanged) if unchanged else set()
+                backfill = [(chunk, point_id) for chunk, point_id in pairs if point_id in known and point_id not in indexed]
+                lexical_index.add([point_id for _, point_id in backfill], [chunk.page_content for chunk, _ in backfill])
+                stale = sorted(known - {point_id for _, point_id in pairs})
+            except Exception as e:
+                fail(path, e)
+                continue
+            yield {"path": path, "pages": pages, "fresh": fresh, "skipped": len(pairs) - len(fresh), "stale": stale}
+
+    def batches(files):
+        # Upsert batches span files; a file is complete with the batch that
+        # holds its last fresh chunk.
+        buffer, waiting, enqueued, flushed = [], [], 0, 0
+        for record in files:
+            fresh = record.pop("fresh")
+            buffer.extend(fresh)
+            enqueued += len(fresh)
+            record.update(upserted=len(fresh), end=enqueued)
+            waiting.append(record)
+            while len(buffer) >= batch_size:
+                batch, buffer = buffer[:batch_size], buffer[batch_size:]
+                flushed += len(batch)
+                complete = [record for record in waiting if record["end"] <= flushed]
+                waiting = waiting[len(complete):]
+                yield batch, complete
+        yield buffer, waiting
+
+    with ThreadPoolExecutor(max_workers=hash_workers, thread_name_prefix="hash") as executor:
+        parsed = prefetch(iter_parse_files_parallel(changed_paths(executor), chunk_size, chunk_overlap, workers), maxsize=2)
+        embedded = prefetch(
+            ((batch, files, embed_chunks([chunk for chunk, _ in batch]) if batch else [])
+             for batch, files in batches(planned_files(parsed))),
+            maxsize=2,
+        )
+        for batch, files, vectors in embedded:
+            if batch:
+                ids = [point_id for _, point_id in batch]
+                with span("ingest_upsert"):
+                    upsert_chunks(store, [chunk for chunk, _ in batch], vectors, ids)
+                with span("ingest_lexical_index"):
+                    lexical_index.add(ids, [chunk.page_content for chunk, _ in batch])
+                totals["upserted"] += len(batch)
+            for record in files:
+                if record["stale"]:
+                    with span("ingest_delete"):
+                        store.delete(record["stale"])
+                        lexical_index.delete(record["stale"])
+                checkpoint.mark_done(record["path"], digests[record["path"]], record["pages"],
+                                     record["upserted"], record["skipped"], len(record["stale"]))
+                totals["ingested"] += 1
+                totals["pages"] += record["pages"]
+                totals["skipped"] += record["skipped"]
+                totals["deleted"] += len(record["stale"])
+
+    if totals["upserted"] or totals["deleted"]:
+        # Answers cached before this run may now be incomplete
+        registry.get_answer_cache().invalidate()
+    PAGES.inc(totals["pages"])
+    CHUNKS.inc(totals["upserted"], outcome="upserted")
+    CHUNKS.inc(totals["skipped"], outcome="skipped")
+    CHUNKS.inc(totals["deleted"], outcome="deleted")
+
+    seconds = time.perf_counter() - started
+    return {
+        "files_found": len(paths),
+        "files_unchanged": totals["unchanged"],
+        "files_ingested": totals["ingested"],
+        "files_failed": len(failed),
+        "pages": totals["pages"],
+        "chunks_upserted": totals["upserted"],
+        "chunks_skipped": totals["skipped"],
+        "chunks_deleted": totals["deleted"],
+        "megabytes": round(totals["bytes"] / 1e6, 3),
+        "seconds": round(seconds, 3),
+        "files_per_second": round(totals["ingested"] / seconds, 2) if seconds else 0.0,
+        "pages_per_second": round(totals["pages"] / seconds, 2) if seconds else 0.0,
+        "chunks_per_second": round(totals["upserted"] / seconds, 2) if seconds else 0.0,
+        "megabytes_per_second": round(totals["bytes"] / 1e6 / seconds, 3) if seconds else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Ingest a directory tree of PDFs with checkpoint/resume.")
+    parser.add_argument("directory")
+    parser.add_argument("--checkpoint", default=os.getenv('bulk_ingest_checkpoint', "bulk_ingest.sqlite3"),
+                        help="SQLite file recording per-file progress (default: bulk_ingest_checkpoint).")
+    parser.add_argument("--collection", default=registry.COLLECTION_NAME)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--chunk-overlap", type=int, default=400)
+    parser.add_argument("--batch-size", type=int, default=1024, help="Chunks embedded and upserted per batch.")
+    parser.add_argument("--workers", type=int, default=None, help="Parsing processes (default: CPU count).")
+    parser.add_argument("--hash-workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        logger.error(f"{args.directory} is not a directory.")
+        return 1
+    checkpoint = IngestCheckpoint(args.checkpoint)
+    try:
+        summary = bulk_ingest(args.directory, checkpoint, collection_name=args.collection, chunk_size=args.chunk_size,
+                              chunk_overlap=args.chunk_overlap, batch_size=args.batch_size, workers=args.workers,
+                              hash_workers=args.hash_workers)
+        summary.update(collection=args.collection, checkpoint=args.checkpoint, checkpoint_status=checkpoint.status_counts())
+        print(json.dumps(summary, indent=2))
+        # Failed files are recorded and retried by the next run
+        return 1 if summary["files_failed"] else 0
+    finally:
+        checkpoint.close()
+        registry.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import os
+import uuid
+from src.embedding_cache import text_hash
+
+# Fixed namespace so that point ids are stable across processes and releases.
+CHUNK_NAMESPACE = uuid.UUID("6f1c1b52-4d0e-5b8a-9f3e-2a7c0d9e4b61")
+
+
+def chunk_id(document_id: str, content_hash: str, occurrence: int = 0) -> str:
+    """
+    Deterministic point id of a chunk.
+
+    Args:
+        document_id (str): Identifier of the source document.
+        content_hash (str): Hash of the chunk text.
+        occurrence (int): How many identical chunks precede this one in the document.
+
+    Returns:
+        str: A UUID5 string usable as a Qdrant point id.
+    """
+    return str(uuid.uuid5(CHUNK_NAMESPACE, f"{document_id}\x00{content_hash}\x00{occurrence}"))
+
+
+def document_id_of(chunk) -> str:
+    """
+    Document id of a chunk: its "document_id" metadata, else the file name of its source.
+
+    Args:
+        chunk (Document): The chunk.
+
+    Returns:
+        str: The document id.
+    """
+    return chunk.metadata.get("document_id") or os.path.basename(str(chunk.metadata.get("source", "")))
+
+
+def assign_chunk_ids(chunks, document_id: str = None):
+    """
+    Pair chunks with deterministic ids.
+
+    Re-splitting an unchanged document yields the same ids, a changed chunk
+    gets a new id, and repeated identical chunks are told apart by their
+    occurrence index. The document id is recorded in the chunk metadata so
+    that the points of a document can be found again.
+
+    Args:
+        chunks: Iterable of chunks, in document order.
+        document_id (str): Document the chunks belong to; by default derived
+            per chunk by document_id_of.
+
+    Yields:
+        tuple: (chunk, point id).
+    """
+    occurrences = {}
+    for chunk in chunks:
+        doc_id = document_id or document_id_of(chunk)
+        chunk.metadata["document_id"] = doc_id
+        key = (doc_id, text_hash(chunk.page_content))
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        yield chunk, chunk_id(doc_id, key[1], occurrence)
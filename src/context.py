@@ -0,0 +1,169 @@
+import os
+from functools import lru_cache
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from custom_logger import logger
+from src.telemetry import CONTEXT_TOKENS
+
+load_dotenv()
+
+
+@lru_cache(maxsize=None)
+def token_counter(encoding_name: str = "cl100k_base"):
+    """
+    Token counting function for the prompt budget.
+
+    Llama 3 uses a tiktoken-style BPE of similar granularity to cl100k_base,
+    which is used as the estimate. When the encoding cannot be loaded
+    (e.g. offline), about four characters per token is assumed instead.
+
+    Args:
+        encoding_name (str): tiktoken encoding name.
+
+    Returns:
+        callable: Function mapping a text to its token count.
+    """
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(encoding_name)
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.warning("Tokenizer %s unavailable (%s); estimating 4 characters per token", encoding_name, str(e))
+        return lambda text: (len(text) + 3) // 4
+
+
+def _position(doc: Document):
+    metadata = doc.metadata
+    return metadata.get("document_id") or metadata.get("source"), metadata.get("page")
+
+
+def _merge_text(first: str, second: str, min_overlap: int = 20):
+    """Join two chunk texts if the start of second overlaps the end of first; None otherwise."""
+    probe = second[:min_overlap]
+    if len(probe) < min_overlap:
+        return None
+    start = first.find(probe, max(0, len(first) - len(second)))
+    while start != -1:
+        if second.startswith(first[start:]):
+            return first[:start] + second
+        start = first.find(probe, start + 1)
+    if second in first:
+        return first
+    return None
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = text.lower().split()
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def merge_overlapping(docs: list) -> list:
+    """
+    Merge chunks of the same source page that overlap or touch.
+
+    Chunks carrying a "start_index" are merged by position; older chunks
+    without one are merged when the text at the end of one reappears at the
+    start of the other.
+
+    Args:
+        docs (list): Retrieved chunks, best first.
+
+    Returns:
+        list: (passage Document, best rank among its chunks) pairs.
+    """
+    groups = {}
+    for rank, doc in enumerate(docs):
+        groups.setdefault(_position(doc), []).append((rank, doc))
+
+    passages = []
+    for (source, page), members in groups.items():
+        members.sort(key=lambda member: (member[1].metadata.get("start_index", -1), member[0]))
+        current_rank, current = members[0]
+        text, start = current.page_content, current.metadata.get("start_index")
+        for rank, doc in members[1:]:
+            next_start = doc.metadata.get("start_index")
+            merged = None
+            if start is not None and next_start is not None:
+                end = start + len(text)
+                if next_start <= end:
+                    merged = text + doc.page_content[end - next_start:]
+            else:
+                merged = _merge_text(text, doc.page_content) or _merge_text(doc.page_content, text)
+            if merged is not None:
+                text, current_rank = merged, min(current_rank, rank)
+                continue
+            passages.append((Document(page_content=text, metadata=dict(current.metadata)), current_rank))
+            current_rank, current = rank, doc
+            text, start = doc.page_content, next_start
+        passages.append((Document(page_content=text, metadata=dict(current.metadata)), current_rank))
+    return passages
+
+
+def pack_context(docs: list, max_tokens: int, count_tokens=None, duplicate_threshold: float = 0.9) -> list:
+    """
+    Assemble the LLM context from retrieved chunks within a token budget.
+
+    Overlapping and adjacent chunks of the same page are merged, passages
+    that are near-duplicates of a more relevant one (word 3-gram Jaccard
+    similarity at or above duplicate_threshold) are dropped, and passages
+    are admitted in relevance order while they fit the budget; the most
+    relevant passage is truncated if it alone exceeds it. The result is
+    ordered by document position.
+
+    Args:
+        docs (list): Retrieved chunks, best first.
+        max_tokens (int): Token budget of the whole context.
+        count_tokens (callable): Token counting function (default: token_counter()).
+        duplicate_threshold (float): Similarity from which a passage is a duplicate.
+
+    Returns:
+        list: The passages to put in the prompt.
+    """
+    count_tokens = count_tokens or token_counter()
+    passages = merge_overlapping(docs)
+    by_relevance = sorted(range(len(passages)), key=lambda i: passages[i][1])
+
+    kept, kept_shingles, used = [], [], 0
+    for i in by_relevance:
+        passage = passages[i][0]
+        shingles = _shingles(passage.page_content)
+        if any(len(shingles & other) / len(shingles | other) >= duplicate_threshold for other in kept_shingles):
+            continue
+        tokens = count_tokens(passage.page_content)
+        if used + tokens > max_tokens:
+            if kept:
+                continue
+            # Even the best passage is over budget; keep as much of it as fits.
+            text = passage.page_content
+            while tokens > max_tokens and text:
+                text = text[:min(len(text) - 1, len(text) * max_tokens // tokens)]
+                tokens = count_tokens(text)
+            passage = Document(page_content=text, metadata=passage.metadata)
+        kept.append((i, passage))
+        kept_shingles.append(shingles)
+        used += tokens
+
+    # Documents in order of their best passage, then page and offset within each
+    document_rank = {}
+    for passage, rank in passages:
+        source = _position(passage)[0]
+        document_rank[source] = min(rank, document_rank.get(source, rank))
+
+    def document_position(entry):
+        metadata = entry[1].metadata
+        source, page = _position(entry[1])
+        return document_rank[source], page if page is not None else -1, metadata.get("start_index", -1), entry[0]
+
+    logger.info("Packed %d chunks into %d passages (%d tokens)", len(docs), len(kept), used)
+    CONTEXT_TOKENS.observe(used)
+    return [passage for _, passage in sorted(kept, key=document_position)]
+
+
+def context_budget() -> int:
+    """
+    Token budget of the context from the environment.
+
+    Returns:
+        int: Value of context_max_tokens.
+    """
+    return int(os.getenv('context_max_tokens', "6000"))
@@ -0,0 +1,342 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from filelock import FileLock
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from custom_logger import logger
+from exception import CustomException
+from src.telemetry import EMBEDDING_CACHE
+
+load_dotenv()
+
+
+def text_hash(text: str) -> str:
+    """
+    Content hash used as the cache key of a chunk.
+
+    Args:
+        text (str): The chunk text.
+
+    Returns:
+        str: Hex SHA-256 digest of the text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache for one model, safe to share between processes.
+
+    Vectors live in a fixed-capacity memory-mapped matrix. An append-only
+    log maps each content hash to its row (slot): "P <key> <slot>" records a
+    put or a use, "E <key>" an eviction, so replaying the log yields the
+    entries in LRU order. Every operation holds a file lock and first
+    replays whatever other processes appended. When the matrix is full the
+    least recently used slot is reused; its eviction is made durable before
+    the slot is overwritten, so a crash can never leave a key pointing at
+    another key's vector. The log is compacted once it grows well past the
+    number of live entries.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, dtype: str = "float16", max_bytes: int = 512 * 1024 * 1024):
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        self.max_bytes = max_bytes
+        self.directory = os.path.join(cache_dir, model_name.replace("/", "__"))
+        self.log_path = os.path.join(self.directory, "index.log")
+        self.vectors_path = os.path.join(self.directory, f"vectors.{self.dtype.name}")
+        os.makedirs(self.directory, exist_ok=True)
+        self._file_lock = FileLock(os.path.join(self.directory, "cache.lock"))
+        self._lock = threading.Lock()
+        self._clear_state()
+        with self._lock, self._file_lock:
+            self._sync()
+        logger.info("Opened embedding cache for %s with %d entries", self.model_name, len(self._entries))
+
+    def _clear_state(self):
+        self._entries = OrderedDict()  # content hash -> slot, least recently used first
+        self._free_slots = set()
+        self._next_slot = 0
+        self._log_records = 0
+        self._log_inode = None
+        self._log_offset = 0
+        self._vectors = None
+        self.dim = None
+        self.capacity = None
+
+    def _reset_files(self):
+        """Forget the cache and delete its files; the caller holds both locks."""
+        self._clear_state()
+        for path in (self.log_path, self.vectors_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _sync(self):
+        """
+        Bring the in-memory index up to date with the log on disk.
+
+        An unusable cache (orphaned vector file, changed dtype, vector file
+        not matching the logged shape) is reset rather than raised.
+        """
+        try:
+            if not os.path.exists(self.log_path):
+                if self._log_inode is not None or os.path.exists(self.vectors_path):
+                    self._reset_files()
+                return
+            stat = os.stat(self.log_path)
+            if stat.st_ino != self._log_inode or stat.st_size < self._log_offset:
+                # Another process compacted or recreated the cache.
+                self._clear_state()
+                self._log_inode = stat.st_ino
+            if stat.st_size > self._log_offset:
+                self._replay()
+        except Exception as e:
+            logger.warning("Resetting unusable embedding cache at %s: %s", self.directory, str(e))
+            self._reset_files()
+
+    def _replay(self):
+        with open(self.log_path, "rb+") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+            complete = data.rfind(b"\n") + 1
+            if complete < len(data):
+                # A writer crashed mid-record; we hold the lock, so drop the tail.
+                f.truncate(self._log_offset + complete)
+        for line in data[:complete].decode("utf-8").splitlines():
+            kind, _, rest = line.partition(" ")
+            if kind == "H":
+                self._apply_header(json.loads(rest))
+            elif kind == "P":
+                key, slot = rest.split()
+                self._apply_put(key, int(slot))
+            elif kind == "E":
+                self._apply_evict(rest)
+            self._log_records += 1
+        self._log_offset += complete
+
+    def _apply_header(self, header: dict):
+        if header["dtype"] != self.dtype.name:
+            raise ValueError("cache dtype changed")
+        dim, capacity = header["dim"], header["capacity"]
+        expected_size = dim * capacity * self.dtype.itemsize
+        if not os.path.exists(self.vectors_path) or os.path.getsize(self.vectors_path) != expected_size:
+            raise ValueError("vector file does not match the logged shape")
+        self.dim = dim
+        self.capacity = capacity
+        self._vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, dim))
+
+    def _apply_put(self, key: str, slot: int):
+        if slot >= self._next_slot:
+            self._free_slots.update(range(self._next_slot, slot))
+            self._next_slot = slot + 1
+        self._free_slots.discard(slot)
+        self._entries[key] = slot
+        self._entries.move_to_end(key)
+
+    def _apply_evict(self, key: str):
+        slot = self._entries.pop(key, None)
+        if slot is not None:
+            self._free_slots.add(slot)
+
+    def _create(self, dim: int):
+        """Start a fresh cache for vectors of the given dimension."""
+        self._reset_files()
+        capacity = max(1, self.max_bytes // (dim * self.dtype.itemsize))
+        vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode="w+", shape=(capacity, dim))
+        vectors.flush()
+        header = {"model_name": self.model_name, "dtype": self.dtype.name, "dim": dim, "capacity": capacity}
+        self._write_log([f"H {json.dumps(header)}"])
+        self._sync()
+
+    def _write_log(self, records: list):
+        """Atomically replace the log with the given records."""
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(record + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.log_path)
+
+    def _append(self, records: list, durable: bool = False):
+        """Append records to the log and apply them to the in-memory index."""
+        if not records:
+            return
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write("".join(record + "\n" for record in records))
+            f.flush()
+            if durable:
+                os.fsync(f.fileno())
+        self._sync()
+
+    def _maybe_compact(self):
+        if self._log_records <= 2 * len(self._entries) + 10000:
+            return
+        header = {"model_name": self.model_name, "dtype": self.dtype.name, "dim": self.dim, "capacity": self.capacity}
+        records = [f"H {json.dumps(header)}"] + [f"P {key} {slot}" for key, slot in self._entries.items()]
+        self._write_log(records)
+        self._clear_state()
+        self._sync()
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Look up cached vectors.
+
+        Args:
+            keys (list): Content hashes to look up.
+
+        Returns:
+            dict: Mapping of position in keys to the cached vector (float32).
+        """
+        found = {}
+        with self._lock, self._file_lock:
+            self._sync()
+            if self._vectors is None:
+                return found
+            touched = []
+            for position, key in enumerate(keys):
+                slot = self._entries.get(key)
+                if slot is not None:
+                    found[position] = np.array(self._vectors[slot], dtype=np.float32)
+                    touched.append(f"P {key} {slot}")
+            # Record the uses so that LRU order is shared and survives restarts.
+            self._append(touched)
+            self._maybe_compact()
+        return found
+
+    def put_many(self, keys: list, vectors):
+        """
+        Store vectors.
+
+        Args:
+            keys (list): Content hashes, one per vector.
+            vectors: Sequence of vectors of equal dimension.
+        """
+        if not keys:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock:
+            self._sync()
+            if self._vectors is None:
+                self._create(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                logger.warning("Embedding dimension changed for %s; resetting cache", self.model_name)
+                self._create(vectors.shape[1])
+
+            # Plan slot assignments on a copy of the index before touching the file.
+            entries = OrderedDict(self._entries)
+            free_slots = set(self._free_slots)
+            next_slot = self._next_slot
+            planned = OrderedDict()  # key -> (slot, row in vectors)
+            evicted = []
+            for row, key in enumerate(keys):
+                if key in entries:
+                    entries.move_to_end(key)
+                    if key in planned:
+                        planned[key] = (planned[key][0], row)
+                    continue
+                if free_slots:
+                    slot = free_slots.pop()
+                elif next_slot < self.capacity:
+                    slot = next_slot
+                    next_slot += 1
+                else:
+                    victim, slot = entries.popitem(last=False)
+                    if victim in planned:
+                        del planned[victim]
+                    else:
+                        evicted.append(victim)
+                entries[key] = slot
+                planned[key] = (slot, row)
+
+            # Evictions are durable before their slots are overwritten.
+            self._append([f"E {key}" for key in evicted], durable=True)
+            for slot, row in planned.values():
+                self._vectors[slot] = vectors[row]
+            self._vectors.flush()
+            self._append([f"P {key} {slot}" for key, (slot, _) in planned.items()])
+            self._maybe_compact()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves document embeddings from an EmbeddingCache
+    and sends only the cache misses to the wrapped model.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: list) -> list:
+        """
+        Embed documents, reusing cached vectors for previously seen texts.
+
+        Args:
+            texts (list): Texts to embed.
+
+        Returns:
+            list: One embedding (list of floats) per text.
+        """
+        try:
+            keys = [text_hash(text) for text in texts]
+            found = self.cache.get_many(keys)
+            misses = [i for i in range(len(texts)) if i not in found]
+            logger.info("Embedding cache: %d hits, %d misses", len(found), len(misses))
+            EMBEDDING_CACHE.inc(len(found), result="hit")
+            EMBEDDING_CACHE.inc(len(misses), result="miss")
+
+            results = [None] * len(texts)
+            for position, vector in found.items():
+                results[position] = vector.tolist()
+
+            if misses:
+                # Identical texts within one batch are embedded once.
+                unique = list(OrderedDict.fromkeys(keys[i] for i in misses))
+                first_position = {}
+                for i in misses:
+                    first_position.setdefault(keys[i], i)
+                computed = self.embeddings.embed_documents([texts[first_position[key]] for key in unique])
+                by_key = dict(zip(unique, computed))
+                for i in misses:
+                    results[i] = list(by_key[keys[i]])
+                self.cache.put_many(unique, computed)
+            return results
+        except Exception as e:
+            logger.error("Error while embedding documents through the cache: %s", str(e))
+            raise CustomException(e, sys)
+
+    def embed_query(self, text: str) -> list:
+        """
+        Embed a query; queries are not cached here.
+
+        Args:
+            text (str): The query text.
+
+        Returns:
+            list: The query embedding.
+        """
+        return self.embeddings.embed_query(text)
+
+
+def cache_from_env(model_name: str) -> EmbeddingCache:
+    """
+    Build an EmbeddingCache configured from environment variables.
+
+    Args:
+        model_name (str): The embedding model the cache belongs to.
+
+    Returns:
+        EmbeddingCache: The configured cache.
+    """
+    cache_dir = os.getenv('embedding_cache_dir', os.path.join(os.getcwd(), "embedding_cache"))
+    dtype = os.getenv('embedding_cache_dtype', "float16")
+    max_mb = int(os.getenv('embedding_cache_max_mb', "512"))
+    return EmbeddingCache(cache_dir, model_name, dtype=dtype, max_bytes=max_mb * 1024 * 1024)
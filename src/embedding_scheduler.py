@@ -0,0 +1,165 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from custom_logger import logger
+
+load_dotenv()
+
+QUERY = "query"
+INGEST = "ingest"
+
+
+class MicroBatchEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that coalesces concurrent calls into micro-batches.
+
+    Every text is queued on one of two lanes, queries (embed_query) or
+    ingestion (embed_documents), and a single scheduler thread runs one
+    forward pass per micro-batch of at most max_batch_size texts. A batch is
+    dispatched as soon as it is full or max_wait_ms after its oldest text
+    was queued. Query texts are always taken first, so a bulk upload only
+    fills the room left over by interactive questions and cannot starve them.
+
+    Query and document texts share forward passes, which assumes a symmetric
+    model such as all-mpnet-base-v2 where embed_query(t) equals
+    embed_documents([t])[0].
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 64, max_wait_ms: float = 5):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._condition = threading.Condition()
+        self._lanes = {QUERY: deque(), INGEST: deque()}  # lane -> (text, future, queued_at)
+        self._closed = False
+        self.batches = 0
+        self.texts = 0
+        self.query_texts = 0
+        self._worker = threading.Thread(target=self._run, name="embedding-scheduler", daemon=True)
+        self._worker.start()
+
+    def _submit(self, texts: list, lane: str) -> list:
+        futures = [Future() for _ in texts]
+        now = time.monotonic()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The embedding scheduler is closed.")
+            self._lanes[lane].extend((text, future, now) for text, future in zip(texts, futures))
+            self._condition.notify()
+        return futures
+
+    def _pending(self) -> int:
+        return len(self._lanes[QUERY]) + len(self._lanes[INGEST])
+
+    def _oldest(self) -> float:
+        return min(lane[0][2] for lane in self._lanes.values() if lane)
+
+    def _next_batch(self):
+        """Wait for a full or expired batch; None once closed and drained."""
+        with self._condition:
+            while not self._pending():
+                if self._closed:
+                    return None
+                self._condition.wait()
+            while self._pending() < self.max_batch_size and not self._closed:
+                remaining = self._oldest() + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = []
+            for lane in (QUERY, INGEST):
+                while self._lanes[lane] and len(batch) < self.max_batch_size:
+                    text, future, _ = self._lanes[lane].popleft()
+                    batch.append((text, future, lane))
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # Callers may have given up on their futures (e.g. on shutdown).
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                vectors = self.embeddings.embed_documents([text for text, _, _ in batch])
+            except Exception as e:
+                logger.error("Embedding micro-batch of %d texts failed: %s", len(batch), str(e))
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            with self._condition:
+                self.batches += 1
+                self.texts += len(batch)
+                self.query_texts += sum(1 for _, _, lane in batch if lane == QUERY)
+            for (_, future, _), vector in zip(batch, vectors):
+                future.set_result(list(vector))
+
+    def embed_documents(self, texts: list) -> list:
+        """
+        Embed documents on the ingestion lane.
+
+        Args:
+            texts (list): Texts to embed.
+
+        Returns:
+            list: One embedding (list of floats) per text.
+        """
+        return [future.result() for future in self._submit(list(texts), INGEST)]
+
+    def embed_query(self, text: str) -> list:
+        """
+        Embed a query on the priority lane.
+
+        Args:
+            text (str): The query text.
+
+        Returns:
+            list: The query embedding.
+        """
+        return self._submit([text], QUERY)[0].result()
+
+    def stats(self) -> dict:
+        """
+        Batching counters of the scheduler.
+
+        Returns:
+            dict: Batches run, texts embedded, query texts and queued texts.
+        """
+        with self._condition:
+            return {
+                "batches": self.batches,
+                "texts": self.texts,
+                "query_texts": self.query_texts,
+                "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+                "pending": self._pending(),
+            }
+
+    def close(self):
+        """Embed whatever is still queued, then stop the scheduler thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+
+def scheduler_from_env(embeddings: Embeddings) -> MicroBatchEmbeddings:
+    """
+    Wrap an embeddings model in a MicroBatchEmbeddings configured from environment variables.
+
+    Args:
+        embeddings (Embeddings): The model to batch calls for.
+
+    Returns:
+        MicroBatchEmbeddings: The configured scheduler.
+    """
+    return MicroBatchEmbeddings(
+        embeddings,
+        max_batch_size=int(os.getenv('embedding_batch_size', "64")),
+        max_wait_ms=float(os.getenv('embedding_max_wait_ms', "5")),
+    )
@@ -0,0 +1,76 @@
+import json
+from qdrant_client.http import models as rest
+
+# Payload fields searches can be restricted to, and the Qdrant payload index
+# of each. Chunks of one document are searched together, so the document id
+# index is a tenant index: Qdrant co-locates each document's points on disk.
+PAYLOAD_INDEXES = {
+    "metadata.document_id": rest.KeywordIndexParams(type=rest.KeywordIndexType.KEYWORD, is_tenant=True),
+    "metadata.source": rest.PayloadSchemaType.KEYWORD,
+    "metadata.page": rest.PayloadSchemaType.INTEGER,
+    "metadata.ingested_at": rest.PayloadSchemaType.FLOAT,
+}
+
+# SearchFilter attribute -> metadata field, for the fields matched by value
+KEYWORD_FIELDS = {"document_ids": "document_id", "sources": "source", "pages": "page"}
+
+
+class SearchFilter:
+    """
+    Restriction of a search to the chunks of some documents, sources, pages or ingest times.
+
+    Every given condition must hold; a condition listing several values
+    matches any of them. Pages are numbered as stored in the chunk metadata
+    (from 0, as in the sources of an answer) and ingest times are Unix
+    timestamps, ingested_after inclusive and ingested_before exclusive.
+    A filter without conditions matches everything and is falsy.
+    """
+
+    def __init__(self, document_ids=None, sources=None, pages=None, ingested_after: float = None,
+                 ingested_before: float = None):
+        self.document_ids = tuple(sorted(set(document_ids or ())))
+        self.sources = tuple(sorted(set(sources or ())))
+        self.pages = tuple(sorted({int(page) for page in pages or ()}))
+        self.ingested_after = None if ingested_after is None else float(ingested_after)
+        self.ingested_before = None if ingested_before is None else float(ingested_before)
+
+    def keywords(self) -> list:
+        """(metadata field, values) of the conditions matched by value."""
+        return [(field, getattr(self, name)) for name, field in KEYWORD_FIELDS.items() if getattr(self, name)]
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords()) or self.ingested_after is not None or self.ingested_before is not None
+
+    def key(self) -> str:
+        """Canonical string of the conditions, equal for equal filters."""
+        return json.dumps([self.document_ids, self.sources, self.pages, self.ingested_after, self.ingested_before])
+
+    def matches(self, metadata: dict) -> bool:
+        """Whether chunk metadata satisfies the filter."""
+        metadata = metadata or {}
+        for field, values in self.keywords():
+            if metadata.get(field) not in values:
+                return False
+        if self.ingested_after is not None or self.ingested_before is not None:
+            ingested_at = metadata.get("ingested_at")
+            if ingested_at is None:
+                return False
+            if self.ingested_after is not None and ingested_at < self.ingested_after:
+                return False
+            if self.ingested_before is not None and ingested_at >= self.ingested_before:
+                return False
+        return True
+
+    def to_qdrant(self) -> rest.Filter:
+        """The Qdrant filter, evaluated on the payload indexes (see PAYLOAD_INDEXES)."""
+        conditions = [
+            rest.FieldCondition(key=f"metadata.{field}", match=rest.MatchAny(any=list(values)))
+            for field, values in self.keywords()
+        ]
+        if self.ingested_after is not None or self.ingested_before is not None:
+            conditions.append(rest.FieldCondition(
+                key="metadata.ingested_at", range=rest.Range(gte=self.ingested_after, lt=self.ingested_before)))
+        return rest.Filter(must=conditions)
+
+    def __repr__(self):
+        return f"SearchFilter({self.key()})"
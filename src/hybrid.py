@@ -0,0 +1,51 @@
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    Fuse several rankings with reciprocal rank fusion.
+
+    Each item scores sum(1 / (k + rank)) over the rankings it appears in,
+    so items ranked well by several retrievers rise to the top without the
+    retrievers' scores having to be comparable.
+
+    Args:
+        rankings (list): Lists of item ids, best first.
+        k (int): Damping constant; 60 is the usual choice.
+
+    Returns:
+        list: (item id, fused score) pairs, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda entry: entry[1], reverse=True)
+
+
+def fuse_results(dense: list, lexical: list, store, k: int, query_filter=None) -> list:
+    """
+    Combine dense and lexical results into the k best documents.
+
+    Args:
+        dense (list): (Document, score) pairs from the vector store; the
+            documents carry their point id.
+        lexical (list): (point id, score) pairs from the lexical index.
+        store (VectorStore): Store to fetch lexical-only hits from.
+        k (int): Number of documents wanted.
+        query_filter (SearchFilter): The filter the dense search applied;
+            lexical hits outside it are dropped before fusion.
+
+    Returns:
+        list: The fused documents, best first.
+    """
+    documents = {doc.id: doc for doc, _ in dense}
+    if query_filter:
+        # The lexical index knows no payload: check the lexical-only hits on theirs
+        missing = [point_id for point_id, _ in lexical if point_id not in documents]
+        if missing:
+            documents.update((doc.id, doc) for doc in store.get(missing) if query_filter.matches(doc.metadata))
+        lexical = [(point_id, score) for point_id, score in lexical if point_id in documents]
+    fused = reciprocal_rank_fusion([[doc.id for doc, _ in dense], [point_id for point_id, _ in lexical]])[:k]
+    missing = [point_id for point_id, _ in fused if point_id not in documents]
+    if missing:
+        documents.update((doc.id, doc) for doc in store.get(missing))
+    # Points deleted since the lexical index was read are skipped.
+    return [documents[point_id] for point_id, _ in fused if point_id in documents]
@@ -1,11 +1,9 @@
 import os
 import sys
 from dotenv import load_dotenv
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-from sentence_transformers import SentenceTransformer  # Open-source embedding model
 from langchain_community.vectorstores import Qdrant
-from qdrant_client.http.models import BinaryQuantization, BinaryQuantizationConfig
-from qdrant_client import QdrantClient
+from qdrant_client.http.models import BinaryQuantization, BinaryQuantizationConfig, Distance, VectorParams
+from src import registry
 from custom_logger import logger
 from exception import CustomException
 
@@ -30,21 +28,27 @@ def store_documents_to_qdrant(texts: list):
         if not qdrant_end or not qdrant_api_key:
             raise ValueError("Environment variables QDRANT_END and QDRANT_API_KEY must be set.")
 
-        # Initialize the Sentence-Transformers model (open-source)
-        embeddings_model = SentenceTransformer('all-MiniLM-L6-v2')  # You can choose different models from sentence-transformers
-
-        # Configure Qdrant with quantization settings
-        qdrant = Qdrant.from_documents(
-            texts=texts,
-            embedding=embeddings_model.encode,  # Pass the encode function to get embeddings
-            url=qdrant_end,
-            prefer_grpc=True,
-            api_key=qdrant_api_key,
-            collection_name="Lex-v1",
-            quantization_config=BinaryQuantization(
-                binary=BinaryQuantizationConfig(always_ram=True)
+        # Shared Sentence-Transformers model and pooled gRPC client
+        embeddings_model = registry.get_embeddings("sentence-transformers/all-MiniLM-L6-v2")  # You can choose different models from sentence-transformers
+        qdrant_client = registry.get_qdrant_client(qdrant_end, qdrant_api_key, prefer_grpc=True)
+        collection_name = "Lex-v1"
+
+        # Create the collection with quantization settings on first use
+        if not qdrant_client.collection_exists(collection_name):
+            dimension = len(embeddings_model.embed_query("dimension probe"))
+            qdrant_client.create_collection(
+                collection_name=collection_name,
+                vectors_config=VectorParams(size=dimension, distance=Distance.COSINE),
+                quantization_config=BinaryQuantization(
+                    binary=BinaryQuantizationConfig(always_ram=True)
+                ),
             )
-        )
+
+        qdrant = Qdrant(client=qdrant_client, collection_name=collection_name, embeddings=embeddings_model)
+        if texts and hasattr(texts[0], "page_content"):
+            qdrant.add_documents(texts)
+        else:
+            qdrant.add_texts(texts)
 
         logger.info("Documents stored in Qdrant successfully.")
         return qdrant
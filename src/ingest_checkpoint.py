@@ -0,0 +1,132 @@
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Per-file progress of bulk ingestion; a file is "done" only once all of its
+# points are stored, so a crashed run resumes with the files that were not.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    status TEXT NOT NULL,
+    pages INTEGER NOT NULL DEFAULT 0,
+    upserted INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def file_digest(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Content hash of a file, read in blocks.
+
+    Args:
+        file_path (str): Path to the file.
+        block_size (int): Bytes read at a time.
+
+    Returns:
+        str: Hex SHA-256 digest of the file.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestCheckpoint:
+    """
+    SQLite record of which files a bulk ingestion has stored, and at which content hash.
+
+    Every update is committed on its own, so the record survives a crash
+    of the ingesting process. Safe to share between the threads of one
+    process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(SCHEMA)
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def is_done(self, file_path: str, digest: str) -> bool:
+        """
+        Whether a file was fully ingested with this exact content.
+
+        Args:
+            file_path (str): Path of the file, as recorded.
+            digest (str): Current content hash of the file.
+
+        Returns:
+            bool: True if the file can be skipped.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT digest, status FROM files WHERE path = ?", (file_path,)).fetchone()
+        return row is not None and row == (digest, "done")
+
+    def _record(self, file_path: str, digest: str, status: str, pages: int = 0, upserted: int = 0,
+                skipped: int = 0, deleted: int = 0, error: str = None):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO files (path, digest, status, pages, upserted, skipped, deleted, error, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_path, digest, status, pages, upserted, skipped, deleted, error, time.time()),
+            )
+            self._connection.commit()
+
+    def mark_done(self, file_path: str, digest: str, pages: int, upserted: int, skipped: int, deleted: int):
+        """
+        Record a file whose points are all stored.
+
+        Args:
+            file_path (str): Path of the file.
+            digest (str): Content hash the file was ingested at.
+            pages (int): Pages parsed.
+            upserted (int): Points upserted.
+            skipped (int): Chunks already stored and left alone.
+            deleted (int): Stale points of an earlier version deleted.
+        """
+        self._record(file_path, digest, "done", pages, upserted, skipped, deleted)
+
+    def mark_failed(self, file_path: str, digest: str, error: str):
+        """
+        Record a file that could not be ingested; the next run retries it.
+
+        Args:
+            file_path (str): Path of the file.
+            digest (str): Content hash of the file, if it could be read.
+            error (str): The error message.
+        """
+        self._record(file_path, digest or "", "failed", error=error)
+
+    def status_counts(self) -> dict:
+        """
+        Number of recorded files per status.
+
+        Returns:
+            dict: Status -> number of files.
+        """
+        with self._lock:
+            return dict(self._connection.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall())
+
+    def failures(self) -> list:
+        """
+        Files whose last attempt failed.
+
+        Returns:
+            list: (path, error) tuples.
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT path, error FROM files WHERE status = 'failed' ORDER BY path").fetchall()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
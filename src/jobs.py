@@ -0,0 +1,226 @@
+import os
+import sys
+import time
+import uuid
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from custom_logger import logger
+from exception import CustomException
+
+load_dotenv()
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue cannot accept another job."""
+
+
+class Job:
+    """
+    State and progress counters of one background ingestion job.
+    """
+
+    def __init__(self, job_id: str, description: str):
+        self.id = job_id
+        self.description = description
+        self.status = "queued"
+        self.pages_parsed = 0
+        self.chunks_embedded = 0
+        self.points_upserted = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update(self, pages_parsed: int = 0, chunks_embedded: int = 0, points_upserted: int = 0):
+        """
+        Add to the progress counters; used as the progress callback of ingestion.
+
+        Args:
+            pages_parsed (int): Newly parsed pages.
+            chunks_embedded (int): Newly embedded chunks.
+            points_upserted (int): Newly upserted points.
+        """
+        with self._lock:
+            self.pages_parsed += pages_parsed
+            self.chunks_embedded += chunks_embedded
+            self.points_upserted += points_upserted
+
+    def start(self):
+        """Mark the job as running."""
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+
+    def finish(self, result=None, error: str = None):
+        """
+        Mark the job as finished.
+
+        Args:
+            result: The return value of the job on success.
+            error (str): The error message on failure.
+        """
+        with self._lock:
+            self.result = result
+            self.error = error
+            self.status = "failed" if error is not None else "succeeded"
+            self.finished_at = time.time()
+
+    def to_dict(self) -> dict:
+        """
+        Snapshot of the job for the status endpoint.
+
+        Returns:
+            dict: Status, progress counters, timestamps and outcome.
+        """
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "description": self.description,
+                "status": self.status,
+                "pages_parsed": self.pages_parsed,
+                "chunks_embedded": self.chunks_embedded,
+                "points_upserted": self.points_upserted,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+class JobQueue:
+    """
+    Bounded worker pool for ingestion jobs.
+
+    At most max_workers jobs run at a time and at most max_pending wait
+    behind them; further submissions raise QueueFullError. The last
+    max_finished finished jobs are kept for status polling.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 16, max_finished: int = 1000):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._futures = {}  # job id -> (future, cleanup) while queued or running
+
+    def submit(self, description: str, func, *args, cleanup=None, **kwargs) -> str:
+        """
+        Queue func(*args, progress=job, **kwargs) for background execution.
+
+        Args:
+            description (str): Human-readable description of the job.
+            func (callable): The work to run; receives the Job as `progress`.
+            cleanup (callable): Optional zero-argument callable run once the job
+                has finished, failed or been cancelled (e.g. removing its upload).
+
+        Returns:
+            str: The job id.
+
+        Raises:
+            QueueFullError: If the queue is at capacity.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("The ingestion queue is full. Retry later.")
+        job = Job(uuid.uuid4().hex, description)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+            try:
+                # Registered under the lock, so _run cannot unregister it first.
+                # The job keeps the trace id of the request that queued it.
+                context = contextvars.copy_context()
+                future = self._executor.submit(context.run, self._run, job, func, args, kwargs, cleanup)
+                self._futures[job.id] = (future, cleanup)
+            except Exception:
+                del self._jobs[job.id]
+                self._slots.release()
+                raise
+        logger.info("Queued job %s: %s", job.id, description)
+        return job.id
+
+    def _run(self, job: Job, func, args, kwargs, cleanup):
+        job.start()
+        try:
+            job.finish(result=func(*args, progress=job, **kwargs))
+            logger.info("Job %s succeeded", job.id)
+        except Exception as e:
+            job.finish(error=str(e))
+            logger.error("Job %s failed: %s", job.id, str(e))
+        finally:
+            with self._lock:
+                self._futures.pop(job.id, None)
+            self._run_cleanup(job, cleanup)
+            self._slots.release()
+
+    def _run_cleanup(self, job: Job, cleanup):
+        if cleanup is None:
+            return
+        try:
+            cleanup()
+        except Exception as e:
+            logger.warning("Cleanup of job %s failed: %s", job.id, str(e))
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str):
+        """
+        Look up a job.
+
+        Args:
+            job_id (str): The job id returned by submit.
+
+        Returns:
+            dict or None: The job snapshot, or None if unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def shutdown(self):
+        """
+        Stop accepting jobs, cancel the queued ones and wait for running ones.
+
+        Cancelled jobs are marked as failed and their cleanup still runs, so
+        no temporary upload is left behind.
+        """
+        with self._lock:
+            pending = list(self._futures.items())
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for job_id, (future, cleanup) in pending:
+            if future.cancelled():
+                with self._lock:
+                    self._futures.pop(job_id, None)
+                    job = self._jobs[job_id]
+                job.finish(error="Cancelled: the server shut down before the job started.")
+                self._run_cleanup(job, cleanup)
+                self._slots.release()
+        self._executor.shutdown(wait=True)
+
+
+def job_queue_from_env() -> JobQueue:
+    """
+    Build a JobQueue configured from environment variables.
+
+    Returns:
+        JobQueue: The configured queue.
+    """
+    try:
+        return JobQueue(
+            max_workers=int(os.getenv('ingest_workers', "2")),
+            max_pending=int(os.getenv('ingest_queue_size', "16")),
+        )
+    except ValueError as ve:
+        logger.error("Invalid ingestion queue configuration: %s", ve)
+        raise CustomException(ve, sys)
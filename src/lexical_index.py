@@ -0,0 +1,308 @@
+import os
+import re
+import json
+import math
+import shutil
+import threading
+from array import array
+from collections import Counter
+import numpy as np
+from filelock import FileLock
+from dotenv import load_dotenv
+from custom_logger import logger
+
+load_dotenv()
+
+# Words and identifiers such as "4.2.1", "ab-123" or "v2_final"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._/-][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list:
+    """
+    Split text into lexical terms.
+
+    Compound identifiers are kept whole and also contribute their parts,
+    so "clause 4.2" matches both "4.2" and "4".
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        list: The terms, in order, with repetitions.
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        parts = re.split(r"[._/-]", token)
+        if len(parts) > 1:
+            terms.extend(part for part in parts if part)
+    return terms
+
+
+class BM25Index:
+    """
+    Incrementally maintained BM25 inverted index over chunk texts.
+
+    Each term maps to two compact posting arrays, document numbers (int32)
+    and term frequencies (uint16), which are appended to as chunks are
+    added; deleted chunks are only masked out until the index is compacted.
+    Queries score the postings of their terms with vectorized NumPy
+    operations. The index persists as an append-only JSON-lines log of
+    per-chunk term counts, shared between processes through a file lock
+    and log replay like the embedding cache.
+
+    The log lives on local disk, so the index is shared by the processes
+    of one host only, whereas the vector store may be shared by several
+    hosts. The vector store is the source of truth: a host whose index is
+    missing or behind (a new replica, or chunks uploaded through another
+    host) catches up with sync_lexical_index, which the API and the
+    Streamlit app run at startup.
+    """
+
+    def __init__(self, directory: str, k1: float = 1.2, b: float = 0.75):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+        self.log_path = os.path.join(directory, "postings.jsonl")
+        os.makedirs(directory, exist_ok=True)
+        self._file_lock = FileLock(os.path.join(directory, "index.lock"))
+        self._lock = threading.RLock()
+        self._clear_state()
+        with self._lock, self._file_lock:
+            self._sync()
+
+    def _clear_state(self):
+        self._log_inode = None
+        self._log_offset = 0
+        self._numbers = {}  # point id -> document number
+        self._ids = []  # document number -> point id
+        self._lengths = array("i")
+        self._alive = bytearray()
+        self._postings = {}  # term -> (array("i") document numbers, array("H") frequencies)
+        self._total_length = 0
+
+    def _sync(self):
+        """Bring the in-memory index up to date with the log; the caller holds both locks."""
+        if not os.path.exists(self.log_path):
+            if self._log_inode is not None:
+                self._clear_state()
+            return
+        stat = os.stat(self.log_path)
+        if stat.st_ino != self._log_inode or stat.st_size < self._log_offset:
+            # Another process compacted or recreated the index.
+            self._clear_state()
+            self._log_inode = stat.st_ino
+        if stat.st_size > self._log_offset:
+            with open(self.log_path, "rb+") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+                complete = data.rfind(b"\n") + 1
+                if complete < len(data):
+                    # A writer crashed mid-record; we hold the lock, so drop the tail.
+                    f.truncate(self._log_offset + complete)
+            for line in data[:complete].splitlines():
+                record = json.loads(line)
+                if record["op"] == "add":
+                    self._apply_add(record["id"], record["terms"])
+                else:
+                    self._apply_delete(record["id"])
+            self._log_offset += complete
+
+    def _apply_add(self, point_id: str, terms: dict):
+        self._apply_delete(point_id)
+        number = len(self._ids)
+        self._numbers[point_id] = number
+        self._ids.append(point_id)
+        length = sum(terms.values())
+        self._lengths.append(length)
+        self._alive.append(1)
+        self._total_length += length
+        for term, count in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("i"), array("H"))
+            postings[0].append(number)
+            postings[1].append(min(count, 65535))
+
+    def _apply_delete(self, point_id: str):
+        number = self._numbers.pop(point_id, None)
+        if number is not None:
+            self._alive[number] = 0
+            self._total_length -= self._lengths[number]
+
+    def _append(self, records: list):
+        if not records:
+            return
+        with open(self.log_path, "ab") as f:
+            f.write(b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in records))
+            f.flush()
+        self._sync()
+
+    def _maybe_compact(self):
+        dead = len(self._ids) - len(self._numbers)
+        if dead <= 1000 or dead <= len(self._numbers):
+            return
+        documents = {}
+        for term, (numbers, counts) in self._postings.items():
+            for number, count in zip(numbers, counts):
+                if self._alive[number]:
+                    documents.setdefault(number, {})[term] = count
+        records = [{"op": "add", "id": self._ids[n], "terms": documents.get(n, {})} for n in sorted(self._numbers.values())]
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.log_path)
+        self._clear_state()
+        self._sync()
+        logger.info("Compacted lexical index %s to %d chunks", self.directory, len(self._numbers))
+
+    def add(self, ids: list, texts: list):
+        """
+        Index chunk texts under their point ids, replacing earlier versions.
+
+        Args:
+            ids (list): Point ids.
+            texts (list): One text per id.
+        """
+        records = [
+            {"op": "add", "id": str(point_id), "terms": dict(Counter(tokenize(text)))}
+            for point_id, text in zip(ids, texts)
+        ]
+        with self._lock, self._file_lock:
+            self._sync()
+            self._append(records)
+
+    def delete(self, ids: list):
+        """
+        Remove chunks from the index.
+
+        Args:
+            ids (list): Point ids.
+        """
+        with self._lock, self._file_lock:
+            self._sync()
+            self._append([{"op": "del", "id": str(point_id)} for point_id in ids if str(point_id) in self._numbers])
+            self._maybe_compact()
+
+    def ids(self) -> set:
+        """The ids of every indexed chunk."""
+        with self._lock, self._file_lock:
+            self._sync()
+            return set(self._numbers)
+
+    def present_ids(self, ids: list) -> set:
+        """
+        The subset of ids that are indexed.
+
+        Args:
+            ids (list): Candidate point ids.
+
+        Returns:
+            set: The indexed ids.
+        """
+        with self._lock, self._file_lock:
+            self._sync()
+            return {str(point_id) for point_id in ids if str(point_id) in self._numbers}
+
+    def search(self, query: str, k: int) -> list:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query (str): The query text.
+            k (int): Maximum number of results.
+
+        Returns:
+            list: (point id, score) pairs, best first; only chunks sharing a term with the query.
+        """
+        terms = set(tokenize(query))
+        with self._lock, self._file_lock:
+            self._sync()
+            live = len(self._numbers)
+            if not live or not terms:
+                return []
+            alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+            lengths = np.frombuffer(self._lengths, dtype=np.int32)
+            average_length = self._total_length / live
+            scores = np.zeros(len(self._ids), dtype=np.float64)
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                numbers = np.frombuffer(postings[0], dtype=np.int32)
+                counts = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float64)
+                keep = alive[numbers]
+                numbers, counts = numbers[keep], counts[keep]
+                if not len(numbers):
+                    continue
+                idf = math.log(1 + (live - len(numbers) + 0.5) / (len(numbers) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[numbers] / average_length)
+                scores[numbers] += idf * counts * (self.k1 + 1) / (counts + norm)
+            matched = np.flatnonzero(scores > 0)
+            if not len(matched):
+                return []
+            k = min(k, len(matched))
+            top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[number], float(scores[number])) for number in top]
+
+    def drop(self):
+        """Delete the whole index."""
+        with self._lock, self._file_lock:
+            for name in os.listdir(self.directory):
+                if name != "index.lock":
+                    path = os.path.join(self.directory, name)
+                    if os.path.isdir(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.remove(path)
+            self._clear_state()
+
+    def __len__(self):
+        return len(self._numbers)
+
+
+def lexical_index_from_env(collection_name: str) -> BM25Index:
+    """
+    Build the BM25Index of a collection configured from environment variables.
+
+    Args:
+        collection_name (str): The collection; each has its own directory.
+
+    Returns:
+        BM25Index: The configured index.
+    """
+    base_dir = os.getenv('lexical_index_dir', os.path.join(os.getcwd(), "lexical_index"))
+    return BM25Index(os.path.join(base_dir, collection_name))
+
+
+def sync_lexical_index(index: BM25Index, store, batch_size: int = 256) -> dict:
+    """
+    Bring a lexical index in line with the chunks of its vector store.
+
+    Chunks stored but not indexed are fetched and indexed, and indexed
+    chunks no longer stored are removed. Chunks are written to the store
+    before the index, so chunks indexed by concurrent uploads are never
+    mistaken for deleted ones.
+
+    Args:
+        index (BM25Index): The lexical index.
+        store (VectorStore): The vector store of the same collection.
+        batch_size (int): Chunks fetched per request.
+
+    Returns:
+        dict: Number of chunks "added" and "deleted".
+    """
+    indexed = index.ids()
+    stored = store.point_ids()
+    missing = sorted(stored - indexed)
+    for start in range(0, len(missing), batch_size):
+        documents = store.get(missing[start:start + batch_size])
+        index.add([document.id for document in documents], [document.page_content for document in documents])
+    stale = sorted(indexed - stored)
+    index.delete(stale)
+    if missing or stale:
+        logger.info("Synced lexical index %s: %d chunks added, %d deleted", index.directory, len(missing), len(stale))
+    return {"added": len(missing), "deleted": len(stale)}
@@ -0,0 +1,671 @@
+import os
+import json
+import heapq
+import shutil
+import threading
+import numpy as np
+from filelock import FileLock
+from dotenv import load_dotenv
+from custom_logger import logger
+from src.vector_store import VectorStore, payload_document
+from src.filters import KEYWORD_FIELDS
+from src.quantization import make_codes, quantization_settings, rescored_top_k
+
+load_dotenv()
+
+
+class GraphIndex:
+    """
+    Navigable small-world graph over the rows of a vector matrix.
+
+    Each row keeps up to `degree` links to its most similar rows. Rows are
+    inserted in order by a best-first search for their neighbours, and
+    queries run the same search with a beam of `ef` candidates from a few
+    fixed entry points. Search cost grows roughly with log(n) instead of n,
+    at the price of occasionally missing a true neighbour.
+    """
+
+    def __init__(self, degree: int = 16, ef_construction: int = 64, neighbors=None):
+        self.degree = degree
+        self.ef_construction = ef_construction
+        self.neighbors = neighbors if neighbors is not None else np.full((0, degree), -1, dtype=np.int32)
+
+    @property
+    def size(self) -> int:
+        return len(self.neighbors)
+
+    def _beam_search(self, vectors, query, ef: int, size: int):
+        """Best-first search over rows [0, size); returns (rows, similarities), most similar first."""
+        entries = np.unique(np.linspace(0, size - 1, num=min(size, 8), dtype=np.int64))
+        similarities = vectors[entries] @ query
+        visited = np.zeros(size, dtype=bool)
+        visited[entries] = True
+        candidates = [(-s, row) for s, row in zip(similarities.tolist(), entries.tolist())]
+        heapq.heapify(candidates)
+        results = [(-s, row) for s, row in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+        while candidates:
+            negative, row = heapq.heappop(candidates)
+            if len(results) >= ef and -negative < results[0][0]:
+                break
+            links = self.neighbors[row]
+            links = links[links >= 0]
+            links = links[~visited[links]]
+            if not len(links):
+                continue
+            visited[links] = True
+            for n, s in zip(links.tolist(), (vectors[links] @ query).tolist()):
+                if len(results) < ef or s > results[0][0]:
+                    heapq.heappush(candidates, (-s, n))
+                    heapq.heappush(results, (s, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        ordered = sorted(results, reverse=True)
+        return np.array([row for _, row in ordered], dtype=np.int64), np.array([s for s, _ in ordered])
+
+    def _link(self, vectors, row: int, new: int, similarity: float):
+        links = self.neighbors[row]
+        free = np.flatnonzero(links < 0)
+        if len(free):
+            links[free[0]] = new
+            return
+        # Replace the least similar link if the new row is closer.
+        current = vectors[links] @ vectors[row]
+        worst = int(np.argmin(current))
+        if similarity > current[worst]:
+            links[worst] = new
+
+    def add(self, vectors, count: int):
+        """
+        Insert rows [size, count) of the matrix.
+
+        Args:
+            vectors: The (normalized) vector matrix.
+            count (int): Number of rows the graph should cover afterwards.
+        """
+        start = self.size
+        if count <= start:
+            return
+        grown = np.full((count, self.degree), -1, dtype=np.int32)
+        grown[:start] = self.neighbors
+        self.neighbors = grown
+        for row in range(start, count):
+            if row == 0:
+                continue
+            nearest, similarities = self._beam_search(vectors, vectors[row], self.ef_construction, row)
+            nearest, similarities = nearest[:self.degree], similarities[:self.degree]
+            self.neighbors[row, :len(nearest)] = nearest
+            for n, s in zip(nearest, similarities):
+                self._link(vectors, int(n), row, s)
+
+    def search(self, vectors, query, k: int, ef: int = 64):
+        """
+        Approximate nearest rows of a query.
+
+        Args:
+            vectors: The (normalized) vector matrix.
+            query: The normalized query vector.
+            k (int): Number of rows wanted.
+            ef (int): Beam width; larger is slower and more accurate.
+
+        Returns:
+            tuple: (rows, similarities), most similar first, at most max(k, ef) rows.
+        """
+        if self.size == 0:
+            return np.array([], dtype=np.int64), np.array([])
+        return self._beam_search(vectors, query, max(k, ef), self.size)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process VectorStore persisted in a directory.
+
+    Normalized float32 vectors are appended to a memory-mapped matrix file.
+    An append-only JSON-lines log is the side store: a header naming the
+    matrix file and its dimension, one "put" record per point (id, row and
+    payload) and "del" records. Only the byte offsets of payloads are kept
+    in memory; payloads are read back for search results only. Replacing a
+    point appends a new row and leaves the old one dead, and the files are
+    compacted once dead rows outnumber live ones.
+
+    Search is an exact matrix product with argpartition top-k, or, from
+    graph_threshold live points on, an approximate GraphIndex search; the
+    graph is built and extended by a background thread after upserts,
+    rows it does not cover yet are searched exactly, and it is persisted
+    next to the matrix. Below the graph threshold, a
+    quantization mode ("int8" or "binary") keeps compact codes of the rows
+    in RAM, scans those instead of the float32 matrix and rescores the
+    oversampled candidates from the memory-mapped matrix, so the matrix
+    itself need not stay resident. Like the embedding cache, every
+    operation holds a file lock and first replays whatever other processes
+    appended, so several processes can share one directory.
+
+    The filterable payload fields (document id, source, page and ingest
+    time) are indexed in memory as the log is replayed. A filtered search
+    reads and scores only the matching rows, unless they are numerous enough
+    for the graph, which is then searched with a beam widened by the share
+    of rows the filter keeps.
+    """
+
+    def __init__(self, directory: str, graph_threshold: int = 50000, graph_degree: int = 16, graph_ef: int = 64,
+                 quantization: str = "none", oversampling: float = 3.0):
+        self.directory = directory
+        self.graph_threshold = graph_threshold
+        self.graph_degree = graph_degree
+        self.graph_ef = graph_ef
+        self.quantization = quantization
+        self.oversampling = oversampling
+        self.log_path = os.path.join(directory, "log.jsonl")
+        os.makedirs(directory, exist_ok=True)
+        self._file_lock = FileLock(os.path.join(directory, "store.lock"))
+        self._lock = threading.RLock()
+        self._graph_thread = None
+        self._closing = threading.Event()
+        self._clear_state()
+        with self._lock, self._file_lock:
+            self._sync()
+
+    def _clear_state(self):
+        self._log_inode = None
+        self._log_offset = 0
+        self.dim = None
+        self.vectors_name = None
+        self._vectors = None
+        self._rows = {}  # point id -> row
+        self._payload_spans = {}  # row -> (offset, length) of its put record
+        self._row_ids = {}  # row -> point id
+        self._documents = {}  # document id -> set of point ids
+        self._point_documents = {}  # point id -> document id
+        self._alive = np.zeros(0, dtype=bool)
+        self._field_rows = {field: {} for field in KEYWORD_FIELDS.values()}  # field -> value -> set of rows
+        self._row_values = {}  # row -> ((field, value), ...) indexed for it
+        self._ingested_at = np.zeros(0, dtype=np.float64)  # per row; NaN when unknown
+        self._graph = None
+        self._codes = None
+        # Bumped whenever rows are renumbered, so a background graph build can tell
+        self._epoch = getattr(self, "_epoch", 0) + 1
+
+    def _sync(self):
+        """Bring the in-memory index up to date with the files; the caller holds both locks."""
+        if not os.path.exists(self.log_path):
+            if self._log_inode is not None:
+                self._clear_state()
+            return
+        stat = os.stat(self.log_path)
+        if stat.st_ino != self._log_inode or stat.st_size < self._log_offset:
+            # Another process compacted or recreated the store.
+            self._clear_state()
+            self._log_inode = stat.st_ino
+        if stat.st_size > self._log_offset:
+            self._replay()
+
+    def _replay(self):
+        with open(self.log_path, "rb+") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+            complete = data.rfind(b"\n") + 1
+            if complete < len(data):
+                # A writer crashed mid-record; we hold the lock, so drop the tail.
+                f.truncate(self._log_offset + complete)
+        offset = self._log_offset
+        for line in data[:complete].splitlines(keepends=True):
+            record = json.loads(line)
+            if record["op"] == "header":
+                self.dim = record["dim"]
+                self.vectors_name = record["vectors"]
+            elif record["op"] == "put":
+                self._apply_put(record, offset, len(line))
+            elif record["op"] == "del":
+                self._apply_delete(record["id"])
+            offset += len(line)
+        self._log_offset += complete
+        self._map_vectors()
+
+    def _apply_put(self, record: dict, offset: int, length: int):
+        point_id, row = record["id"], record["row"]
+        self._apply_delete(point_id)
+        if row >= len(self._alive):
+            size = max(row + 1, 2 * len(self._alive))
+            grown = np.zeros(size, dtype=bool)
+            grown[:len(self._alive)] = self._alive
+            self._alive = grown
+            grown = np.full(size, np.nan)
+            grown[:len(self._ingested_at)] = self._ingested_at
+            self._ingested_at = grown
+        self._alive[row] = True
+        self._rows[point_id] = row
+        self._row_ids[row] = point_id
+        self._payload_spans[row] = (offset, length)
+        metadata = record["payload"].get("metadata") or {}
+        document_id = metadata.get("document_id")
+        if document_id is not None:
+            self._documents.setdefault(document_id, set()).add(point_id)
+            self._point_documents[point_id] = document_id
+        values = tuple((field, metadata[field]) for field in self._field_rows
+                       if isinstance(metadata.get(field), (str, int)))
+        for field, value in values:
+            self._field_rows[field].setdefault(value, set()).add(row)
+        self._row_values[row] = values
+        ingested_at = metadata.get("ingested_at")
+        self._ingested_at[row] = ingested_at if isinstance(ingested_at, (int, float)) else np.nan
+
+    def _apply_delete(self, point_id: str):
+        row = self._rows.pop(point_id, None)
+        if row is None:
+            return
+        self._alive[row] = False
+        del self._row_ids[row]
+        del self._payload_spans[row]
+        for field, value in self._row_values.pop(row):
+            rows = self._field_rows[field][value]
+            rows.discard(row)
+            if not rows:
+                del self._field_rows[field][value]
+        document_id = self._point_documents.pop(point_id, None)
+        if document_id is not None:
+            ids = self._documents[document_id]
+            ids.discard(point_id)
+            if not ids:
+                del self._documents[document_id]
+
+    def _vectors_path(self, name: str = None) -> str:
+        return os.path.join(self.directory, name or self.vectors_name)
+
+    def _file_rows(self) -> int:
+        path = self._vectors_path()
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // (self.dim * 4)
+
+    def _map_vectors(self):
+        rows = self._file_rows() if self.vectors_name else 0
+        if rows == 0:
+            self._vectors = None
+        elif self._vectors is None or len(self._vectors) != rows:
+            self._vectors = np.memmap(self._vectors_path(), dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    def _append(self, records: list):
+        with open(self.log_path, "ab") as f:
+            f.write(b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        self._sync()
+
+    def _create(self, dim: int):
+        header = {"op": "header", "dim": dim, "vectors": "vectors.0.f32"}
+        open(self._vectors_path(header["vectors"]), "wb").close()
+        self._write_log([header])
+        self._sync()
+
+    def _write_log(self, records: list):
+        """Atomically replace the log with the given records."""
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.log_path)
+
+    def _read_payloads(self, rows) -> list:
+        with open(self.log_path, "rb") as f:
+            payloads = []
+            for row in rows:
+                offset, length = self._payload_spans[row]
+                f.seek(offset)
+                payloads.append(json.loads(f.read(length))["payload"])
+            return payloads
+
+    def _maybe_compact(self):
+        dead = self._file_rows() - len(self._rows)
+        if dead > 1000 and dead > len(self._rows):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the matrix and the log without dead rows."""
+        with self._lock, self._file_lock:
+            self._sync()
+            if self.vectors_name is None:
+                return
+            generation = int(self.vectors_name.split(".")[1]) + 1
+            new_name = f"vectors.{generation}.f32"
+            live = sorted(self._row_ids)
+            payloads = self._read_payloads(live)
+            with open(self._vectors_path(new_name), "wb") as f:
+                for start in range(0, len(live), 4096):
+                    f.write(np.ascontiguousarray(self._vectors[live[start:start + 4096]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            records = [{"op": "header", "dim": self.dim, "vectors": new_name}]
+            records += [
+                {"op": "put", "id": self._row_ids[row], "row": new_row, "payload": payload}
+                for new_row, (row, payload) in enumerate(zip(live, payloads))
+            ]
+            old_name = self.vectors_name
+            self._write_log(records)
+            self._clear_state()
+            self._sync()
+            for name in (old_name, f"graph.{old_name}.npy"):
+                if os.path.exists(self._vectors_path(name)):
+                    os.remove(self._vectors_path(name))
+            logger.info("Compacted local vector store %s to %d points", self.directory, len(live))
+
+    def exists(self) -> bool:
+        with self._lock, self._file_lock:
+            self._sync()
+            return self.vectors_name is not None
+
+    def ensure(self, vector_size: int = None):
+        # The matrix is created by the first upsert, once the dimension is known.
+        os.makedirs(self.directory, exist_ok=True)
+
+    def upsert(self, ids: list, vectors: list, payloads: list) -> int:
+        if not ids:
+            return 0
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        with self._lock, self._file_lock:
+            self._sync()
+            if self.vectors_name is None:
+                self._create(vectors.shape[1])
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+            # Vectors are durable before the records pointing at them; rows
+            # orphaned by a crash in between are simply never referenced.
+            first_row = self._file_rows()
+            with open(self._vectors_path(), "ab") as f:
+                f.seek(first_row * self.dim * 4)
+                f.truncate(first_row * self.dim * 4)
+                f.write(vectors.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._append([
+                {"op": "put", "id": str(point_id), "row": first_row + i, "payload": payload}
+                for i, (point_id, payload) in enumerate(zip(ids, payloads))
+            ])
+            self._maybe_compact()
+            if len(self._rows) >= self.graph_threshold:
+                self._start_graph_build()
+        return len(ids)
+
+    def document_point_ids(self, document_id: str) -> set:
+        with self._lock, self._file_lock:
+            self._sync()
+            return set(self._documents.get(document_id, ()))
+
+    def document_ids(self) -> list:
+        with self._lock, self._file_lock:
+            self._sync()
+            return sorted(self._documents)
+
+    def point_ids(self) -> set:
+        with self._lock, self._file_lock:
+            self._sync()
+            return set(self._rows)
+
+    def present_ids(self, ids: list) -> set:
+        with self._lock, self._file_lock:
+            self._sync()
+            return {str(point_id) for point_id in ids if str(point_id) in self._rows}
+
+    def delete(self, ids: list):
+        with self._lock, self._file_lock:
+            self._sync()
+            records = [{"op": "del", "id": str(point_id)} for point_id in ids if str(point_id) in self._rows]
+            if records:
+                self._append(records)
+                self._maybe_compact()
+
+    def _load_graph(self) -> GraphIndex:
+        """The published graph, read from disk on first use; the caller holds both locks."""
+        if self._graph is None:
+            graph_path = self._vectors_path(f"graph.{self.vectors_name}.npy")
+            neighbors = None
+            if os.path.exists(graph_path):
+                neighbors = np.load(graph_path)
+                if len(neighbors) > len(self._vectors) or neighbors.shape[1] != self.graph_degree:
+                    neighbors = None
+            self._graph = GraphIndex(self.graph_degree, neighbors=neighbors)
+        return self._graph
+
+    def _start_graph_build(self):
+        """Extend the graph to every row in a background thread, unless one is running; the caller holds the lock."""
+        if self._graph_thread is not None and self._graph_thread.is_alive():
+            return
+        self._graph_thread = threading.Thread(target=self._build_graph, name="local-graph-index", daemon=True)
+        self._graph_thread.start()
+
+    def _build_graph(self, step: int = 2048):
+        """
+        Extend the graph step rows at a time without holding the locks.
+
+        Each step extends a private copy of the published graph, which is
+        then swapped in, so searches never see a graph being modified.
+        Rows the graph does not cover yet are searched exactly meanwhile.
+        """
+        indexed = 0
+        while not self._closing.is_set():
+            with self._lock, self._file_lock:
+                self._sync()
+                if self._vectors is None or len(self._rows) < self.graph_threshold:
+                    break
+                epoch, vectors, graph = self._epoch, self._vectors, self._load_graph()
+            if graph.size >= len(vectors):
+                break
+            extended = GraphIndex(graph.degree, neighbors=graph.neighbors.copy())
+            extended.add(vectors, min(graph.size + step, len(vectors)))
+            with self._lock:
+                # A compaction or drop meanwhile makes the rows stale
+                if self._epoch == epoch:
+                    self._graph = extended
+                    indexed += extended.size - graph.size
+        with self._lock, self._file_lock:
+            if indexed and self._graph is not None and self.vectors_name is not None:
+                graph_path = self._vectors_path(f"graph.{self.vectors_name}.npy")
+                tmp_path = graph_path + ".tmp.npy"
+                np.save(tmp_path, self._graph.neighbors)
+                os.replace(tmp_path, graph_path)
+                logger.info("Indexed %d rows in the local graph index", indexed)
+
+    def wait_for_graph(self, timeout: float = None):
+        """Wait until the background graph build (if any) has finished."""
+        thread = self._graph_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _graph_rows(self, query, k: int, ef: int, alive):
+        """
+        Candidate rows from the graph index, merged with an exact scan of the
+        rows it does not cover yet; the caller holds both locks.
+        """
+        graph = self._load_graph()
+        if graph.size < len(self._vectors):
+            self._start_graph_build()
+        rows, similarities = graph.search(self._vectors, query, k, ef)
+        keep = alive[rows]
+        rows, similarities = rows[keep], similarities[keep]
+        tail = graph.size + np.flatnonzero(alive[graph.size:])
+        if len(tail):
+            rows = np.concatenate([rows, tail])
+            similarities = np.concatenate([similarities, np.asarray(self._vectors[tail] @ query)])
+            order = np.argsort(-similarities)
+            rows, similarities = rows[order], similarities[order]
+        return rows[:k], similarities[:k]
+
+    def _quantized_rows(self, query, k: int, alive):
+        """Rows from a scan of the quantized codes, extended on demand and rescored exactly."""
+        if self._codes is None:
+            self._codes = make_codes(self.quantization, self.dim)
+        if len(self._codes) < len(self._vectors):
+            for start in range(len(self._codes), len(self._vectors), 4096):
+                self._codes.add(self._vectors[start:start + 4096])
+        return rescored_top_k(self._codes, self._vectors, query, k, self.oversampling, alive)
+
+    def _searchable(self, query_filter):
+        """
+        The rows a search may return; the caller holds both locks.
+
+        Returns:
+            tuple: (alive mask over the matrix rows, the alive rows when a
+            filter selects them, else None).
+        """
+        alive = np.zeros(len(self._vectors), dtype=bool)
+        alive[:len(self._alive)] = self._alive[:len(self._vectors)]
+        if not query_filter:
+            return alive, None
+        for field, values in query_filter.keywords():
+            # The union of the values' row sets, from the in-memory payload index
+            selected = np.zeros(len(alive), dtype=bool)
+            rows = [row for value in values for row in self._field_rows[field].get(value, ())]
+            selected[np.asarray(rows, dtype=np.int64)] = True
+            alive &= selected
+        if query_filter.ingested_after is not None or query_filter.ingested_before is not None:
+            ingested_at = np.full(len(alive), np.nan)
+            ingested_at[:len(self._ingested_at)] = self._ingested_at[:len(alive)]
+            with np.errstate(invalid="ignore"):
+                if query_filter.ingested_after is not None:
+                    alive &= ingested_at >= query_filter.ingested_after
+                if query_filter.ingested_before is not None:
+                    alive &= ingested_at < query_filter.ingested_before
+        return alive, np.flatnonzero(alive)
+
+    def _exact_rows(self, query, k: int, alive, subset):
+        """Exact top-k rows; with a subset only its rows are read from the matrix and scored."""
+        if subset is None:
+            similarities = np.asarray(self._vectors @ query)
+            similarities[~alive] = -np.inf
+            k = min(k, len(self._rows))
+        else:
+            similarities = np.asarray(self._vectors[subset] @ query)
+            k = min(k, len(subset))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return (top if subset is None else subset[top]), similarities[top]
+
+    def search(self, vector, k: int, exact: bool = False, query_filter=None, projected: bool = False) -> list:
+        # Vectors are stored as given, so projected makes no difference here
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        query = query / norm if norm else query
+        with self._lock, self._file_lock:
+            self._sync()
+            if self._vectors is None or not self._rows:
+                return []
+            alive, subset = self._searchable(query_filter)
+            live = len(self._rows) if subset is None else len(subset)
+            if not live:
+                return []
+            approximate = not exact and live >= self.graph_threshold
+            quantized = not exact and not approximate and subset is None and self.quantization != "none"
+            if approximate:
+                # The beam must hold about graph_ef rows the filter keeps
+                rows, similarities = self._graph_rows(query, k, int(np.ceil(self.graph_ef * len(self._rows) / live)),
+                                                      alive)
+            elif quantized:
+                rows, similarities = self._quantized_rows(query, k, alive)
+            if not (approximate or quantized) or len(rows) < min(k, live):
+                rows, similarities = self._exact_rows(query, k, alive, subset)
+            rows = rows.tolist()
+            payloads = self._read_payloads(rows)
+            ids = [self._row_ids[row] for row in rows]
+        return [(payload_document(payload, point_id), float(s)) for payload, point_id, s in zip(payloads, ids, similarities)]
+
+    def search_batch(self, vectors: list, k: int, query_filter=None, block: int = 64) -> list:
+        if not len(vectors):
+            return []
+        queries = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+        with self._lock, self._file_lock:
+            self._sync()
+            if self._vectors is None or not self._rows:
+                return [[] for _ in queries]
+            alive, subset = self._searchable(query_filter)
+            live = len(self._rows) if subset is None else len(subset)
+            if not live:
+                return [[] for _ in queries]
+            if live >= self.graph_threshold or (subset is None and self.quantization != "none"):
+                return [self.search(query, k, query_filter=query_filter) for query in queries]
+            # Exact search of a block of queries is one matrix product, over
+            # the filtered rows only when there is a filter.
+            matrix = self._vectors if subset is None else np.asarray(self._vectors[subset])
+            k = min(k, live)
+            results = []
+            for start in range(0, len(queries), block):
+                similarities = np.asarray(queries[start:start + block] @ matrix.T)
+                if subset is None:
+                    similarities[:, ~alive] = -np.inf
+                top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+                for scores, columns in zip(similarities, top):
+                    columns = columns[np.argsort(-scores[columns])]
+                    rows = (columns if subset is None else subset[columns]).tolist()
+                    payloads = self._read_payloads(rows)
+                    results.append([
+                        (payload_document(payload, self._row_ids[row]), float(scores[column]))
+                        for payload, row, column in zip(payloads, rows, columns)
+                    ])
+        return results
+
+    def get(self, ids: list) -> list:
+        with self._lock, self._file_lock:
+            self._sync()
+            found = [str(point_id) for point_id in ids if str(point_id) in self._rows]
+            payloads = self._read_payloads([self._rows[point_id] for point_id in found])
+        return [payload_document(payload, point_id) for payload, point_id in zip(payloads, found)]
+
+    def sample_vectors(self, count: int):
+        with self._lock, self._file_lock:
+            self._sync()
+            rows = sorted(self._row_ids)[:count]
+            return np.asarray(self._vectors[rows], dtype=np.float32) if rows else np.zeros((0, self.dim or 0), np.float32)
+
+    def set_quantization(self, mode: str):
+        # Codes live in memory only; they are rebuilt by the next search.
+        with self._lock:
+            self.quantization = mode
+            self._codes = None
+
+    def drop(self) -> bool:
+        with self._lock, self._file_lock:
+            self._sync()
+            existed = self.vectors_name is not None
+            for name in os.listdir(self.directory):
+                if name != "store.lock":
+                    path = os.path.join(self.directory, name)
+                    if os.path.isdir(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.remove(path)
+            self._clear_state()
+            return existed
+
+    def close(self):
+        """Stop the background graph build after its current step."""
+        self._closing.set()
+        self.wait_for_graph()
+
+    def __len__(self):
+        return len(self._rows)
+
+
+def local_store_from_env(collection_name: str) -> LocalVectorStore:
+    """
+    Build a LocalVectorStore for a collection configured from environment variables.
+
+    Args:
+        collection_name (str): The collection; each has its own directory.
+
+    Returns:
+        LocalVectorStore: The configured store.
+    """
+    base_dir = os.getenv('local_store_dir', os.path.join(os.getcwd(), "vector_store"))
+    settings = quantization_settings()
+    return LocalVectorStore(
+        os.path.join(base_dir, collection_name),
+        graph_threshold=int(os.getenv('local_store_graph_threshold', "50000")),
+        graph_ef=int(os.getenv('local_store_graph_ef', "64")),
+        quantization=settings["mode"],
+        oversampling=settings["oversampling"],
+    )
@@ -5,6 +5,7 @@ from src.preprocessing import load_documents, split_documents
 from src.index import store_documents_to_qdrant
 from src.retrieve import retrieve_answer_from_docs
 from src.utils import format_docs, create_embeddings
+from src import registry
 from custom_logger import logger
 from exception import CustomException
 
@@ -60,9 +61,13 @@ def retriever(question: str):
 # Example usage (For testing purposes)
 if __name__ == "__main__":
     try:
+        registry.warm_up()
+
         # Example question
         sample_question = "Who is Mike?"
         response = retriever(sample_question)
         print(f"Question: {sample_question}\nAnswer: {response}")
     except Exception as e:
         logger.error(f"Error in main execution: {e}")
+    finally:
+        registry.shutdown()
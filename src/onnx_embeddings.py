@@ -0,0 +1,220 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from custom_logger import logger
+
+load_dotenv()
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# torch, transformers and onnxruntime are only imported by the functions that
+# need them, so selecting a backend never loads the others.
+
+
+def embedding_backend() -> str:
+    """
+    Configured embedding inference backend.
+
+    Returns:
+        str: "torch" (Sentence-Transformers, default), "onnx" (ONNX Runtime)
+        or "onnx-int8" (ONNX Runtime with dynamically int8-quantized weights).
+    """
+    backend = os.getenv('embedding_backend', "torch").strip().lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding_backend: {backend}")
+    return backend
+
+
+def onnx_settings() -> dict:
+    """
+    ONNX backend settings from the environment.
+
+    Returns:
+        dict: Export "model_dir" (onnx_model_dir), intra-op "threads"
+        (onnx_intra_op_threads; 0 lets ONNX Runtime use the physical cores),
+        "batch_size" (onnx_batch_size) and "max_length" in tokens (onnx_max_length).
+    """
+    return {
+        "model_dir": os.getenv('onnx_model_dir', os.path.join(os.getcwd(), "onnx_models")),
+        "threads": int(os.getenv('onnx_intra_op_threads', "0")),
+        "batch_size": int(os.getenv('onnx_batch_size', "32")),
+        "max_length": int(os.getenv('onnx_max_length', "384")),
+    }
+
+
+def length_sorted_batches(lengths: list, batch_size: int) -> list:
+    """
+    Group items into batches of similar length.
+
+    Padding every sequence of a batch to its longest one wastes compute on
+    pad tokens; sorting by length first keeps that waste minimal.
+
+    Args:
+        lengths (list): Token count of each item.
+        batch_size (int): Maximum items per batch.
+
+    Returns:
+        list: Arrays of item indices, shortest items first.
+    """
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+def mean_pool(hidden: np.ndarray, mask: np.ndarray, normalize: bool = True) -> np.ndarray:
+    """
+    Sentence embeddings as the mean of the token embeddings, ignoring padding.
+
+    This is the pooling of mean-pooling Sentence-Transformers models such as
+    all-mpnet-base-v2 and all-MiniLM-L6-v2, which also L2-normalize.
+
+    Args:
+        hidden (np.ndarray): Token embeddings, (batch, sequence, dim).
+        mask (np.ndarray): Attention mask, (batch, sequence).
+        normalize (bool): Whether to scale the embeddings to unit length.
+
+    Returns:
+        np.ndarray: (batch, dim) float32 embeddings.
+    """
+    mask = mask.astype(np.float32)[:, :, None]
+    pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    if normalize:
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+    return pooled.astype(np.float32)
+
+
+def export_onnx(model_name: str, model_dir: str, quantize: bool = False) -> str:
+    """
+    Export a Hugging Face encoder to ONNX, once.
+
+    The export (and its tokenizer) is written under model_dir and reused by
+    later processes. With quantize, the weights of the exported graph are
+    additionally converted to int8 (dynamic quantization: activations are
+    quantized on the fly, so no calibration data is needed).
+
+    Args:
+        model_name (str): Hugging Face model name or local path.
+        model_dir (str): Directory holding the exports.
+        quantize (bool): Whether to produce the int8 model.
+
+    Returns:
+        str: Directory of the export, with model.onnx (or model.int8.onnx) and tokenizer.json.
+    """
+    directory = os.path.join(model_dir, model_name.strip("/").replace("/", "__"))
+    model_path = os.path.join(directory, "model.onnx")
+    if not os.path.exists(model_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        logger.info("Exporting %s to ONNX in %s", model_name, directory)
+        os.makedirs(directory, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        tokenizer.save_pretrained(directory)
+        model = AutoModel.from_pretrained(model_name).eval()
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids")
+                       if name in tokenizer.model_input_names]
+
+        class Encoder(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *inputs):
+                return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+        sample = tokenizer(["export the encoder", "to onnx"], padding=True, return_tensors="pt")
+        with torch.no_grad():
+            torch.onnx.export(
+                Encoder(), tuple(sample[name] for name in input_names), model_path + ".tmp",
+                input_names=input_names, output_names=["last_hidden_state"],
+                dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+                opset_version=17,
+            )
+        os.replace(model_path + ".tmp", model_path)
+    if quantize:
+        int8_path = os.path.join(directory, "model.int8.onnx")
+        if not os.path.exists(int8_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info("Quantizing %s to int8", model_path)
+            quantize_dynamic(model_path, int8_path + ".tmp", weight_type=QuantType.QInt8)
+            os.replace(int8_path + ".tmp", int8_path)
+    return directory
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    LangChain embeddings running an exported encoder on ONNX Runtime (CPU).
+
+    Texts are tokenized with the fast (Rust) tokenizer of the model,
+    grouped into length-sorted batches padded only to their own longest
+    text, and mean-pooled; results come back in input order. One inference
+    session is shared by all callers (ONNX Runtime sessions are thread-safe),
+    with intra-op threads sized for the host and a single inter-op thread.
+    """
+
+    def __init__(self, directory: str, quantized: bool = False, batch_size: int = 32, max_length: int = 384,
+                 threads: int = 0, normalize: bool = True):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, "tokenizer.json"))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length)
+        self.pad_id = next((self.tokenizer.token_to_id(token) for token in ("<pad>", "[PAD]")
+                            if self.tokenizer.token_to_id(token) is not None), 0)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        model_path = os.path.join(directory, "model.int8.onnx" if quantized else "model.onnx")
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def _embed(self, texts: list) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        results = [None] * len(encodings)
+        for batch in length_sorted_batches([len(encoding.ids) for encoding in encodings], self.batch_size):
+            width = max(len(encodings[i].ids) for i in batch)
+            inputs = {
+                "input_ids": np.full((len(batch), width), self.pad_id, dtype=np.int64),
+                "attention_mask": np.zeros((len(batch), width), dtype=np.int64),
+                "token_type_ids": np.zeros((len(batch), width), dtype=np.int64),
+            }
+            for row, i in enumerate(batch):
+                ids = encodings[i].ids
+                inputs["input_ids"][row, :len(ids)] = ids
+                inputs["attention_mask"][row, :len(ids)] = 1
+            hidden = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+            for i, vector in zip(batch, mean_pool(hidden, inputs["attention_mask"], self.normalize)):
+                results[i] = vector
+        return np.asarray(results, dtype=np.float32)
+
+    def embed_documents(self, texts: list) -> list:
+        if not texts:
+            return []
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text: str) -> list:
+        return self._embed([text])[0].tolist()
+
+
+def onnx_embeddings_from_env(model_name: str, quantized: bool = False) -> OnnxEmbeddings:
+    """
+    Build the ONNX embeddings of a model, exporting it first if needed.
+
+    Args:
+        model_name (str): Hugging Face model name.
+        quantized (bool): Whether to run the int8 model.
+
+    Returns:
+        OnnxEmbeddings: The embeddings.
+    """
+    settings = onnx_settings()
+    directory = export_onnx(model_name, settings["model_dir"], quantize=quantized)
+    return OnnxEmbeddings(directory, quantized=quantized, batch_size=settings["batch_size"],
+                          max_length=settings["max_length"], threads=settings["threads"])
@@ -0,0 +1,195 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pypdf
+from langchain_core.documents import Document
+from dotenv import load_dotenv
+from src.splitter import make_text_splitter
+
+load_dotenv()
+
+# Worker-side code lives here, away from src.preprocessing, so that pool
+# processes only import pypdf and the text splitter (with its tokenizer),
+# never the model stack.
+
+
+def page_document(file_path: str, page_number: int, page) -> Document:
+    """
+    Build the document of one PDF page exactly as PyPDFLoader does.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        page_number (int): Zero-based page number.
+        page (pypdf.PageObject): The parsed page.
+
+    Returns:
+        Document: Plain-text page content with "source" and "page" metadata.
+    """
+    return Document(
+        page_content=page.extract_text(extraction_mode="plain"),
+        metadata={"source": file_path, "page": page_number},
+    )
+
+
+def parse_and_split_shard(file_path: str, start: int, stop: int, chunk_size: int, chunk_overlap: int):
+    """
+    Parse pages [start, stop) of a PDF and split them into chunks.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        start (int): First page of the shard.
+        stop (int): Page after the last page of the shard.
+        chunk_size (int): Maximum size of each chunk (characters; see make_text_splitter).
+        chunk_overlap (int): Overlap between consecutive chunks.
+
+    Returns:
+        list: The chunks of the shard, in page order.
+    """
+    reader = pypdf.PdfReader(file_path)
+    text_splitter = make_text_splitter(chunk_size, chunk_overlap)
+    # Pages are split independently; the token splitter tokenizes the shard's pages in one batch
+    return text_splitter.split_documents(
+        [page_document(file_path, page_number, reader.pages[page_number]) for page_number in range(start, stop)]
+    )
+
+
+def plan_shards(file_paths: list, pages_per_shard: int):
+    """
+    Cut a batch of PDFs into page-range shards.
+
+    Args:
+        file_paths (list): Paths of the PDF files, in output order.
+        pages_per_shard (int): Maximum number of pages per shard.
+
+    Returns:
+        list: (file_path, start, stop) tuples in file and page order.
+    """
+    shards = []
+    for file_path in file_paths:
+        page_count = len(pypdf.PdfReader(file_path).pages)
+        for start in range(0, page_count, pages_per_shard):
+            shards.append((file_path, start, min(start + pages_per_shard, page_count)))
+    return shards
+
+
+def iter_parse_and_split_parallel(file_paths: list, chunk_size: int = 1000, chunk_overlap: int = 400,
+                                  workers: int = None, pages_per_shard: int = 16, on_pages=None):
+    """
+    Parse and split PDFs on a process pool, yielding chunks in order.
+
+    Shards are dispatched to the pool with at most two per worker in
+    flight, and their chunks are yielded strictly in file and page order,
+    so the output is identical to parsing and splitting serially.
+
+    Args:
+        file_paths (list): Paths of the PDF files.
+        chunk_size (int): Maximum size of each chunk.
+        chunk_overlap (int): Overlap between consecutive chunks.
+        workers (int): Number of worker processes (default: CPU count).
+        pages_per_shard (int): Maximum number of pages per shard.
+        on_pages (callable): Optional callback receiving the number of pages
+            of each finished shard.
+
+    Yields:
+        Document: The next chunk.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = deque(plan_shards(file_paths, pages_per_shard))
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while shards or in_flight:
+            while shards and len(in_flight) < 2 * workers:
+                file_path, start, stop = shards.popleft()
+                future = executor.submit(parse_and_split_shard, file_path, start, stop, chunk_size, chunk_overlap)
+                in_flight.append((future, stop - start))
+            future, page_count = in_flight.popleft()
+            chunks = future.result()
+            if on_pages is not None:
+                on_pages(page_count)
+            yield from chunks
+
+
+def iter_parse_files_parallel(file_paths, chunk_size: int = 1000, chunk_overlap: int = 400, workers: int = None,
+                              pages_per_shard: int = 16):
+    """
+    Parse and split many PDFs on one process pool, yielding them file by file.
+
+    Unlike iter_parse_and_split_parallel, a file that cannot be read does
+    not stop the run: its error is yielded in place of its chunks. Files are
+    planned only when there is room for their shards, so the list of paths
+    may be long (or lazy) without opening every PDF up front.
+
+    Args:
+        file_paths: Iterable of PDF paths, in output order.
+        chunk_size (int): Maximum size of each chunk.
+        chunk_overlap (int): Overlap between consecutive chunks.
+        workers (int): Number of worker processes (default: CPU count).
+        pages_per_shard (int): Maximum number of pages per shard.
+
+    Yields:
+        tuple: (file_path, chunks, page count, error); chunks is None and
+            error the exception when the file failed.
+    """
+    workers = workers or os.cpu_count() or 1
+    pending = iter(file_paths)
+    in_flight = deque()  # (file_path, [(future, page count)], planning error)
+    shards_in_flight = 0
+    exhausted = False
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while not exhausted and (not in_flight or shards_in_flight < 2 * workers):
+                file_path = next(pending, None)
+                if file_path is None:
+                    exhausted = True
+                    break
+                try:
+                    futures = [
+                        (executor.submit(parse_and_split_shard, path, start, stop, chunk_size, chunk_overlap), stop - start)
+                        for path, start, stop in plan_shards([file_path], pages_per_shard)
+                    ]
+                    in_flight.append((file_path, futures, None))
+                    shards_in_flight += len(futures)
+                except Exception as e:
+                    in_flight.append((file_path, [], e))
+            if not in_flight:
+                return
+            file_path, futures, error = in_flight.popleft()
+            shards_in_flight -= len(futures)
+            chunks = []
+            for future, _ in futures:
+                try:
+                    chunks.extend(future.result())
+                except Exception as e:
+                    error = error or e
+            if error is not None:
+                yield file_path, None, 0, error
+            else:
+                yield file_path, chunks, sum(page_count for _, page_count in futures), None
+
+
+def parse_and_split_parallel(file_paths: list, chunk_size: int = 1000, chunk_overlap: int = 400,
+                             workers: int = None, pages_per_shard: int = 16):
+    """
+    Parse and split PDFs on a process pool.
+
+    Args:
+        file_paths (list): Paths of the PDF files.
+        chunk_size (int): Maximum size of each chunk.
+        chunk_overlap (int): Overlap between consecutive chunks.
+        workers (int): Number of worker processes (default: CPU count).
+        pages_per_shard (int): Maximum number of pages per shard.
+
+    Returns:
+        list: All chunks, in file and page order.
+    """
+    return list(iter_parse_and_split_parallel(file_paths, chunk_size, chunk_overlap, workers, pages_per_shard))
+
+
+def parse_workers_from_env() -> int:
+    """
+    Number of parsing processes configured for ingestion.
+
+    Returns:
+        int: Value of ingest_parse_workers; 1 means the serial path.
+    """
+    return int(os.getenv('ingest_parse_workers', "1"))
@@ -0,0 +1,78 @@
+import queue
+import threading
+import contextvars
+from itertools import islice
+
+
+def iter_batches(iterable, batch_size: int):
+    """
+    Group an iterable into lists of at most batch_size items.
+
+    Args:
+        iterable: Items to group.
+        batch_size (int): Maximum number of items per batch.
+
+    Yields:
+        list: The next batch.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def prefetch(iterable, maxsize: int = 2):
+    """
+    Run an iterator in a background thread and hand its items over through a
+    bounded queue.
+
+    Chaining prefetch calls overlaps the stages of a pipeline while keeping
+    at most maxsize items buffered between any two stages. Exceptions raised
+    by the producer are re-raised in the consumer; if the consumer stops
+    early, the producer is told to stop as well. The producer runs in a copy
+    of the caller's context, so it logs under the caller's trace id.
+
+    Args:
+        iterable: The producing iterator.
+        maxsize (int): Maximum number of buffered items.
+
+    Yields:
+        The items of iterable, in order.
+    """
+    items = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(("item", item)):
+                    return
+            put(("done", None))
+        except BaseException as e:
+            put(("error", e))
+
+    context = contextvars.copy_context()
+    producer = threading.Thread(target=context.run, args=(produce,), name="pipeline-stage", daemon=True)
+    producer.start()
+    try:
+        while True:
+            kind, value = items.get()
+            if kind == "item":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+    finally:
+        stop.set()
@@ -1,14 +1,15 @@
 import os
 import sys
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import time
+import pypdf
 from custom_logger import logger
 from exception import CustomException
-from qdrant_client import QdrantClient
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Qdrant
-from langchain_qdrant import Qdrant
-from qdrant_client.http import models as rest
+from src import registry
+from src.pipeline import iter_batches, prefetch
+from src.splitter import make_text_splitter
+from src.chunk_ids import assign_chunk_ids
+from src.parallel_parsing import page_document, iter_parse_and_split_parallel, parse_workers_from_env
+from src.telemetry import span, timed_iter, CHUNKS, PAGES
 
 def load_documents(file_path: str):
     """
@@ -24,6 +25,8 @@ def load_documents(file_path: str):
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"The file at {file_path} does not exist.")
 
+        from langchain_community.document_loaders import PyPDFLoader
+
         logger.info("Loading documents from: %s", file_path)
         loader = PyPDFLoader(file_path)
         documents = loader.load()
@@ -37,13 +40,34 @@ def load_documents(file_path: str):
         logger.error("Error while loading documents: %s", str(e))
         raise CustomException(e, sys)
 
+def iter_pdf_pages(file_path: str):
+    """
+    Lazily load a PDF file, one page at a time.
+
+    Produces the same documents as PyPDFLoader (plain text extraction,
+    "source" and "page" metadata) but parses each page only when it is
+    requested.
+
+    Args:
+        file_path (str): Path to the PDF file.
+
+    Yields:
+        Document: One document per page.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"The file at {file_path} does not exist.")
+
+    reader = pypdf.PdfReader(file_path)
+    for page_number, page in enumerate(reader.pages):
+        yield page_document(file_path, page_number, page)
+
 def split_documents(documents: list, chunk_size: int = 1000, chunk_overlap: int = 400):
     """
     Split documents into smaller chunks.
 
     Args:
         documents (list): List of documents to be split.
-        chunk_size (int): Maximum size of each chunk.
+        chunk_size (int): Maximum size of each chunk (characters; see make_text_splitter).
         chunk_overlap (int): Overlap between consecutive chunks.
 
     Returns:
@@ -54,7 +78,7 @@ def split_documents(documents: list, chunk_size: int = 1000, chunk_overlap: int
             raise ValueError("No documents provided to split.")
 
         logger.info("Splitting documents into chunks with size %d and overlap %d", chunk_size, chunk_overlap)
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        text_splitter = make_text_splitter(chunk_size, chunk_overlap)
         chunks = text_splitter.split_documents(documents)
         logger.info("Documents split into %d chunks successfully", len(chunks))
         return chunks
@@ -65,43 +89,220 @@ def split_documents(documents: list, chunk_size: int = 1000, chunk_overlap: int
     except Exception as e:
         logger.error("Error while splitting documents: %s", str(e))
         raise CustomException(e, sys)
-# uploading for the first time
-def upload_to_qdrant(chunks, qdrant_url, qdrant_api_key):
+def iter_split_documents(documents, chunk_size: int = 1000, chunk_overlap: int = 400, batch_size: int = 16):
     """
-    Upload chunks to Qdrant and ensure collection exists.
+    Lazily split documents into chunks, a few documents at a time.
+
+    Produces the same chunks as split_documents without materializing them all.
+
+    Args:
+        documents: Iterable of documents (e.g. iter_pdf_pages).
+        chunk_size (int): Maximum size of each chunk (characters; see make_text_splitter).
+        chunk_overlap (int): Overlap between consecutive chunks.
+        batch_size (int): Documents split per call, which the token splitter
+            scans and tokenizes together.
+
+    Yields:
+        Document: The next chunk.
+    """
+    text_splitter = make_text_splitter(chunk_size, chunk_overlap)
+    for batch in iter_batches(documents, batch_size):
+        yield from text_splitter.split_documents(batch)
+
+def upsert_chunks(store, chunks: list, vectors: list, ids: list, ingested_at: float = None):
+    """
+    Upsert embedded chunks as points.
+
+    The metadata payload holds the fields searches can be filtered on: the
+    "document_id" (see assign_chunk_ids), "source" and "page" of the chunk,
+    and the "ingested_at" time.
+
+    Args:
+        store (VectorStore): The target vector store.
+        chunks (list): The chunks.
+        vectors (list): One embedding per chunk.
+        ids (list): One point id per chunk.
+        ingested_at (float): Unix time of the ingestion (default: now).
+
+    Returns:
+        int: Number of points upserted.
+    """
+    ingested_at = time.time() if ingested_at is None else ingested_at
+    # Same payload layout as the LangChain Qdrant vector store
+    payloads = [{"page_content": chunk.page_content, "metadata": {**chunk.metadata, "ingested_at": ingested_at}}
+                for chunk in chunks]
+    return store.upsert(ids, vectors, payloads)
+
+def embed_chunks(chunks: list, progress=None):
+    """
+    Embed chunks through the persistent embedding cache.
+
+    Args:
+        chunks (list): The chunks to embed.
+        progress (Job): Optional progress reporter.
+
+    Returns:
+        list: One embedding per chunk.
+    """
+    with span("ingest_embed"):
+        vectors = registry.get_cached_embeddings().embed_documents([chunk.page_content for chunk in chunks])
+    if progress is not None:
+        progress.update(chunks_embedded=len(chunks))
+    return vectors
+
+def upload_to_qdrant(chunks, qdrant_url, qdrant_api_key, batch_size: int = 256, progress=None, document_id: str = None):
+    """
+    Upload chunks to the configured vector store and ensure the collection exists.
+
+    Chunks get deterministic point ids (see assign_chunk_ids), and chunks
+    already stored under their id are skipped before embedding, so
+    re-uploading an unchanged document neither duplicates points nor
+    recomputes embeddings. When the upload is a whole document_id, points of
+    that document which are no longer produced are deleted afterwards.
+    Points are stamped with the time the upload started ("ingested_at");
+    unchanged chunks keep the time they were first stored.
+
+    Args:
+        chunks: Document chunks to upload; any iterable, consumed lazily.
+        qdrant_url (str): The URL of the Qdrant instance (Qdrant backend only).
+        qdrant_api_key (str): The API key for authentication (Qdrant backend only).
+        batch_size (int): Number of chunks embedded and upserted per batch.
+        progress (Job): Optional progress reporter, updated after every
+            embedding call and every upsert.
+        document_id (str): The document all chunks belong to, enabling the
+            removal of its stale chunks.
+
+    Returns:
+        dict: Number of points upserted, skipped as unchanged and deleted as stale.
     """
     try:
-        # Connect to Qdrant
-        qdrant_client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key, timeout=60)
-        collection_name = "rag"
-
-        # Step 1: Check if collection exists; if not, create it
-        try:
-            qdrant_client.get_collection(collection_name)
-            logger.info(f"Collection '{collection_name}' exists.")
-        except Exception:
-            logger.info(f"Collection '{collection_name}' does not exist. Creating it...")
-            qdrant_client.create_collection(
-                collection_name=collection_name,
-                vectors_config={"size": 768, "distance": "Cosine"},  # Adjust vector size as needed
-            )
-            logger.info(f"Collection '{collection_name}' created successfully.")
-
-        # Step 2: Upload new points (chunks)
-
-        embeddings_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
-        qdrant = Qdrant(client=qdrant_client, collection_name=collection_name, embeddings=embeddings_model)
-
-        # Embed chunks and upload
-        texts = [chunk.page_content for chunk in chunks]
-        metadata = [chunk.metadata for chunk in chunks]
-
-        qdrant.add_texts(texts=texts, metadatas=metadata)
-        
-
-        logger.info("Documents uploaded successfully to Qdrant.")
+        # Connect to the vector store
+        store = registry.get_store(qdrant_url, qdrant_api_key)
+
+        # Step 1: Check if collection exists; if not, create it with its payload indexes
+        store.ensure(registry.embedding_dimension())
+
+        lexical_index = registry.get_lexical_index()
+        ingested_at = time.time()
+
+        # Step 2: Drop chunks that are already stored under their id
+        known = store.document_point_ids(document_id) if document_id else None
+        seen = set()
+        skipped = [0]
+
+        def new_batches():
+            for batch in iter_batches(assign_chunk_ids(chunks, document_id), batch_size):
+                ids = [point_id for _, point_id in batch]
+                seen.update(ids)
+                if known is not None:
+                    present = known
+                else:
+                    with span("ingest_lookup"):
+                        present = store.present_ids(ids)
+                fresh = [(chunk, point_id) for chunk, point_id in batch if point_id not in present]
+                skipped[0] += len(batch) - len(fresh)
+                # Stored chunks missing from the lexical index (e.g. uploaded before it existed) are backfilled.
+                unchanged = [(chunk, point_id) for chunk, point_id in batch if point_id in present]
+                if unchanged:
+                    indexed = lexical_index.present_ids([point_id for _, point_id in unchanged])
+                    backfill = [(chunk, point_id) for chunk, point_id in unchanged if point_id not in indexed]
+                    lexical_index.add([point_id for _, point_id in backfill], [chunk.page_content for chunk, _ in backfill])
+                if fresh:
+                    yield [chunk for chunk, _ in fresh], [point_id for _, point_id in fresh]
+
+        # Step 3: Embed batches in a background stage while earlier batches are
+        # upserted, so each batch becomes searchable as soon as it is stored.
+        embedded = prefetch(
+            ((batch, ids, embed_chunks(batch, progress)) for batch, ids in new_batches()),
+            maxsize=2,
+        )
+        upserted = 0
+        for batch, ids, vectors in embedded:
+            with span("ingest_upsert"):
+                count = upsert_chunks(store, batch, vectors, ids, ingested_at)
+            with span("ingest_lexical_index"):
+                lexical_index.add(ids, [chunk.page_content for chunk in batch])
+            upserted += count
+            if progress is not None:
+                progress.update(points_upserted=count)
+
+        # Step 4: Remove the chunks that disappeared from the document
+        stale = sorted(known - seen) if known is not None else []
+        if stale:
+            with span("ingest_delete"):
+                store.delete(stale)
+                lexical_index.delete(stale)
+
+        if upserted or stale:
+            # Answers cached before this upload may now be incomplete
+            registry.get_answer_cache().invalidate()
+
+        logger.info("Documents uploaded: %d upserted, %d unchanged, %d stale deleted.",
+                    upserted, skipped[0], len(stale))
+        CHUNKS.inc(upserted, outcome="upserted")
+        CHUNKS.inc(skipped[0], outcome="skipped")
+        CHUNKS.inc(len(stale), outcome="deleted")
+        return {"upserted": upserted, "skipped": skipped[0], "deleted": len(stale)}
     except Exception as e:
         logger.error("Error occurred during document upload: %s", str(e))
         raise CustomException(e, sys)
 
+def ingest_document(file_path: str, qdrant_url: str, qdrant_api_key: str, chunk_size: int = 2000,
+                    chunk_overlap: int = 400, batch_size: int = 256, workers: int = None, progress=None,
+                    document_id: str = None):
+    """
+    Load, split and upload one PDF to the vector store as a streaming pipeline.
+
+    Pages are parsed and split lazily in one background stage, fixed-size
+    batches are embedded in a second and upserted by the caller, with at
+    most two batches buffered between stages. Peak memory therefore does
+    not grow with the size of the document, and the first batches are
+    searchable while later pages are still being parsed.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        qdrant_url (str): The URL of the Qdrant instance (Qdrant backend only).
+        qdrant_api_key (str): The API key for authentication (Qdrant backend only).
+        chunk_size (int): Maximum size of each chunk.
+        chunk_overlap (int): Overlap between consecutive chunks.
+        batch_size (int): Number of chunks embedded and upserted per batch.
+        workers (int): Parsing processes; above 1, page ranges are parsed and
+            split on a process pool (default: ingest_parse_workers).
+        progress (Job): Optional progress reporter.
+        document_id (str): Identifier of the document, stable across
+            re-uploads (default: the file name). Re-ingesting a document
+            only embeds its new chunks and deletes the ones that are gone.
+
+    Returns:
+        dict: Number of pages parsed and chunks upserted, skipped and deleted.
+    """
+    if not os.path.exists(file_path):
+        logger.error("File not found: %s", file_path)
+        raise CustomException(FileNotFoundError(f"The file at {file_path} does not exist."), sys)
+
+    workers = workers or parse_workers_from_env()
+    pages = [0]
+
+    def count_pages(count: int):
+        pages[0] += count
+        PAGES.inc(count)
+        if progress is not None:
+            progress.update(pages_parsed=count)
+
+    def counted_pages():
+        for page in iter_pdf_pages(file_path):
+            count_pages(1)
+            yield page
 
+    logger.info("Streaming documents from: %s (%d parsing workers)", file_path, workers)
+    if workers > 1:
+        chunks = iter_parse_and_split_parallel([file_path], chunk_size, chunk_overlap, workers, on_pages=count_pages)
+    else:
+        chunks = iter_split_documents(counted_pages(), chunk_size, chunk_overlap)
+    # Parsing and splitting time is measured in the producing thread, not while it waits
+    chunks = prefetch(timed_iter(chunks, "ingest_parse"), maxsize=2 * batch_size)
+    document_id = document_id or os.path.basename(file_path)
+    with span("ingest_document"):
+        counts = upload_to_qdrant(chunks, qdrant_url, qdrant_api_key, batch_size=batch_size, progress=progress,
+                                  document_id=document_id)
+    return {"pages": pages[0], "chunks": counts["upserted"], "skipped": counts["skipped"], "deleted": counts["deleted"]}
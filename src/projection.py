@@ -0,0 +1,209 @@
+import os
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from src.quantization import recall_at_k
+
+load_dotenv()
+
+PROJECTION_METHODS = ("pca", "truncate")
+
+
+def parse_projection(spec: str):
+    """
+    Parse a projection spec.
+
+    Args:
+        spec (str): "none", "pca:<dim>" or "truncate:<dim>".
+
+    Returns:
+        tuple: (method, dim), or None for "none".
+    """
+    spec = (spec or "none").strip().lower()
+    if spec == "none":
+        return None
+    method, _, dim = spec.partition(":")
+    if method not in PROJECTION_METHODS or not dim.isdigit() or int(dim) < 1:
+        raise ValueError(f"Unknown vector_projection: {spec} (expected none, pca:<dim> or truncate:<dim>)")
+    return method, int(dim)
+
+
+def projection_settings():
+    """
+    Projection settings from the environment.
+
+    Returns:
+        dict: The projection "spec" of new collection versions
+        (vector_projection: none, pca:<dim> or truncate:<dim>) and the
+        corpus "sample" size PCA is fitted on (projection_fit_sample).
+    """
+    spec = os.getenv('vector_projection', "none")
+    parse_projection(spec)
+    return {
+        "spec": spec,
+        "sample": int(os.getenv('projection_fit_sample', "10000")),
+    }
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class Projection:
+    """
+    Linear map of embeddings to fewer dimensions, followed by L2 normalization.
+
+    "truncate" keeps the leading components, which preserves similarities
+    for Matryoshka-trained models; "pca" projects on the principal
+    components of a corpus sample, which suits any model.
+    """
+
+    def __init__(self, method: str, dim: int, mean=None, components=None):
+        self.method = method
+        self.dim = dim
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float32)
+        self.components = None if components is None else np.asarray(components, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, method: str, dim: int, sample) -> "Projection":
+        """
+        Fit a projection on a sample of (full-dimension) embeddings.
+
+        Args:
+            method (str): pca or truncate.
+            dim (int): Output dimension.
+            sample: (n, full dim) embeddings; PCA needs at least dim of them.
+
+        Returns:
+            Projection: The fitted projection.
+        """
+        sample = np.asarray(sample, dtype=np.float32)
+        if dim >= sample.shape[1]:
+            raise ValueError(f"Cannot project {sample.shape[1]}-dimensional embeddings to {dim} dimensions.")
+        if method == "truncate":
+            return cls(method, dim)
+        if len(sample) < dim:
+            raise ValueError(f"PCA to {dim} dimensions needs at least {dim} sample vectors, got {len(sample)}.")
+        sample = _normalize(sample)
+        mean = sample.mean(axis=0)
+        # Rows of vt are the principal directions, by decreasing variance
+        _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+        return cls(method, dim, mean, vt[:dim])
+
+    def apply(self, vectors) -> np.ndarray:
+        """
+        Project vectors.
+
+        Args:
+            vectors: One vector or a (n, full dim) matrix.
+
+        Returns:
+            np.ndarray: Normalized float32 projections, with the input's shape rank.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        single = vectors.ndim == 1
+        vectors = np.atleast_2d(vectors)
+        if self.method == "truncate":
+            projected = vectors[:, :self.dim]
+        else:
+            projected = (_normalize(vectors) - self.mean) @ self.components.T
+        projected = _normalize(projected)
+        return projected[0] if single else projected
+
+    def to_payload(self) -> dict:
+        """The projection as a JSON-serializable dict (see from_payload)."""
+        payload = {"method": self.method, "dim": self.dim}
+        if self.components is not None:
+            payload.update(mean=self.mean.tolist(), components=self.components.tolist())
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "Projection":
+        return cls(payload["method"], int(payload["dim"]), payload.get("mean"), payload.get("components"))
+
+
+class ProjectionStore:
+    """
+    Process-wide cache of the projections of collection versions.
+
+    A projection is stored in the collection version it was fitted for
+    (see QdrantStore.save_projection), so every process and host applies
+    the same one. Versions are immutable once serving, so a projection, or
+    its absence, is read once per version and kept until the version is
+    deleted.
+    """
+
+    def __init__(self):
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def get(self, collection_name: str, load):
+        """
+        The projection of a collection version, or None.
+
+        Args:
+            collection_name (str): The version.
+            load (callable): Reads the projection of the version (or None)
+                when it is not cached yet; nothing is cached if it raises.
+        """
+        with self._lock:
+            if collection_name in self._loaded:
+                return self._loaded[collection_name]
+        projection = load()
+        with self._lock:
+            return self._loaded.setdefault(collection_name, projection)
+
+    def put(self, collection_name: str, projection: Projection):
+        with self._lock:
+            self._loaded[collection_name] = projection
+
+    def delete(self, collection_name: str):
+        with self._lock:
+            self._loaded.pop(collection_name, None)
+
+
+def projection_report(vectors, projections: list, k: int = 10, queries: int = 100, noise: float = 0.5,
+                      seed: int = 0) -> list:
+    """
+    Recall@k of projected search against full-dimension search.
+
+    Queries are sampled vectors with a random perturbation; the exact top-k
+    over the sample at full dimension is compared with the top-k after
+    projecting both sides.
+
+    Args:
+        vectors: (n, full dim) embeddings of a corpus sample.
+        projections (list): Fitted projections to evaluate.
+        k (int): Cut-off of recall@k.
+        queries (int): Number of queries.
+        noise (float): Norm of the perturbation added to each query.
+        seed (int): Random seed.
+
+    Returns:
+        list: One dict per projection with "projection" (spec), "dim",
+        "recall_at_k", "bytes_per_vector" and "reduction" (float32 storage).
+    """
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False)
+    perturbation = rng.standard_normal((len(picks), vectors.shape[1])).astype(np.float32)
+    perturbation *= noise / np.linalg.norm(perturbation, axis=1, keepdims=True)
+    query_vectors = vectors[picks] + perturbation
+
+    def top_k(matrix, query_matrix):
+        scores = _normalize(query_matrix) @ matrix.T
+        return [list(np.argsort(-row)[:k]) for row in scores]
+
+    exact = top_k(vectors, query_vectors)
+    report = []
+    for projection in projections:
+        found = top_k(projection.apply(vectors), projection.apply(query_vectors))
+        report.append({
+            "projection": f"{projection.method}:{projection.dim}",
+            "dim": projection.dim,
+            "recall_at_k": round(recall_at_k(exact, found, k), 4),
+            "bytes_per_vector": projection.dim * 4,
+            "reduction": round(vectors.shape[1] / projection.dim, 2),
+        })
+    return report
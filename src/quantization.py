@@ -0,0 +1,166 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# Number of set bits of every byte value, for Hamming distances on packed codes
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int32)
+
+
+def quantization_settings():
+    """
+    Vector quantization settings from the environment.
+
+    Returns:
+        dict: "mode" (vector_quantization: none, int8 or binary) and the
+        "oversampling" factor of the quantized candidate search
+        (quantization_oversampling).
+    """
+    mode = os.getenv('vector_quantization', "none").strip().lower()
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown vector_quantization mode: {mode}")
+    return {"mode": mode, "oversampling": float(os.getenv('quantization_oversampling', "3.0"))}
+
+
+def bytes_per_vector(mode: str, dim: int) -> int:
+    """
+    RAM needed per vector by a quantization mode.
+
+    Args:
+        mode (str): none, int8 or binary.
+        dim (int): Vector dimension.
+
+    Returns:
+        int: Bytes per vector (int8 includes a float32 scale).
+    """
+    if mode == "int8":
+        return dim + 4
+    if mode == "binary":
+        return (dim + 7) // 8
+    return dim * 4
+
+
+class Int8Codes:
+    """
+    Scalar int8 codes with one float32 scale per vector (about 4x smaller).
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.codes = np.zeros((0, dim), dtype=np.int8)
+        self.scales = np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def add(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        peaks = np.abs(vectors).max(axis=1)
+        peaks[peaks == 0] = 1
+        codes = np.round(vectors / peaks[:, None] * 127).astype(np.int8)
+        self.codes = np.concatenate([self.codes, codes])
+        self.scales = np.concatenate([self.scales, (peaks / 127).astype(np.float32)])
+
+    def scores(self, query, block: int = 8192) -> np.ndarray:
+        """Approximate dot products of every stored vector with the query."""
+        query = np.asarray(query, dtype=np.float32)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        # Integer matrix products do not use BLAS; widen one block at a time.
+        for start in range(0, len(self.codes), block):
+            scores[start:start + block] = self.codes[start:start + block].astype(np.float32) @ query
+        return scores * self.scales
+
+
+class BinaryCodes:
+    """
+    One sign bit per dimension (32x smaller); similarity is the negated Hamming distance.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.codes = np.zeros((0, (dim + 7) // 8), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def add(self, vectors):
+        self.codes = np.concatenate([self.codes, np.packbits(np.asarray(vectors) > 0, axis=1)])
+
+    def scores(self, query) -> np.ndarray:
+        """Approximate similarities of every stored vector with the query."""
+        packed = np.packbits(np.asarray(query) > 0)
+        return -_POPCOUNT[np.bitwise_xor(self.codes, packed)].sum(axis=1).astype(np.float32)
+
+
+def make_codes(mode: str, dim: int):
+    """
+    Empty code store for a quantization mode.
+
+    Args:
+        mode (str): int8 or binary.
+        dim (int): Vector dimension.
+
+    Returns:
+        Int8Codes or BinaryCodes: The code store.
+    """
+    if mode == "int8":
+        return Int8Codes(dim)
+    if mode == "binary":
+        return BinaryCodes(dim)
+    raise ValueError(f"No codes for quantization mode: {mode}")
+
+
+def rescored_top_k(codes, vectors, query, k: int, oversampling: float, alive=None):
+    """
+    Top-k search on quantized codes, rescored with the original vectors.
+
+    The k * oversampling best candidates by approximate score are rescored
+    exactly, which recovers most of the recall lost to quantization while
+    reading only a few full-precision rows.
+
+    Args:
+        codes (Int8Codes or BinaryCodes): Codes of the rows of vectors.
+        vectors: Full-precision (normalized) vector matrix.
+        query: Normalized query vector.
+        k (int): Number of results.
+        oversampling (float): Candidate multiplier.
+        alive: Optional boolean mask of rows that may be returned.
+
+    Returns:
+        tuple: (rows, similarities), most similar first.
+    """
+    approximate = codes.scores(query)
+    if alive is not None:
+        approximate[~alive[:len(approximate)]] = -np.inf
+    eligible = int(np.isfinite(approximate).sum())
+    k = min(k, eligible)
+    if k == 0:
+        return np.array([], dtype=np.int64), np.array([])
+    candidates = min(eligible, max(k, int(np.ceil(k * oversampling))))
+    rows = np.argpartition(-approximate, candidates - 1)[:candidates]
+    rows = np.sort(rows)
+    similarities = np.asarray(vectors[rows] @ np.asarray(query, dtype=np.float32))
+    best = np.argsort(-similarities)[:k]
+    return rows[best], similarities[best]
+
+
+def recall_at_k(exact: list, approximate: list, k: int) -> float:
+    """
+    Mean recall@k of approximate results against exact ones.
+
+    Args:
+        exact (list): Exact result id lists, one per query.
+        approximate (list): Approximate result id lists, one per query.
+        k (int): Cut-off.
+
+    Returns:
+        float: Mean fraction of the exact top-k found in the approximate top-k.
+    """
+    recalls = [
+        len(set(truth[:k]) & set(found[:k])) / max(1, min(k, len(truth)))
+        for truth, found in zip(exact, approximate)
+    ]
+    return float(np.mean(recalls)) if recalls else 0.0
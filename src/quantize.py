@@ -0,0 +1,96 @@
+"""
+Convert a collection to another vector quantization mode and measure the trade-off.
+
+    python -m src.quantize --mode int8
+    python -m src.quantize --mode binary --collection rag --k 10 --queries 200
+
+The report (JSON on stdout) gives RAM per vector with and without
+quantization and the recall@k and latency of quantized search against an
+exact search, on queries made by perturbing stored vectors.
+"""
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from src import registry
+from src.quantization import QUANTIZATION_MODES, bytes_per_vector, recall_at_k
+from src.vector_store import vector_backend
+from custom_logger import logger
+
+
+def measure_quantization(store, mode: str, k: int = 10, queries: int = 100, noise: float = 0.5, seed: int = 0) -> dict:
+    """
+    Measure the memory and recall trade-off of a store's current quantization.
+
+    Args:
+        store (VectorStore): The store, already set to the mode.
+        mode (str): The quantization mode in effect.
+        k (int): Cut-off of recall@k.
+        queries (int): Number of queries.
+        noise (float): Norm of the random perturbation added to each sampled vector.
+        seed (int): Random seed of the perturbations.
+
+    Returns:
+        dict: The report.
+    """
+    sample = store.sample_vectors(queries)
+    if not len(sample):
+        raise ValueError("The collection has no vectors to measure.")
+    dim = sample.shape[1]
+    rng = np.random.default_rng(seed)
+    sample = sample / np.linalg.norm(sample, axis=1, keepdims=True)
+    perturbation = rng.standard_normal(sample.shape).astype(np.float32)
+    perturbation *= noise / np.linalg.norm(perturbation, axis=1, keepdims=True)
+    query_vectors = sample + perturbation
+
+    exact, approximate, exact_seconds, approximate_seconds = [], [], 0.0, 0.0
+    for vector in query_vectors:
+        started = time.perf_counter()
+        exact.append([doc.id for doc, _ in store.search(vector, k, exact=True, projected=True)])
+        exact_seconds += time.perf_counter() - started
+        started = time.perf_counter()
+        approximate.append([doc.id for doc, _ in store.search(vector, k, projected=True)])
+        approximate_seconds += time.perf_counter() - started
+
+    full, quantized = bytes_per_vector("none", dim), bytes_per_vector(mode, dim)
+    return {
+        "mode": mode,
+        "dim": dim,
+        "queries": len(query_vectors),
+        "k": k,
+        "recall_at_k": round(recall_at_k(exact, approximate, k), 4),
+        "bytes_per_vector": {"none": full, mode: quantized},
+        "ram_reduction": round(full / quantized, 1),
+        "exact_ms": round(1000 * exact_seconds / len(query_vectors), 3),
+        "quantized_ms": round(1000 * approximate_seconds / len(query_vectors), 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Convert a collection to a vector quantization mode.")
+    parser.add_argument("--mode", choices=QUANTIZATION_MODES, required=True)
+    parser.add_argument("--collection", default=registry.COLLECTION_NAME)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    try:
+        store = registry.get_store(collection_name=args.collection)
+        if not store.exists():
+            logger.error(f"Collection '{args.collection}' does not exist.")
+            return 1
+        # Qdrant converts the collection in place; the local store keeps its
+        # codes in memory, so there only this process is switched and the
+        # mode is made permanent with vector_quantization.
+        store.set_quantization(args.mode)
+        report = measure_quantization(store, args.mode, k=args.k, queries=args.queries)
+        report.update(collection=args.collection, backend=vector_backend())
+        print(json.dumps(report, indent=2))
+        return 0
+    finally:
+        registry.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
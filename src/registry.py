@@ -0,0 +1,575 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from src.embedding_cache import CachedEmbeddings, cache_from_env
+from src.embedding_scheduler import scheduler_from_env
+from src.answer_cache import answer_cache_from_env
+from src.jobs import job_queue_from_env
+from src.admission import SingleFlight, admission_from_env
+from src.vector_store import QdrantStore, vector_backend, qdrant_settings_missing
+from src.local_store import local_store_from_env
+from src.lexical_index import lexical_index_from_env, sync_lexical_index as sync_index
+from src.rerank import rerank_settings
+from src.quantization import quantization_settings
+from src.onnx_embeddings import embedding_backend, onnx_embeddings_from_env
+from src.projection import ProjectionStore
+from src.telemetry import span
+from custom_logger import logger
+
+load_dotenv()
+
+# The model stacks (torch, Sentence-Transformers, LangChain integrations) are
+# imported by the factories that build them, so importing the registry, and
+# the app, stays fast; warm_up() pays for them before serving if asked to.
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+LLM_MODEL_NAME = "llama-3.1-8b-instant"
+COLLECTION_NAME = "rag"
+
+# Process-wide stores; every entry is created once and shared by the
+# FastAPI app, the Streamlit app and main.py.
+_lock = threading.RLock()
+_embeddings = {}
+_dimensions = {}
+_batched_embeddings = {}
+_cached_embeddings = {}
+_sentence_transformers = {}
+_cross_encoders = {}
+_qdrant_clients = {}
+_async_qdrant_clients = {}
+_stores = {}
+_lexical_indexes = {}
+_executors = {}
+_llms = {}
+_chains = {}
+_answer_caches = {}
+_job_queues = {}
+_admission = {}
+_projections = {}
+# (id of a store, key) -> lock serializing the build of that entry
+_building = {}
+
+# Progress of warm_up(), reported by readiness()
+_warm_up_state = {"status": "cold", "started_at": None, "finished_at": None, "error": None}
+
+PREWARM_MODES = ("blocking", "background", "off")
+
+
+def _get_or_create(store: dict, key, factory):
+    """
+    Return the entry stored under key, building it with factory on first use.
+
+    The factory runs under a lock of its own entry, not the registry lock,
+    so loading one model neither blocks other entries nor component_stats.
+
+    Args:
+        store (dict): One of the registry stores.
+        key: Hashable key identifying the entry.
+        factory (callable): Zero-argument callable building the entry.
+
+    Returns:
+        The shared entry.
+    """
+    entry = store.get(key)
+    if entry is not None:
+        return entry
+    with _lock:
+        entry = store.get(key)
+        if entry is not None:
+            return entry
+        entry_lock = _building.setdefault((id(store), key), threading.RLock())
+    with entry_lock:
+        entry = store.get(key)
+        if entry is None:
+            entry = factory()
+            with _lock:
+                store[key] = entry
+                _building.pop((id(store), key), None)
+        return entry
+
+
+def get_embeddings(model_name: str = EMBEDDING_MODEL_NAME):
+    """
+    Get the shared LangChain embeddings wrapper for a model.
+
+    The embedding_backend environment variable selects Sentence-Transformers
+    on PyTorch ("torch", default) or an ONNX Runtime export of the model
+    ("onnx", or "onnx-int8" with int8 weights).
+
+    Args:
+        model_name (str): Hugging Face model name.
+
+    Returns:
+        Embeddings: The loaded embeddings model.
+    """
+    def factory():
+        backend = embedding_backend()
+        logger.info("Loading embedding model %s (%s)", model_name, backend)
+        with span("load_embedding_model"):
+            if backend != "torch":
+                return onnx_embeddings_from_env(model_name, quantized=backend == "onnx-int8")
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            return HuggingFaceEmbeddings(model_name=model_name)
+
+    return _get_or_create(_embeddings, model_name, factory)
+
+
+def embedding_dimension(model_name: str = EMBEDDING_MODEL_NAME) -> int:
+    """
+    Dimension of the embeddings of a model, measured once.
+
+    Collections are created for this size, so changing the embedding model
+    needs no schema edit (but a reindex, see src.reindex).
+
+    Returns:
+        int: The number of components of an embedding.
+    """
+    return _get_or_create(_dimensions, model_name, lambda: len(get_embeddings(model_name).embed_query("dimension")))
+
+
+def get_batched_embeddings(model_name: str = EMBEDDING_MODEL_NAME):
+    """
+    Get the shared micro-batching scheduler in front of an embeddings model.
+
+    Args:
+        model_name (str): Hugging Face model name.
+
+    Returns:
+        MicroBatchEmbeddings: Embeddings that coalesce concurrent calls.
+    """
+    return _get_or_create(_batched_embeddings, model_name, lambda: scheduler_from_env(get_embeddings(model_name)))
+
+
+def get_cached_embeddings(model_name: str = EMBEDDING_MODEL_NAME):
+    """
+    Get the shared embeddings wrapper backed by the persistent embedding cache.
+
+    Args:
+        model_name (str): Hugging Face model name.
+
+    Returns:
+        CachedEmbeddings: Embeddings that only send cache misses to the model,
+            through the micro-batching scheduler.
+    """
+    def factory():
+        # Vectors of the int8 model differ slightly, so they get their own cache.
+        backend = embedding_backend()
+        cache_name = model_name if backend != "onnx-int8" else f"{model_name}@{backend}"
+        return CachedEmbeddings(get_batched_embeddings(model_name), cache_from_env(cache_name))
+
+    return _get_or_create(_cached_embeddings, model_name, factory)
+
+
+def get_sentence_transformer(model_name: str = "all-MiniLM-L6-v2"):
+    """
+    Get the shared raw Sentence-Transformers model.
+
+    Args:
+        model_name (str): Sentence-Transformers model name.
+
+    Returns:
+        SentenceTransformer: The loaded model.
+    """
+    def factory():
+        logger.info("Loading sentence transformer %s", model_name)
+        with span("load_sentence_transformer"):
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name)
+
+    return _get_or_create(_sentence_transformers, model_name, factory)
+
+
+def get_cross_encoder(model_name: str):
+    """
+    Get the shared cross-encoder used for reranking.
+
+    Args:
+        model_name (str): Hugging Face cross-encoder model name.
+
+    Returns:
+        CrossEncoder: The loaded model, on CPU.
+    """
+    def factory():
+        logger.info("Loading cross-encoder %s", model_name)
+        with span("load_cross_encoder"):
+            from sentence_transformers import CrossEncoder
+            return CrossEncoder(model_name, device="cpu")
+
+    return _get_or_create(_cross_encoders, model_name, factory)
+
+
+def get_qdrant_client(qdrant_url: str, qdrant_api_key: str, prefer_grpc: bool = False):
+    """
+    Get a pooled Qdrant client for the given endpoint.
+
+    Args:
+        qdrant_url (str): The URL of the Qdrant instance.
+        qdrant_api_key (str): The API key for authentication.
+        prefer_grpc (bool): Whether to talk gRPC instead of REST.
+
+    Returns:
+        QdrantClient: The shared client.
+    """
+    def factory():
+        logger.info("Connecting to Qdrant at %s", qdrant_url)
+        return QdrantClient(url=qdrant_url, api_key=qdrant_api_key, prefer_grpc=prefer_grpc, timeout=60)
+
+    return _get_or_create(_qdrant_clients, (qdrant_url, qdrant_api_key, prefer_grpc), factory)
+
+
+def get_async_qdrant_client(qdrant_url: str, qdrant_api_key: str, prefer_grpc: bool = True):
+    """
+    Get a pooled async Qdrant client for the given endpoint, for use on the event loop.
+
+    Args:
+        qdrant_url (str): The URL of the Qdrant instance.
+        qdrant_api_key (str): The API key for authentication.
+        prefer_grpc (bool): Whether to talk gRPC instead of REST.
+
+    Returns:
+        AsyncQdrantClient: The shared client.
+    """
+    def factory():
+        logger.info("Connecting to Qdrant at %s (async)", qdrant_url)
+        return AsyncQdrantClient(url=qdrant_url, api_key=qdrant_api_key, prefer_grpc=prefer_grpc, timeout=60)
+
+    return _get_or_create(_async_qdrant_clients, (qdrant_url, qdrant_api_key, prefer_grpc), factory)
+
+
+def qdrant_prefer_grpc() -> bool:
+    """Whether the shared Qdrant clients talk gRPC (qdrant_prefer_grpc, default true)."""
+    return os.getenv('qdrant_prefer_grpc', "true").strip().lower() in ("1", "true", "yes")
+
+
+def get_store(qdrant_url: str = None, qdrant_api_key: str = None, collection_name: str = COLLECTION_NAME):
+    """
+    Get the shared vector store of a collection on the configured backend.
+
+    The vector_store environment variable selects the remote Qdrant
+    collection ("qdrant", default) or the embedded LocalVectorStore ("local").
+    Qdrant collections are versioned behind an alias of collection_name
+    (see QdrantStore and src.reindex).
+
+    Args:
+        qdrant_url (str): The URL of the Qdrant instance (default: qdrant_url).
+        qdrant_api_key (str): The API key for authentication (default: qdrant_api).
+        collection_name (str): The collection.
+
+    Returns:
+        VectorStore: The shared store.
+
+    Raises:
+        ValueError: If the Qdrant backend is selected but not configured.
+    """
+    if vector_backend() == "local":
+        return _get_or_create(_stores, ("local", collection_name), lambda: local_store_from_env(collection_name))
+
+    qdrant_url = qdrant_url or os.getenv('qdrant_url')
+    qdrant_api_key = qdrant_api_key or os.getenv('qdrant_api')
+    if qdrant_settings_missing(qdrant_url, qdrant_api_key):
+        raise ValueError("One or more environment variables are missing.")
+    settings = quantization_settings()
+    prefer_grpc = qdrant_prefer_grpc()
+    return _get_or_create(
+        _stores,
+        ("qdrant", qdrant_url, qdrant_api_key, collection_name),
+        lambda: QdrantStore(
+            get_qdrant_client(qdrant_url, qdrant_api_key, prefer_grpc=prefer_grpc),
+            collection_name,
+            quantization=settings["mode"],
+            oversampling=settings["oversampling"],
+            # The async client is only built when the event loop first needs it
+            async_client_factory=lambda: get_async_qdrant_client(qdrant_url, qdrant_api_key, prefer_grpc=prefer_grpc),
+            metadata_ttl=float(os.getenv('qdrant_metadata_ttl', "30")),
+            versioned=True,
+            projections=get_projections(),
+        ),
+    )
+
+
+def get_projections():
+    """
+    Get the shared cache of the projections fitted for collection versions.
+
+    Returns:
+        ProjectionStore: The process-wide projection cache.
+    """
+    return _get_or_create(_projections, "projections", ProjectionStore)
+
+
+def get_lexical_index(collection_name: str = COLLECTION_NAME):
+    """
+    Get the shared BM25 index of a collection.
+
+    Args:
+        collection_name (str): The collection.
+
+    Returns:
+        BM25Index: The shared lexical index.
+    """
+    return _get_or_create(_lexical_indexes, collection_name, lambda: lexical_index_from_env(collection_name))
+
+
+def sync_lexical_index(collection_name: str = COLLECTION_NAME):
+    """
+    Catch this host's lexical index up with the shared vector store (see src.lexical_index.sync_lexical_index).
+
+    Skipped when the vector store is not configured or the collection does
+    not exist; failures are logged, not raised, so startup goes on.
+
+    Args:
+        collection_name (str): The collection.
+
+    Returns:
+        dict: The sync counts, or None if skipped or failed.
+    """
+    if qdrant_settings_missing(os.getenv('qdrant_url'), os.getenv('qdrant_api')):
+        return None
+    try:
+        store = get_store(collection_name=collection_name)
+        if not store.exists():
+            return None
+        with span("lexical_sync"):
+            return sync_index(get_lexical_index(collection_name), store)
+    except Exception as e:
+        logger.error("Error while syncing the lexical index; continuing with it as is: %s", str(e))
+        return None
+
+
+def get_search_executor():
+    """
+    Get the shared thread pool running retrieval stages concurrently.
+
+    Returns:
+        ThreadPoolExecutor: The process-wide search pool.
+    """
+    return _get_or_create(
+        _executors, "search",
+        lambda: ThreadPoolExecutor(max_workers=int(os.getenv('search_workers', "8")), thread_name_prefix="search"),
+    )
+
+
+def get_llm(groq_api_key: str, model: str = LLM_MODEL_NAME):
+    """
+    Get the shared ChatGroq client.
+
+    Args:
+        groq_api_key (str): The Groq API key.
+        model (str): The Groq model name.
+
+    Returns:
+        ChatGroq: The shared LLM client.
+    """
+    def factory():
+        from langchain_groq import ChatGroq
+        return ChatGroq(model=model, api_key=groq_api_key, temperature=0, max_tokens=None, timeout=None, max_retries=2)
+
+    return _get_or_create(_llms, (groq_api_key, model), factory)
+
+
+def get_chain(key, factory):
+    """
+    Get a compiled chain, building it with factory on first use.
+
+    Args:
+        key: Hashable key identifying the chain.
+        factory (callable): Zero-argument callable building the chain.
+
+    Returns:
+        Runnable: The shared chain.
+    """
+    return _get_or_create(_chains, key, factory)
+
+
+def get_answer_cache():
+    """
+    Get the shared semantic answer cache.
+
+    Returns:
+        AnswerCache: The process-wide answer cache.
+    """
+    return _get_or_create(_answer_caches, COLLECTION_NAME, lambda: answer_cache_from_env(COLLECTION_NAME))
+
+
+def get_job_queue():
+    """
+    Get the shared background ingestion queue.
+
+    Returns:
+        JobQueue: The process-wide job queue.
+    """
+    return _get_or_create(_job_queues, "ingest", job_queue_from_env)
+
+
+def get_llm_admission():
+    """
+    Get the shared admission controller of LLM calls.
+
+    Returns:
+        AdmissionController: The process-wide controller.
+    """
+    return _get_or_create(_admission, "llm", admission_from_env)
+
+
+def get_single_flight():
+    """
+    Get the shared coalescer of identical in-flight questions.
+
+    Returns:
+        SingleFlight: The process-wide coalescer.
+    """
+    return _get_or_create(_admission, "questions", SingleFlight)
+
+
+def component_stats() -> dict:
+    """
+    Statistics of the shared components created so far.
+
+    Nothing is created by this call, so it is cheap and safe to scrape.
+
+    Returns:
+        dict: "answer_cache" and "embedding_scheduler" statistics (dicts
+        keyed like the components' stats()), the number of points per
+        local vector store under "store_points", and the load of the LLM
+        admission controller under "llm_admission" (empty until created).
+    """
+    with _lock:
+        return {
+            "answer_cache": {key: cache.stats() for key, cache in _answer_caches.items()},
+            "embedding_scheduler": {key: scheduler.stats() for key, scheduler in _batched_embeddings.items()},
+            "store_points": {key[1]: len(store) for key, store in _stores.items() if key[0] == "local"},
+            "llm_admission": _admission["llm"].stats() if "llm" in _admission else {},
+        }
+
+
+def prewarm_mode() -> str:
+    """
+    How the app warms the registry at startup (prewarm).
+
+    Returns:
+        str: "background" (default: serve at once, warm up in a thread and
+        report readiness when done), "blocking" (warm up before serving) or
+        "off" (build everything lazily on first use).
+    """
+    mode = os.getenv('prewarm', "background").strip().lower()
+    if mode not in PREWARM_MODES:
+        raise ValueError(f"Unknown prewarm mode: {mode}")
+    return mode
+
+
+def warm_up():
+    """
+    Load the models, clients and chains used on the request path.
+
+    Entries whose configuration is missing from the environment are skipped,
+    and failures are logged rather than raised, so warm-up never prevents
+    the application from starting; anything that failed to load is built
+    lazily on first use instead.
+
+    Returns:
+        bool: True if every configured entry was warmed up.
+    """
+    _warm_up_state.update(status="warming", started_at=time.time(), finished_at=None, error=None)
+    try:
+        logger.info("Warming up model registry...")
+        embeddings_model = get_embeddings()
+        # The first forward pass is much slower than the rest; pay it here.
+        embeddings_model.embed_query("warm up")
+
+        reranking = rerank_settings()
+        if reranking["enabled"]:
+            get_cross_encoder(reranking["model"]).predict([("warm up", "warm up")])
+
+        groq_api_key = os.getenv('groq_api')
+
+        if qdrant_settings_missing(os.getenv('qdrant_url'), os.getenv('qdrant_api')):
+            logger.warning("Qdrant environment variables are missing; skipping client warm-up.")
+        else:
+            get_store()
+            get_cached_embeddings()
+
+        if groq_api_key:
+            from src.retrieve import get_answer_chain
+            get_answer_chain(groq_api_key)
+        else:
+            logger.warning("Groq environment variable is missing; skipping LLM warm-up.")
+
+        _warm_up_state.update(status="ready", finished_at=time.time())
+        logger.info("Model registry warmed up in %.2fs.", _warm_up_state["finished_at"] - _warm_up_state["started_at"])
+        return True
+    except Exception as e:
+        _warm_up_state.update(status="failed", finished_at=time.time(), error=str(e))
+        logger.error("Error while warming up model registry; continuing without it: %s", str(e))
+        return False
+
+
+def readiness() -> dict:
+    """
+    Whether the process is ready to serve, for the readiness probe.
+
+    Ready once warm-up has finished, or at once when prewarm is off. A
+    failed warm-up still reports ready, "degraded": what failed to load is
+    built lazily on first use, which needs requests to be routed here. Takes
+    no lock, so it answers even while a model is being loaded.
+
+    Returns:
+        dict: "ready", "degraded", warm-up "status" (cold, warming, ready or
+        failed), "warm_up_seconds", "error", and the names of the "loaded" models.
+    """
+    state = dict(_warm_up_state)
+    finished, started = state["finished_at"], state["started_at"]
+    return {
+        "ready": state["status"] in ("ready", "failed") or prewarm_mode() == "off",
+        "degraded": state["status"] == "failed",
+        "status": state["status"],
+        "warm_up_seconds": round(finished - started, 3) if finished and started else None,
+        "error": state["error"],
+        "loaded": {
+            "embeddings": sorted(list(_embeddings)),
+            "cross_encoders": sorted(list(_cross_encoders)),
+            "llms": sorted(model for _, model in list(_llms)),
+            "stores": len(_stores),
+        },
+    }
+
+
+def shutdown():
+    """
+    Close pooled clients and drop every registry entry.
+    """
+    with _lock:
+        for job_queue in _job_queues.values():
+            job_queue.shutdown()
+        for scheduler in _batched_embeddings.values():
+            scheduler.close()
+        for store in _stores.values():
+            store.close()
+        for executor in _executors.values():
+            executor.shutdown(wait=True)
+        for client in _qdrant_clients.values():
+            try:
+                client.close()
+            except Exception as e:
+                logger.warning("Error closing Qdrant client: %s", str(e))
+        for store in (_embeddings, _dimensions, _batched_embeddings, _cached_embeddings, _sentence_transformers,
+                      _cross_encoders, _qdrant_clients, _async_qdrant_clients, _stores, _lexical_indexes, _executors,
+                      _llms, _chains, _answer_caches, _job_queues, _admission, _projections):
+            store.clear()
+        _building.clear()
+        _warm_up_state.update(status="cold", started_at=None, finished_at=None, error=None)
+    logger.info("Model registry shut down.")
+
+
+async def ashutdown():
+    """
+    shutdown() for the event loop: also closes the async Qdrant clients, which need the loop to close.
+    """
+    for client in list(_async_qdrant_clients.values()):
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning("Error closing async Qdrant client: %s", str(e))
+    shutdown()
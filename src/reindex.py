@@ -0,0 +1,226 @@
+"""
+Rebuild a collection as a new version and swap it in without downtime.
+
+    python -m src.reindex
+    python -m src.reindex --batch-size 512 --keep 0
+    python -m src.reindex --projection pca:256
+    python -m src.reindex --report 64,128,256,384
+
+The live version keeps serving while the next one (rag_v<N+1>) is built
+from its chunks, re-embedded with the embedding model of the registry
+(EMBEDDING_MODEL_NAME), so a model change needs no re-upload of the PDFs.
+The API and the Streamlit app embed questions and uploads with the same
+model, so after a model change they are redeployed with it once the new
+version is live. The new version is loaded with HNSW indexing deferred and
+unacknowledged upserts, then indexed once. Chunks written to or deleted
+from the live version meanwhile are caught up in a last pass after
+indexing, right before the alias is switched to the new version in one
+atomic request. Old versions beyond --keep are deleted. The POST /reindex
+endpoint runs the same as a background job.
+
+With a projection (--projection or vector_projection), the new version
+stores reduced vectors: PCA is fitted on the embeddings of a corpus sample,
+saved with the version and applied to every chunk and query vector, and
+the summary reports its recall@k against full-dimension search on that
+sample. --report compares PCA and truncation at several sizes without
+building anything, to choose one.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from src import registry
+from src.pipeline import prefetch
+from src.projection import PROJECTION_METHODS, Projection, parse_projection, projection_report, projection_settings
+from src.vector_store import QdrantStore, version_name
+from src.telemetry import span
+from custom_logger import logger
+
+
+def live_store(collection_name: str) -> QdrantStore:
+    """The store of a collection that can be reindexed; raises ValueError otherwise."""
+    store = registry.get_store(collection_name=collection_name)
+    if not isinstance(store, QdrantStore):
+        raise ValueError("Reindexing needs the Qdrant backend (vector_store=qdrant).")
+    if not store.exists():
+        raise ValueError(f"Collection '{collection_name}' does not exist; there is nothing to reindex.")
+    return store
+
+
+def sample_embeddings(source: QdrantStore, embeddings, count: int, batch_size: int = 256) -> np.ndarray:
+    """
+    Full-dimension embeddings of the first count chunks of a collection.
+
+    They go through the embedding cache, so the copy that follows does not
+    embed these chunks again.
+    """
+    texts = []
+    for page in source.iter_points(batch_size):
+        texts.extend(payload.get("page_content", "") for _, payload in page)
+        if len(texts) >= count:
+            break
+    with span("reindex_embed"):
+        return np.asarray(embeddings.embed_documents(texts[:count]), dtype=np.float32)
+
+
+def projection_candidates(dims: list, collection_name: str = registry.COLLECTION_NAME, k: int = 10,
+                          sample: int = None) -> dict:
+    """
+    Recall@k of every projection method at several sizes, on a sample of the live version.
+
+    Args:
+        dims (list): Candidate dimensions.
+        collection_name (str): The collection (alias).
+        k (int): Cut-off of recall@k.
+        sample (int): Chunks in the sample (default: projection_fit_sample).
+
+    Returns:
+        dict: The full "dim", the "sample" size and the "report" (see projection_report).
+    """
+    store = live_store(collection_name)
+    source = store.sibling(store.target() or collection_name)
+    vectors = sample_embeddings(source, registry.get_cached_embeddings(),
+                                sample or projection_settings()["sample"])
+    projections = [Projection.fit(method, dim, vectors) for dim in dims for method in PROJECTION_METHODS
+                   if dim < vectors.shape[1]]
+    return {"dim": vectors.shape[1], "sample": len(vectors), "report": projection_report(vectors, projections, k=k)}
+
+
+def reindex(collection_name: str = registry.COLLECTION_NAME, batch_size: int = 256, keep: int = None,
+            projection: str = None, progress=None) -> dict:
+    """
+    Build the next version of a collection and point its alias at it.
+
+    Args:
+        collection_name (str): The collection (alias) to rebuild.
+        batch_size (int): Chunks embedded and upserted per batch.
+        keep (int): Previous versions kept for rollback (default: reindex_keep_versions).
+        projection (str): Projection spec of the new version, e.g. "pca:256"
+            or "none" (default: vector_projection).
+        progress (Job): Optional progress reporter.
+
+    Returns:
+        dict: The "previous" and new "version" collections, its vector
+        "dim", the "projection" report, the points copied and removed, the
+        deleted old versions and the throughput.
+
+    Raises:
+        ValueError: If the backend is not Qdrant or the collection does not exist.
+    """
+    started = time.perf_counter()
+    keep = int(os.getenv('reindex_keep_versions', "1")) if keep is None else keep
+    settings = projection_settings()
+    spec = parse_projection(settings["spec"] if projection is None else projection)
+    store = live_store(collection_name)
+
+    source = store.sibling(store.target() or collection_name)
+    target = store.sibling(version_name(collection_name, max(store.versions(), default=0) + 1))
+    vector_size = registry.embedding_dimension()
+    embeddings = registry.get_cached_embeddings()
+    report = None
+    if spec is not None:
+        sample = sample_embeddings(source, embeddings, settings["sample"], batch_size)
+        fitted = Projection.fit(*spec, sample)
+        report = projection_report(sample, [fitted])[0]
+        vector_size = fitted.dim
+    logger.info("Reindexing '%s' into '%s' (%d dimensions, %s)", source.collection_name, target.collection_name,
+                vector_size, registry.EMBEDDING_MODEL_NAME)
+
+    store.create(target.collection_name, vector_size, bulk=True)
+    copied, live = set(), set()
+
+    def embed(page: list):
+        with span("reindex_embed"):
+            vectors = embeddings.embed_documents([payload.get("page_content", "") for _, payload in page])
+        if progress is not None:
+            progress.update(chunks_embedded=len(page))
+        return vectors
+
+    def copy(pages, wait: bool = False):
+        for page, vectors in prefetch(((page, embed(page)) for page in pages), maxsize=2):
+            with span("reindex_upsert"):
+                target.upsert([point_id for point_id, _ in page], vectors, [payload for _, payload in page],
+                              wait=wait)
+            copied.update(point_id for point_id, _ in page)
+            if progress is not None:
+                progress.update(points_upserted=len(page))
+
+    def missing():
+        # Chunks written to the live version since they were copied
+        for page in source.iter_points(batch_size):
+            live.update(point_id for point_id, _ in page)
+            page = [(point_id, payload) for point_id, payload in page if point_id not in copied]
+            if page:
+                yield page
+
+    try:
+        if spec is not None:
+            # Stored in the new version before its first chunk, so every chunk is projected
+            target.save_projection(fitted)
+        target.ensure(vector_size)
+        copy(source.iter_points(batch_size))
+        copy(missing())
+        with span("reindex_build_index"):
+            store.finish_bulk_load(target.collection_name)
+        # Indexing can take long: catch up once more right before the switch,
+        # so that chunks written or deleted meanwhile are not lost.
+        live.clear()
+        copy(missing(), wait=True)
+        removed = sorted(copied - live)
+        target.delete(removed)
+    except Exception:
+        logger.error("Reindexing failed; deleting the partial collection '%s'", target.collection_name)
+        target.drop()
+        raise
+
+    store.switch_alias(target.collection_name)
+    # Cached answers hold question vectors of the previous model
+    registry.get_answer_cache().invalidate()
+    deleted = store.collect_garbage(keep)
+    seconds = time.perf_counter() - started
+    logger.info("Reindexed %d points into '%s' in %.1fs", len(live), target.collection_name, seconds)
+    return {
+        "collection": collection_name,
+        "previous": source.collection_name,
+        "version": target.collection_name,
+        "dim": vector_size,
+        "projection": report,
+        "points": len(live),
+        "removed": len(removed),
+        "deleted_versions": deleted,
+        "seconds": round(seconds, 3),
+        "points_per_second": round(len(copied) / seconds, 1) if seconds else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild a collection as a new version behind its alias.")
+    parser.add_argument("--collection", default=registry.COLLECTION_NAME)
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks embedded and upserted per batch.")
+    parser.add_argument("--keep", type=int, default=None,
+                        help="Previous versions kept for rollback (default: reindex_keep_versions).")
+    parser.add_argument("--projection", default=None,
+                        help="none, pca:<dim> or truncate:<dim> (default: vector_projection).")
+    parser.add_argument("--report", type=lambda value: [int(item) for item in value.split(",") if item],
+                        help="Only report the recall@k of projections to these sizes, e.g. 64,128,256.")
+    parser.add_argument("--k", type=int, default=10, help="Cut-off of the recall@k report.")
+    args = parser.parse_args(argv)
+    try:
+        if args.report:
+            summary = projection_candidates(args.report, args.collection, k=args.k)
+        else:
+            summary = reindex(args.collection, batch_size=args.batch_size, keep=args.keep,
+                              projection=args.projection)
+        print(json.dumps(summary, indent=2))
+        return 0
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    finally:
+        registry.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import os
+import time
+import numpy as np
+from dotenv import load_dotenv
+from custom_logger import logger
+
+load_dotenv()
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def rerank_settings():
+    """
+    Rerank settings from the environment.
+
+    Returns:
+        dict: "enabled" (rerank_enabled), "model" (rerank_model), number of
+        retrieved "candidates" (rerank_candidates) and "top_n" kept (rerank_top_n).
+    """
+    return {
+        "enabled": os.getenv('rerank_enabled', "false").strip().lower() in ("1", "true", "yes"),
+        "model": os.getenv('rerank_model', DEFAULT_RERANK_MODEL),
+        "candidates": int(os.getenv('rerank_candidates', "20")),
+        "top_n": int(os.getenv('rerank_top_n', "5")),
+    }
+
+
+def rerank(cross_encoder, question: str, docs: list, top_n: int):
+    """
+    Keep the top_n documents according to a cross-encoder.
+
+    All (question, chunk) pairs are scored in a single batch; the order of
+    equally scored documents is preserved.
+
+    Args:
+        cross_encoder: Model with a predict(pairs) method, e.g. a
+            sentence_transformers CrossEncoder.
+        question (str): The question.
+        docs (list): The candidate documents.
+        top_n (int): Number of documents to keep.
+
+    Returns:
+        tuple: (kept documents best first, their scores, elapsed milliseconds).
+    """
+    if not docs:
+        return [], [], 0.0
+    start = time.perf_counter()
+    scores = np.asarray(
+        cross_encoder.predict([(question, doc.page_content) for doc in docs], batch_size=len(docs)),
+        dtype=np.float64,
+    )
+    order = np.argsort(-scores, kind="stable")[:top_n]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info("Reranked %d candidates to %d in %.1f ms", len(docs), len(order), elapsed_ms)
+    return [docs[i] for i in order], [float(scores[i]) for i in order], elapsed_ms
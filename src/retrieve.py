@@ -1,21 +1,41 @@
 import os
 import sys
-import requests
+import asyncio
+import contextvars
 from dotenv import load_dotenv
-from langchain.prompts import PromptTemplate
-from langchain_community.vectorstores import Qdrant
-from qdrant_client import QdrantClient
+from langchain_core.prompts import PromptTemplate
 from custom_logger import logger
 from exception import CustomException
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from transformers import AutoTokenizer, AutoModel
-from langchain_groq import ChatGroq
-from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
-from src.preprocessing import load_documents, split_documents  # Assuming this is your existing logic
+from langchain_core.runnables import RunnableLambda
+from src import registry
+from src.hybrid import fuse_results
+from src.rerank import rerank, rerank_settings
+from src.context import pack_context, context_budget, token_counter
+from src.answer_cache import normalize_question
+from src.admission import OverloadedError, coalescing_enabled
+from src.telemetry import span, ANSWER_CACHE, COMPLETION_TOKENS
 
 load_dotenv()
 
+# Define the prompt template for LLM interaction
+prompt = PromptTemplate(
+    template="""# Your role
+                You are an expert at understanding the intent of the questioner and providing optimal answers from the documents.
+
+                # Instruction
+                Your task is to answer the question using the following retrieved context delimited by XML tags.
+
+                <retrieved context>
+                Retrieved Context:
+                {context}
+                </retrieved context>
+
+                # Question:
+                {question}""",
+    input_variables=["context", "question"]
+)
+
 
 def format_docs(docs):
     """
@@ -29,6 +49,531 @@ def format_docs(docs):
     """
     return "\n".join([doc.page_content for doc in docs])
 
+def get_answer_chain(groq_api_key: str):
+    """
+    Get the compiled prompt | LLM | parser chain from the registry.
+
+    Args:
+        groq_api_key (str): The Groq API key.
+
+    Returns:
+        Runnable: The shared answer chain.
+    """
+    return registry.get_chain(
+        ("answer", groq_api_key),
+        lambda: prompt | registry.get_llm(groq_api_key) | StrOutputParser(),
+    )
+
+def source_metadata(docs):
+    """
+    Metadata of the retrieved documents, sent to streaming clients before the answer.
+
+    Args:
+        docs (list): The retrieved documents.
+
+    Returns:
+        list: One metadata dict per document.
+    """
+    return [dict(doc.metadata) for doc in docs]
+
+def retrieval_settings():
+    """
+    Retrieval settings from the environment.
+
+    Returns:
+        dict: "k" documents passed to the LLM (retrieval_k), "fetch_k"
+        candidates per retriever (retrieval_fetch_k), whether BM25 results
+        are fused in ("hybrid", hybrid_search), and for batches the number of
+        concurrent LLM calls ("batch_concurrency", ask_batch_concurrency) and
+        the maximum number of questions ("batch_max_questions",
+        ask_batch_max_questions).
+    """
+    return {
+        "k": int(os.getenv('retrieval_k', "10")),
+        "fetch_k": int(os.getenv('retrieval_fetch_k', "20")),
+        "hybrid": os.getenv('hybrid_search', "true").strip().lower() in ("1", "true", "yes"),
+        "batch_concurrency": int(os.getenv('ask_batch_concurrency', "4")),
+        "batch_max_questions": int(os.getenv('ask_batch_max_questions', "256")),
+    }
+
+def answer_store():
+    """
+    Check the configuration needed to answer.
+
+    Returns:
+        tuple: (groq_api_key, store).
+    """
+    # Environment variables
+    groq_api_key = os.getenv('groq_api')
+
+    if not groq_api_key:
+        raise ValueError("One or more environment variables are missing.")
+    return groq_api_key, registry.get_store()
+
+def no_documents():
+    return CustomException("Sorry, you don't have any documents. First, upload a PDF.", sys)
+
+def start_answer(timings: dict):
+    """
+    Check the configuration and the collection before answering.
+
+    Args:
+        timings (dict): Per-request timings.
+
+    Returns:
+        tuple: (groq_api_key, store).
+    """
+    groq_api_key, store = answer_store()
+    # Check if the collection exists (cached by the store)
+    with span("collection_check", timings):
+        exists = store.exists()
+    if not exists:
+        raise no_documents()
+    return groq_api_key, store
+
+def search_plan():
+    """
+    Number of candidates to retrieve for the configured retrieval.
+
+    Returns:
+        tuple: (settings, reranking settings, k, fetch_k).
+    """
+    settings = retrieval_settings()
+    reranking = rerank_settings()
+    k = reranking["candidates"] if reranking["enabled"] else settings["k"]
+    return settings, reranking, k, max(settings["fetch_k"], k)
+
+def build_context(question: str, dense: list, lexical_hits, store, k: int, reranking: dict, timings: dict,
+                  query_filter=None):
+    """
+    Turn the search results of a question into the context documents.
+
+    Args:
+        question (str): The question.
+        dense (list): (Document, score) pairs of the dense search.
+        lexical_hits (list): (point id, score) pairs of BM25, or None without hybrid search.
+        store (VectorStore): The store, for documents found by BM25 only.
+        k (int): Number of documents kept after fusion.
+        reranking (dict): Rerank settings.
+        timings (dict): Per-request timings.
+        query_filter (SearchFilter): The filter of the dense search, applied to the BM25 hits.
+
+    Returns:
+        list: The packed context documents.
+    """
+    if lexical_hits is not None:
+        with span("fusion", timings):
+            docs = fuse_results(dense, lexical_hits, store, k, query_filter)
+    else:
+        docs = [doc for doc, _ in dense[:k]]
+
+    # Shrink the context to the candidates the cross-encoder scores best
+    if reranking["enabled"]:
+        cross_encoder = registry.get_cross_encoder(reranking["model"])
+        with span("rerank", timings):
+            docs, _, _ = rerank(cross_encoder, question, docs, reranking["top_n"])
+
+    # Merge overlapping chunks, drop duplicates and fit the token budget
+    with span("pack_context", timings):
+        return pack_context(docs, context_budget())
+
+def cached_result(cached: dict, timings: dict):
+    return {"cached": cached, "sources": cached["sources"], "timings": timings}
+
+def lookup_and_embed(question: str, timings: dict, query_filter=None):
+    """
+    The steps of prepare_answer before the dense search.
+
+    Args:
+        question (str): The question to answer.
+        timings (dict): Per-request timings.
+        query_filter (SearchFilter): Optional restriction of the search.
+
+    Returns:
+        tuple: (cached result, None) when the answer cache holds the
+        question; otherwise (None, search state for search_inputs and
+        finish_preparing).
+    """
+    # Exact repeats are answered without embedding or searching
+    answer_cache = registry.get_answer_cache()
+    generation = answer_cache.generation
+    # Cached answers come from the whole collection: filtered questions bypass the cache
+    cacheable = not query_filter
+    if cacheable:
+        with span("answer_cache", timings):
+            cached = answer_cache.lookup_exact(question)
+        if cached is not None:
+            logger.info("Answer served from cache (exact match)")
+            ANSWER_CACHE.inc(result="exact")
+            return cached_result(cached, timings), None
+
+    # Lexical search needs no embedding, so it runs while the question is embedded
+    settings, reranking, k, fetch_k = search_plan()
+    lexical = None
+    if settings["hybrid"]:
+        def lexical_search():
+            with span("lexical_search", timings):
+                return registry.get_lexical_index().search(question, fetch_k)
+        lexical = registry.get_search_executor().submit(contextvars.copy_context().run, lexical_search)
+
+    # Embed the question once; the vector serves both the cache and the search
+    with span("embed_query", timings):
+        question_vector = registry.get_cached_embeddings().embed_query(question)
+
+    if not cacheable:
+        return None, search_state(generation, reranking, k, fetch_k, lexical, question_vector, query_filter)
+    with span("answer_cache", timings):
+        cached = answer_cache.lookup_similar(question_vector)
+    if cached is not None:
+        logger.info("Answer served from cache (similar question)")
+        ANSWER_CACHE.inc(result="similar")
+        return cached_result(cached, timings), None
+    ANSWER_CACHE.inc(result="miss")
+    return None, search_state(generation, reranking, k, fetch_k, lexical, question_vector, query_filter)
+
+def search_state(generation: int, reranking: dict, k: int, fetch_k: int, lexical, question_vector, query_filter):
+    """What the dense search and finish_preparing need from lookup_and_embed."""
+    return {
+        "generation": generation,
+        "reranking": reranking,
+        "k": k,
+        "search_k": fetch_k if lexical is not None else k,
+        "lexical": lexical,
+        "question_vector": question_vector,
+        "query_filter": query_filter,
+    }
+
+def finish_preparing(question: str, state: dict, dense: list, store, groq_api_key: str, timings: dict):
+    """
+    The steps of prepare_answer after the dense search.
+
+    Returns:
+        dict: The prepare_answer result of a cache miss.
+    """
+    lexical_hits = state["lexical"].result() if state["lexical"] is not None else None
+    docs = build_context(question, dense, lexical_hits, store, state["k"], state["reranking"], timings,
+                         state["query_filter"])
+    return {
+        "cached": None,
+        "sources": source_metadata(docs),
+        "timings": timings,
+        "docs": docs,
+        "question_vector": state["question_vector"],
+        "generation": state["generation"],
+        "groq_api_key": groq_api_key,
+        "query_filter": state["query_filter"],
+    }
+
+def prepare_answer(question: str, query_filter=None):
+    """
+    Run everything that precedes answer generation for a question.
+
+    Once the collection is known to exist, serves the question from the
+    answer cache when possible; otherwise embeds it once and retrieves the
+    context documents. With hybrid search the BM25 query runs concurrently
+    with embedding and dense search, and both rankings are fused with
+    reciprocal rank fusion. With reranking enabled, rerank_candidates
+    documents are retrieved and a cross-encoder keeps the rerank_top_n best.
+    The context is then packed into context_max_tokens (see pack_context).
+    A query_filter is pushed down into the dense search, applied to the BM25
+    hits, and bypasses the answer cache.
+
+    Args:
+        question (str): The question to answer.
+        query_filter (SearchFilter): Optional restriction of the search to
+            some documents, pages or ingest times.
+
+    Returns:
+        dict: "cached" ({"answer", "sources"} or None), "sources" and
+        "timings" (stage durations in milliseconds); on a cache miss also
+        "docs", "question_vector", "generation", "groq_api_key" and
+        "query_filter".
+    """
+    # Every stage is timed into the stage histogram and these per-request timings
+    timings = {}
+    groq_api_key, store = start_answer(timings)
+    cached, state = lookup_and_embed(question, timings, query_filter)
+    if cached is not None:
+        return cached
+
+    # Retrieve the context with the shared vector store
+    with span("dense_search", timings):
+        dense = store.search(state["question_vector"], k=state["search_k"], query_filter=query_filter)
+    return finish_preparing(question, state, dense, store, groq_api_key, timings)
+
+async def aprepare_answer(question: str, query_filter=None):
+    """
+    Async variant of prepare_answer for the event loop.
+
+    The collection check and the dense search await the store's async
+    Qdrant client; embedding, BM25, reranking and packing are CPU-bound and
+    run in worker threads.
+
+    Args:
+        question (str): The question to answer.
+        query_filter (SearchFilter): Optional restriction of the search.
+
+    Returns:
+        dict: As prepare_answer.
+    """
+    timings = {}
+    groq_api_key, store = answer_store()
+    with span("collection_check", timings):
+        exists = await store.aexists()
+    if not exists:
+        raise no_documents()
+    cached, state = await asyncio.to_thread(lookup_and_embed, question, timings, query_filter)
+    if cached is not None:
+        return cached
+
+    with span("dense_search", timings):
+        dense = await store.asearch(state["question_vector"], k=state["search_k"], query_filter=query_filter)
+    return await asyncio.to_thread(finish_preparing, question, state, dense, store, groq_api_key, timings)
+
+def prepare_answers(questions: list, query_filter=None):
+    """
+    Batch variant of prepare_answer.
+
+    The collection is checked once, all questions missing from the answer
+    cache are embedded together on the bulk lane of the embedding
+    scheduler (so interactive questions keep priority), searched with one
+    batched vector store request, and their BM25 searches run meanwhile.
+    A failure while building the context of one question only fails that
+    question. A query_filter applies to every question, as in prepare_answer.
+
+    Args:
+        questions (list): The questions, in order.
+        query_filter (SearchFilter): Optional restriction of the searches.
+
+    Returns:
+        tuple: (one prepare_answer result or Exception per question,
+        timings of the shared batch stages).
+    """
+    timings = {}
+    groq_api_key, store = start_answer(timings)
+    answer_cache = registry.get_answer_cache()
+    generation = answer_cache.generation
+    prepared = [None] * len(questions)
+    cacheable = not query_filter
+
+    with span("answer_cache", timings):
+        for i, question in enumerate(questions if cacheable else ()):
+            cached = answer_cache.lookup_exact(question)
+            if cached is not None:
+                ANSWER_CACHE.inc(result="exact")
+                prepared[i] = cached_result(cached, {})
+    pending = [i for i, entry in enumerate(prepared) if entry is None]
+    if not pending:
+        return prepared, timings
+
+    settings, reranking, k, fetch_k = search_plan()
+    lexical = None
+    if settings["hybrid"]:
+        def lexical_search():
+            index = registry.get_lexical_index()
+            with span("lexical_search", timings):
+                return [index.search(questions[i], fetch_k) for i in pending]
+        lexical = registry.get_search_executor().submit(contextvars.copy_context().run, lexical_search)
+
+    with span("embed_query", timings):
+        vectors = registry.get_batched_embeddings().embed_documents([questions[i] for i in pending])
+
+    misses = []
+    with span("answer_cache", timings):
+        for i, vector in zip(pending, vectors):
+            if not cacheable:
+                misses.append((i, vector))
+                continue
+            cached = answer_cache.lookup_similar(vector)
+            if cached is not None:
+                ANSWER_CACHE.inc(result="similar")
+                prepared[i] = cached_result(cached, {})
+            else:
+                ANSWER_CACHE.inc(result="miss")
+                misses.append((i, vector))
+
+    with span("dense_search", timings):
+        dense = store.search_batch([vector for _, vector in misses], k=fetch_k if lexical is not None else k,
+                                   query_filter=query_filter)
+    lexical_hits = dict(zip(pending, lexical.result())) if lexical is not None else {}
+
+    for (i, vector), hits in zip(misses, dense):
+        item_timings = {}
+        try:
+            docs = build_context(questions[i], hits, lexical_hits.get(i), store, k, reranking, item_timings,
+                                 query_filter)
+            prepared[i] = {
+                "cached": None,
+                "sources": source_metadata(docs),
+                "timings": item_timings,
+                "docs": docs,
+                "question_vector": vector,
+                "generation": generation,
+                "groq_api_key": groq_api_key,
+                "query_filter": query_filter,
+            }
+        except Exception as e:
+            prepared[i] = answer_error(e, "retrieving context")
+    return prepared, timings
+
+def answer_inputs(prepared: dict, question: str):
+    """
+    Inputs of the answer chain for a prepared question.
+
+    Args:
+        prepared (dict): Result of prepare_answer.
+        question (str): The question to answer.
+
+    Returns:
+        dict: The "context" and "question" prompt variables.
+    """
+    return {"context": format_docs(prepared["docs"]), "question": question}
+
+def finish_answer(prepared: dict, question: str, answer: str):
+    """
+    Record a freshly generated answer, with its sources, in the answer cache.
+
+    Answers to filtered questions are not cached: they only hold for their filter.
+
+    Args:
+        prepared (dict): Result of prepare_answer.
+        question (str): The question that was answered.
+        answer (str): The generated answer.
+    """
+    if prepared["cached"] is None:
+        COMPLETION_TOKENS.inc(token_counter()(answer))
+        if not prepared["query_filter"]:
+            registry.get_answer_cache().store(
+                question, prepared["question_vector"], answer, prepared["generation"], prepared["sources"]
+            )
+
+def answer_error(e: Exception, action: str):
+    """
+    Log an error of the answer path and convert it to a CustomException.
+
+    Args:
+        e (Exception): The error raised while answering.
+        action (str): What was being done, for the log message.
+
+    Returns:
+        CustomException: The exception to raise to the app.
+    """
+    if isinstance(e, CustomException):
+        logger.warning("Custom exception occurred: %s", str(e))
+        return e
+    if isinstance(e, OverloadedError):
+        # Shed load is reported as such, so that the app can answer 503
+        return e
+    # Log the exception and ensure the error message is propagated properly to the app
+    error_message = f"Error {action}: {str(e)}"
+    logger.error(error_message)
+    return CustomException(error_message, sys)
+
+def generate_answer(prepared: dict, question: str):
+    """
+    Generate the answer of a prepared question, once admitted to the LLM.
+
+    Raises:
+        OverloadedError: If the admission controller sheds the call.
+    """
+    with registry.get_llm_admission().admit():
+        # Answer with the shared prompt | LLM | parser chain
+        return get_answer_chain(prepared["groq_api_key"]).invoke(answer_inputs(prepared, question))
+
+def compute_answer(question: str, query_filter=None):
+    """The work of answer_question, without coalescing."""
+    try:
+        prepared = prepare_answer(question, query_filter)
+        if prepared["cached"] is not None:
+            answer = prepared["cached"]["answer"]
+        else:
+            with span("generate", prepared["timings"]):
+                answer = generate_answer(prepared, question)
+            finish_answer(prepared, question, answer)
+            logger.info("Answer retrieved successfully")
+        return {"answer": answer, "sources": prepared["sources"], "timings": prepared["timings"]}
+    except Exception as e:
+        raise answer_error(e, "retrieving answer")
+
+def answer_question(question: str, query_filter=None):
+    """
+    Answer a question from the documents, with the details of the request.
+
+    Identical questions (after normalization) with the same filter arriving
+    while one is being answered wait for that answer instead of repeating
+    retrieval and generation (coalesce_questions).
+
+    Args:
+        question (str): The question to answer.
+        query_filter (SearchFilter): Optional restriction of the search to
+            some documents, pages or ingest times.
+
+    Returns:
+        dict: "answer", "sources" (metadata of the context documents) and
+        "timings" (stage durations in milliseconds, e.g. "dense_search_ms").
+
+    Raises:
+        OverloadedError: If the LLM call was shed.
+    """
+    if not coalescing_enabled():
+        return compute_answer(question, query_filter)
+    key = (normalize_question(question), query_filter.key() if query_filter else None)
+    return registry.get_single_flight().do(key, compute_answer, question, query_filter)
+
+def answer_questions(questions: list, max_concurrency: int = None, query_filter=None):
+    """
+    Answer a batch of questions from the documents.
+
+    Retrieval is batched (see prepare_answers) and the LLM is called for
+    the questions not answered from the cache with at most max_concurrency
+    calls in flight. A question that fails does not fail the batch.
+
+    Args:
+        questions (list): The questions.
+        max_concurrency (int): Concurrent LLM calls (default: ask_batch_concurrency).
+        query_filter (SearchFilter): Optional restriction of every search.
+
+    Returns:
+        dict: "results", one per question in order, each with "question" and
+        either "answer", "sources" and "timings" or "error"; and "timings" of
+        the stages shared by the batch.
+    """
+    try:
+        prepared, timings = prepare_answers(questions, query_filter)
+    except Exception as e:
+        raise answer_error(e, "retrieving answers")
+
+    results = [None] * len(questions)
+    generate = []
+    for i, (question, entry) in enumerate(zip(questions, prepared)):
+        if isinstance(entry, Exception):
+            results[i] = {"question": question, "error": str(entry)}
+        elif entry["cached"] is not None:
+            results[i] = {"question": question, "answer": entry["cached"]["answer"], "sources": entry["sources"],
+                          "timings": entry["timings"]}
+        else:
+            generate.append(i)
+
+    if generate:
+        max_concurrency = max_concurrency or retrieval_settings()["batch_concurrency"]
+        with span("generate", timings):
+            # Each call goes through the admission controller; a shed call
+            # fails only its own question.
+            answers = RunnableLambda(lambda i: generate_answer(prepared[i], questions[i])).batch(
+                generate, config={"max_concurrency": max_concurrency}, return_exceptions=True,
+            )
+        for i, answer in zip(generate, answers):
+            if isinstance(answer, Exception):
+                error = answer_error(answer, "generating answer")
+                results[i] = {"question": questions[i], "error": str(error),
+                              "overloaded": isinstance(error, OverloadedError)}
+                continue
+            finish_answer(prepared[i], questions[i], answer)
+            results[i] = {"question": questions[i], "answer": answer, "sources": prepared[i]["sources"],
+                          "timings": prepared[i]["timings"]}
+    logger.info("Answered a batch of %d questions (%d generated)", len(questions), len(generate))
+    return {"results": results, "timings": timings}
+
 def retrieve_answer_from_docs(question: str):
     """
     Retrieve the answer to a question from the documents.
@@ -39,111 +584,152 @@ def retrieve_answer_from_docs(question: str):
     Returns:
         str: The generated answer.
     """
+    return answer_question(question)["answer"]
+
+def stream_answer_from_docs(question: str, query_filter=None):
+    """
+    Stream the answer to a question from the documents.
+
+    Yields a ("sources", list) event with the metadata of the retrieved
+    documents first, a ("timings", dict) event with the retrieval stages, then
+    ("token", str) events as the LLM produces them. A cached answer is sent
+    as a single token.
+
+    Args:
+        question (str): The question to answer.
+        query_filter (SearchFilter): Optional restriction of the search.
+
+    Yields:
+        tuple: (event name, payload).
+    """
     try:
-        # Environment variables
-        qdrant_url = os.getenv('qdrant_url')
-        qdrant_api_key = os.getenv('qdrant_api')
-        groq_api_key = os.getenv('groq_api')
-
-        if not all([qdrant_url, qdrant_api_key, groq_api_key]):
-            raise ValueError("One or more environment variables are missing.")
-        
-        # Check if the collection exists
-        headers = {"Authorization": f"Bearer {qdrant_api_key}"}
-        collection_info_url = f"{qdrant_url}/collections/rag"
-        response = requests.get(collection_info_url, headers=headers)
-        
-        if response.status_code == 404:
-            raise CustomException("Sorry, you don't have any documents. First, upload a PDF.", sys)
-        response.raise_for_status()
-
-        # Define the prompt template for LLM interaction
-        prompt = PromptTemplate(
-            template="""# Your role
-                        You are an expert at understanding the intent of the questioner and providing optimal answers from the documents.
-    
-                        # Instruction
-                        Your task is to answer the question using the following retrieved context delimited by XML tags.
-    
-                        <retrieved context>
-                        Retrieved Context:
-                        {context}
-                        </retrieved context>
-    
-                        # Question:
-                        {question}""",
-            input_variables=["context", "question"]
-        )
-
-        # Load the sentence transformer model
-        model_name = "sentence-transformers/all-mpnet-base-v2"
-        embeddings_model = HuggingFaceEmbeddings(model_name=model_name)
-
-        # Initialize Qdrant client and Qdrant vector store
-        qdrant_client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key, timeout=60)
-        qdrant = Qdrant(client=qdrant_client, collection_name="rag", embeddings=embeddings_model)
-        retriever = qdrant.as_retriever(search_kwargs={"k": 20})
-
-        # Set up the ChatGroq LLM for answering
-        llm = ChatGroq(model="llama-3.1-8b-instant", api_key=groq_api_key, temperature=0, max_tokens=None, timeout=None, max_retries=2)
-
-        # Chain the retriever, formatter, and LLM together
-        rag_chain = (
-            {"context": retriever | format_docs, "question": RunnablePassthrough() }
-            | prompt
-            | llm
-            | StrOutputParser()
-        )
-
-        # Invoke the chain and get the answer
-        answer = rag_chain.invoke(question)
-        logger.info("Answer retrieved successfully")
-        return answer
-    except CustomException as ce:
-        logger.warning("Custom exception occurred: %s", str(ce))
-        raise ce  # Reraise to be handled by the app
+        prepared = prepare_answer(question, query_filter)
+        if prepared["cached"] is not None:
+            yield "sources", prepared["sources"]
+            if prepared["timings"]:
+                yield "timings", prepared["timings"]
+            yield "token", prepared["cached"]["answer"]
+            return
+
+        # Admission comes before the first event, so a shed call fails fast
+        tokens = []
+        with registry.get_llm_admission().admit():
+            yield "sources", prepared["sources"]
+            if prepared["timings"]:
+                yield "timings", prepared["timings"]
+            with span("generate"):
+                for token in get_answer_chain(prepared["groq_api_key"]).stream(answer_inputs(prepared, question)):
+                    tokens.append(token)
+                    yield "token", token
+        finish_answer(prepared, question, "".join(tokens))
+        logger.info("Answer streamed successfully")
     except Exception as e:
-        # Log the exception and ensure the error message is propagated properly to the app
-        error_message = f"Error retrieving answer: {str(e)}"
-        logger.error(error_message)
-        raise CustomException(error_message, sys)
+        raise answer_error(e, "streaming answer")
+
+async def astream_answer_from_docs(question: str, query_filter=None):
+    """
+    Async variant of stream_answer_from_docs built on the chain's astream.
+
+    Retrieval awaits the vector store and runs its CPU-bound stages in
+    worker threads, so the event loop is never blocked.
 
+    Args:
+        question (str): The question to answer.
+        query_filter (SearchFilter): Optional restriction of the search.
 
+    Yields:
+        tuple: (event name, payload).
+    """
+    try:
+        prepared = await aprepare_answer(question, query_filter)
+        if prepared["cached"] is not None:
+            yield "sources", prepared["sources"]
+            if prepared["timings"]:
+                yield "timings", prepared["timings"]
+            yield "token", prepared["cached"]["answer"]
+            return
 
+        # Admission comes before the first event, so a shed call fails fast
+        tokens = []
+        async with registry.get_llm_admission().aadmit():
+            yield "sources", prepared["sources"]
+            if prepared["timings"]:
+                yield "timings", prepared["timings"]
+            with span("generate"):
+                async for token in get_answer_chain(prepared["groq_api_key"]).astream(answer_inputs(prepared, question)):
+                    tokens.append(token)
+                    yield "token", token
+        finish_answer(prepared, question, "".join(tokens))
+        logger.info("Answer streamed successfully")
+    except Exception as e:
+        raise answer_error(e, "streaming answer")
 
 def clear_qdrant_data(qdrant_url, qdrant_api_key, collection_name="rag"):
     """
-    Deletes all vectors in the specified Qdrant collection.
+    Deletes all vectors in the specified collection of the configured vector store.
 
     Args:
-        qdrant_url (str): The URL of the Qdrant instance.
-        qdrant_api_key (str): The API key for authentication.
+        qdrant_url (str): The URL of the Qdrant instance (Qdrant backend only).
+        qdrant_api_key (str): The API key for authentication (Qdrant backend only).
         collection_name (str): The name of the collection to clear.
 
     Returns:
         bool: True if deletion was successful, False if the collection didn't exist.
     """
-    headers = {"Authorization": f"Bearer {qdrant_api_key}"}
-    
-    # Check if the collection exists
-    collection_info_url = f"{qdrant_url}/collections/{collection_name}"
-    response = requests.get(collection_info_url, headers=headers)
-
-    if response.status_code == 200:
-        # Delete the collection
-        delete_url = f"{qdrant_url}/collections/{collection_name}"
-        delete_response = requests.delete(delete_url, headers=headers)
-        
-        if delete_response.status_code == 200:
-            logger.info("Collection successfully deleted.")
-            return True
-        else:
-            logger.error(f"Failed to delete collection: {delete_response.text}")
-            raise CustomException(f"Failed to delete collection: {delete_response.text}", sys)
-    elif response.status_code == 404:
+    try:
+        deleted = registry.get_store(qdrant_url, qdrant_api_key, collection_name).drop()
+    except Exception as e:
+        logger.error(f"Failed to delete collection: {str(e)}")
+        raise CustomException(f"Failed to delete collection: {str(e)}", sys)
+
+    registry.get_lexical_index(collection_name).drop()
+    if deleted:
+        logger.info("Collection successfully deleted.")
+        registry.get_answer_cache().invalidate()
+    else:
         # Collection doesn't exist
         logger.info("Collection does not exist.")
-        return False
-    else:
-        logger.error(f"Error checking collection: {response.text}")
-        raise CustomException(f"Error checking collection: {response.text}", sys)
\ No newline at end of file
+    return deleted
+
+def list_documents(qdrant_url=None, qdrant_api_key=None, collection_name="rag"):
+    """
+    The ids of the documents stored in a collection.
+
+    Args:
+        qdrant_url (str): The URL of the Qdrant instance (Qdrant backend only).
+        qdrant_api_key (str): The API key for authentication (Qdrant backend only).
+        collection_name (str): The collection.
+
+    Returns:
+        list: Sorted document ids (uploaded file names), empty if the collection does not exist.
+    """
+    store = registry.get_store(qdrant_url, qdrant_api_key, collection_name)
+    return store.document_ids() if store.exists() else []
+
+def delete_document(document_id, qdrant_url=None, qdrant_api_key=None, collection_name="rag"):
+    """
+    Deletes the chunks of one document, leaving the rest of the collection untouched.
+
+    Args:
+        document_id (str): The document (uploaded file name).
+        qdrant_url (str): The URL of the Qdrant instance (Qdrant backend only).
+        qdrant_api_key (str): The API key for authentication (Qdrant backend only).
+        collection_name (str): The collection.
+
+    Returns:
+        int: Number of chunks deleted; 0 if the document was not stored.
+    """
+    try:
+        store = registry.get_store(qdrant_url, qdrant_api_key, collection_name)
+        ids = sorted(store.document_point_ids(document_id)) if store.exists() else []
+        store.delete(ids)
+    except Exception as e:
+        logger.error(f"Failed to delete document {document_id}: {str(e)}")
+        raise CustomException(f"Failed to delete document {document_id}: {str(e)}", sys)
+
+    if ids:
+        registry.get_lexical_index(collection_name).delete(ids)
+        # Cached answers may cite the deleted document
+        registry.get_answer_cache().invalidate()
+        logger.info("Deleted document %s (%d chunks).", document_id, len(ids))
+    return len(ids)
@@ -0,0 +1,134 @@
+import os
+import time
+import random
+import asyncio
+import grpc
+import httpx
+from dotenv import load_dotenv
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from src.telemetry import RETRIES
+from custom_logger import logger
+
+load_dotenv()
+
+# HTTP statuses and gRPC codes worth retrying: overload and unavailability,
+# never client errors.
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+TRANSIENT_GRPC_CODES = (
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.ABORTED,
+)
+
+
+def retry_settings():
+    """
+    Retry settings of Qdrant calls from the environment.
+
+    Returns:
+        dict: Total "attempts" (qdrant_retries + 1), first backoff "base"
+        (qdrant_backoff_base, seconds) and backoff "cap" (qdrant_backoff_max, seconds).
+    """
+    return {
+        "attempts": int(os.getenv('qdrant_retries', "3")) + 1,
+        "base": float(os.getenv('qdrant_backoff_base', "0.2")),
+        "cap": float(os.getenv('qdrant_backoff_max', "5")),
+    }
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Whether a failed Qdrant call may succeed when repeated.
+
+    Args:
+        error (Exception): The error raised by the client.
+
+    Returns:
+        bool: True for connection failures, timeouts and overload responses.
+    """
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code in TRANSIENT_STATUSES
+    if isinstance(error, grpc.RpcError):
+        return callable(getattr(error, "code", None)) and error.code() in TRANSIENT_GRPC_CODES
+    return isinstance(error, (ResponseHandlingException, httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def is_not_found(error: Exception) -> bool:
+    """Whether a Qdrant call failed because the collection (or point) does not exist."""
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code == 404
+    if isinstance(error, grpc.RpcError):
+        return callable(getattr(error, "code", None)) and error.code() == grpc.StatusCode.NOT_FOUND
+    return False
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Delay before retry number attempt (from 1), with full jitter.
+
+    Drawing uniformly below the exponential bound spreads the retries of
+    concurrent callers instead of having them hit a recovering server
+    together.
+
+    Args:
+        attempt (int): The retry about to be made.
+        base (float): Bound of the first delay, in seconds.
+        cap (float): Largest bound, in seconds.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def with_retries(call, *args, settings: dict = None, **kwargs):
+    """
+    Call a function, repeating it after transient errors with jittered exponential backoff.
+
+    Only idempotent calls should be retried this way.
+
+    Args:
+        call (callable): The function.
+        settings (dict): Retry settings (default: retry_settings()).
+
+    Returns:
+        The result of the call.
+    """
+    settings = settings or retry_settings()
+    for attempt in range(1, settings["attempts"] + 1):
+        try:
+            return call(*args, **kwargs)
+        except Exception as e:
+            if attempt == settings["attempts"] or not is_transient(e):
+                raise
+            delay = backoff_delay(attempt, settings["base"], settings["cap"])
+            operation = getattr(call, "__name__", "call")
+            RETRIES.inc(operation=operation)
+            logger.warning("Transient error from %s (attempt %d): %s; retrying in %.2fs", operation, attempt, e, delay)
+            time.sleep(delay)
+
+
+async def awith_retries(call, *args, settings: dict = None, **kwargs):
+    """
+    Async variant of with_retries for coroutine functions.
+
+    Args:
+        call (callable): The coroutine function.
+        settings (dict): Retry settings (default: retry_settings()).
+
+    Returns:
+        The result of the call.
+    """
+    settings = settings or retry_settings()
+    for attempt in range(1, settings["attempts"] + 1):
+        try:
+            return await call(*args, **kwargs)
+        except Exception as e:
+            if attempt == settings["attempts"] or not is_transient(e):
+                raise
+            delay = backoff_delay(attempt, settings["base"], settings["cap"])
+            operation = getattr(call, "__name__", "call")
+            RETRIES.inc(operation=operation)
+            logger.warning("Transient error from %s (attempt %d): %s; retrying in %.2fs", operation, attempt, e, delay)
+            await asyncio.sleep(delay)
@@ -0,0 +1,273 @@
+import os
+import codecs
+import bisect
+from functools import lru_cache, cached_property
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+load_dotenv()
+
+# Imported by the parsing worker processes: only the tokenizer is loaded
+# here, never the embedding model itself.
+
+# Fallback token estimate: a run of word characters counts as one token per
+# six characters and every other non-space character as one token. WordPiece
+# and BPE vocabularies split most prose at least this finely, so chunks stay
+# within the model's limit.
+ESTIMATE_WORD_LENGTH = 6
+SPACE, WORD, MARK = 0, 1, 2
+# Character class of each Latin-1 code point; other characters are scanned
+# as word characters (see _as_word)
+_CLASSES = bytes(SPACE if chr(code).isspace() else WORD if chr(code).isalnum() or chr(code) == "_" else MARK
+                 for code in range(256))
+
+
+def _as_word(error: UnicodeEncodeError):
+    # One byte per character keeps byte offsets equal to character offsets
+    return "a" * (error.end - error.start), error.end
+
+
+codecs.register_error("splitter_as_word", _as_word)
+
+
+def splitter_settings():
+    """
+    Text splitter settings from the environment.
+
+    Returns:
+        dict: The "splitter" (text_splitter: recursive, which measures
+        chunk_size and chunk_overlap in characters, or token), and for the
+        token splitter the chunk "tokens" (splitter_chunk_tokens), the
+        "overlap" in tokens (splitter_overlap_tokens) and the "tokenizer"
+        (splitter_tokenizer, the embedding model's by default).
+    """
+    splitter = os.getenv('text_splitter', "recursive").strip().lower()
+    if splitter not in ("recursive", "token"):
+        raise ValueError(f"Unknown text_splitter: {splitter} (expected recursive or token)")
+    return {
+        "splitter": splitter,
+        # all-mpnet-base-v2 embeds at most 384 tokens, two of them special
+        "tokens": int(os.getenv('splitter_chunk_tokens', "382")),
+        "overlap": int(os.getenv('splitter_overlap_tokens', "64")),
+        "tokenizer": os.getenv('splitter_tokenizer', "sentence-transformers/all-mpnet-base-v2"),
+    }
+
+
+class TextScan:
+    """
+    A batch of texts joined with newlines, and the class of each character.
+
+    Positions are offsets in the joined text; the batch is scanned in a few
+    vectorized passes over its characters instead of text by text.
+    """
+
+    def __init__(self, texts: list):
+        self.texts = texts
+        # Text i spans [offsets[i], offsets[i + 1] - 1)
+        self.offsets = np.cumsum([0] + [len(text) + 1 for text in texts])
+        text = "\n".join(texts).encode("latin-1", "splitter_as_word")
+        self.codes = np.frombuffer(text, dtype=np.uint8)
+        self.classes = np.frombuffer(text.translate(_CLASSES), dtype=np.int8)
+
+    @cached_property
+    def space_run_ends(self) -> np.ndarray:
+        """Positions right after each run of whitespace."""
+        space = self.classes == SPACE
+        return np.flatnonzero(space[:-1] & ~space[1:]) + 1
+
+    def segment_bounds(self) -> np.ndarray:
+        """Ends of the whitespace runs that end a paragraph, line or sentence."""
+        codes = self.codes[:-1]
+        sentence_ends = ((codes == ord(".")) | (codes == ord("!")) | (codes == ord("?"))) & (self.classes[1:] == SPACE)
+        bounds = np.flatnonzero(sentence_ends | (codes == ord("\n"))) + 1
+        # Skip the rest of each whitespace run, a few characters at a time, then by lookup
+        for _ in range(8):
+            inside = np.flatnonzero(self.classes[np.minimum(bounds, len(self.classes) - 1)] == SPACE)
+            inside = inside[bounds[inside] < len(self.classes)]
+            if not len(inside):
+                break
+            bounds[inside] += 1
+        else:
+            ends = self.space_run_ends
+            found = np.searchsorted(ends, bounds[inside] - 1, side="right")
+            bounds[inside] = np.append(ends, len(self.classes))[found]
+        return np.unique(bounds)
+
+    def estimated_token_starts(self) -> np.ndarray:
+        """Token starts as estimated by ESTIMATE_WORD_LENGTH."""
+        length = ESTIMATE_WORD_LENGTH
+        word = self.classes == WORD
+        first = word.copy()
+        first[1:] &= ~word[:-1]
+        starts = first | (self.classes == MARK)
+        # full[i]: the length + 1 characters from i on are all word characters
+        size = max(len(word) - length, 0)
+        full = word[:size].copy()
+        for shift in range(1, length + 1):
+            full &= word[shift:size + shift]
+        # Words longer than length go on with a token every length characters
+        begins = np.flatnonzero(first[:len(full)] & full)
+        while len(begins):
+            begins += length
+            starts[begins] = True
+            begins = begins[begins < len(full)]
+            begins = begins[full[begins]]
+        return np.flatnonzero(starts)
+
+
+class EstimatedTokenizer:
+    """Token positions estimated from character classes (see ESTIMATE_WORD_LENGTH)."""
+
+    name = "estimate"
+
+    def token_starts(self, scan: TextScan) -> np.ndarray:
+        """Sorted token starts in the joined text of a scan."""
+        return scan.estimated_token_starts()
+
+
+class HuggingFaceTokenizer:
+    """Token positions from the fast (Rust) tokenizer of a Hugging Face model, encoded in batches."""
+
+    def __init__(self, model_name: str):
+        from tokenizers import Tokenizer
+        self.name = model_name
+        self.tokenizer = Tokenizer.from_pretrained(model_name)
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+
+    def token_starts(self, scan: TextScan) -> np.ndarray:
+        """Sorted token starts in the joined text of a scan."""
+        encodings = self.tokenizer.encode_batch(scan.texts, add_special_tokens=False)
+        return np.concatenate([np.zeros(0, dtype=np.int64)] + [
+            np.array(encoding.offsets, dtype=np.int64).reshape(-1, 2)[:, 0] + offset
+            for encoding, offset in zip(encodings, scan.offsets)
+        ])
+
+
+@lru_cache(maxsize=None)
+def load_tokenizer(model_name: str):
+    """
+    The tokenizer of a model, once per process.
+
+    When it cannot be loaded (tokenizers not installed, or offline without a
+    cached copy), token positions are estimated instead.
+    """
+    try:
+        return HuggingFaceTokenizer(model_name)
+    except Exception as e:
+        # Imported here: the logger opens a log file in every process importing it
+        from custom_logger import logger
+        logger.warning("Tokenizer of %s unavailable (%s); estimating token counts", model_name, str(e))
+        return EstimatedTokenizer()
+
+
+class TokenTextSplitter:
+    """
+    Split documents into chunks of at most chunk_tokens tokens of the embedding model.
+
+    The texts of a split_documents call are scanned together, in a few
+    vectorized passes, for the ends of paragraphs, lines and sentences, and
+    tokenized in one batch. Counting the token starts before every boundary
+    gives the cumulative token count along each text, on which chunks are
+    packed greedily from whole segments, each starting with up to
+    chunk_overlap tokens of whole segments from the end of the previous
+    one. Segments longer than a chunk are cut at whitespace, and single
+    longer words between tokens. Chunks carry their document's metadata and
+    a "start_index", like RecursiveCharacterTextSplitter with
+    add_start_index=True.
+    """
+
+    def __init__(self, chunk_tokens: int = 382, chunk_overlap: int = 64, tokenizer=None):
+        if chunk_overlap >= chunk_tokens:
+            raise ValueError(f"Chunk overlap ({chunk_overlap}) must be smaller than the chunk size ({chunk_tokens}).")
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        self.tokenizer = tokenizer or EstimatedTokenizer()
+
+    def _refine(self, bounds: np.ndarray, totals: np.ndarray, tokens: np.ndarray, cut_points):
+        """Add the cut points (a function returning them) that fall inside segments of more than chunk_tokens tokens."""
+        oversized = np.diff(totals) > self.chunk_tokens
+        if not oversized.any():
+            return bounds, totals
+        cut_points = cut_points()
+        segment = np.searchsorted(bounds, cut_points, side="right") - 1
+        inside = (segment >= 0) & (segment < len(oversized))
+        cut_points = cut_points[inside][oversized[segment[inside]]]
+        bounds = np.unique(np.concatenate([bounds, cut_points]))
+        return bounds, np.searchsorted(tokens, bounds)
+
+    def pack(self, text: str, bounds: np.ndarray, totals: np.ndarray) -> list:
+        """
+        Pack the segments of a text into chunks.
+
+        Args:
+            text (str): The text.
+            bounds (np.ndarray): Segment boundaries in the text, from 0 to len(text).
+            totals (np.ndarray): Number of tokens before each boundary.
+
+        Returns:
+            list: (start_index, chunk text) pairs.
+        """
+        bounds, totals = bounds.tolist(), totals.tolist()
+        chunks, first, segments = [], 0, len(bounds) - 1
+        while first < segments:
+            # The most whole segments that fit, but at least one
+            last = max(bisect.bisect_right(totals, totals[first] + self.chunk_tokens) - 1, first + 1)
+            start, stop = bounds[first], bounds[last]
+            chunk = text[start:stop]
+            stripped = chunk.strip()
+            if stripped:
+                chunks.append((start + len(chunk) - len(chunk.lstrip()), stripped))
+            if last >= segments:
+                break
+            # The next chunk repeats the trailing segments worth at most chunk_overlap tokens
+            first = max(bisect.bisect_left(totals, totals[last] - self.chunk_overlap), first + 1)
+        return chunks
+
+    def split_documents(self, documents) -> list:
+        """
+        Split documents into chunks.
+
+        Args:
+            documents: Iterable of documents.
+
+        Returns:
+            list: The chunks, in document order.
+        """
+        documents = list(documents)
+        scan = TextScan([document.page_content for document in documents])
+        tokens = self.tokenizer.token_starts(scan)
+        starts, ends = scan.offsets[:-1], scan.offsets[1:] - 1
+        bounds = np.unique(np.concatenate([scan.segment_bounds(), starts, ends]))
+        totals = np.searchsorted(tokens, bounds)
+        bounds, totals = self._refine(bounds, totals, tokens, lambda: scan.space_run_ends)
+        bounds, totals = self._refine(bounds, totals, tokens, lambda: tokens)
+
+        chunks = []
+        for document, offset, low, high in zip(documents, starts, np.searchsorted(bounds, starts),
+                                               np.searchsorted(bounds, ends)):
+            for start_index, text in self.pack(document.page_content, bounds[low:high + 1] - offset,
+                                               totals[low:high + 1]):
+                chunks.append(Document(page_content=text, metadata={**document.metadata, "start_index": start_index}))
+        return chunks
+
+
+def make_text_splitter(chunk_size: int, chunk_overlap: int):
+    """
+    The text splitter configured by text_splitter.
+
+    Args:
+        chunk_size (int): Maximum chunk size in characters (recursive splitter).
+        chunk_overlap (int): Overlap in characters (recursive splitter).
+
+    Returns:
+        A splitter with a split_documents(documents) method. The token
+        splitter takes its sizes in tokens from splitter_chunk_tokens and
+        splitter_overlap_tokens instead.
+    """
+    settings = splitter_settings()
+    if settings["splitter"] == "token":
+        return TokenTextSplitter(settings["tokens"], settings["overlap"], load_tokenizer(settings["tokenizer"]))
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
@@ -0,0 +1,238 @@
+import math
+import time
+import uuid
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from custom_logger import trace_id
+
+# Latency buckets in seconds, from sub-millisecond stages to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_text(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels, in the Prometheus text format.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0)
+
+    def samples(self) -> list:
+        with self._lock:
+            return [(self.name, _label_text(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets and optional labels.
+
+    Observing costs one binary search and a few additions under a lock, so
+    it can stay enabled on every request.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(labels.get(name, "") for name in self.labelnames))
+        return series[-1] if series else 0
+
+    def samples(self) -> list:
+        samples = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    samples.append((self.name + "_bucket", _label_text(self.labelnames, key, f'le="{bound}"'), cumulative))
+                samples.append((self.name + "_bucket", _label_text(self.labelnames, key, 'le="+Inf"'), series[-1]))
+                samples.append((self.name + "_sum", _label_text(self.labelnames, key), series[-2]))
+                samples.append((self.name + "_count", _label_text(self.labelnames, key), series[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    The metrics of the process, rendered for the /metrics endpoint.
+
+    Besides registered metrics, collectors (zero-argument callables
+    returning (name, kind, description, [(labels dict, value)]) tuples) are
+    called at render time to export state kept elsewhere, such as cache
+    statistics.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in metric.samples())
+        for collector in self._collectors:
+            for name, kind, description, values in collector():
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values:
+                    lines.append(f"{name}{_label_text(tuple(labels), tuple(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "rag_stage_duration_seconds", "Duration of answering and ingestion stages.", ("stage",)))
+REQUESTS = REGISTRY.register(Counter(
+    "rag_http_requests_total", "HTTP requests by route and status code.", ("route", "status")))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "rag_http_request_duration_seconds", "HTTP request latency by route.", ("route",)))
+ANSWER_CACHE = REGISTRY.register(Counter(
+    "rag_answer_cache_lookups_total", "Answer cache lookups by result (exact, similar, miss).", ("result",)))
+EMBEDDING_CACHE = REGISTRY.register(Counter(
+    "rag_embedding_cache_lookups_total", "Embedding cache lookups by result (hit, miss).", ("result",)))
+CHUNKS = REGISTRY.register(Counter(
+    "rag_ingested_chunks_total", "Ingested chunks by outcome (upserted, skipped, deleted).", ("outcome",)))
+PAGES = REGISTRY.register(Counter("rag_ingested_pages_total", "Parsed PDF pages."))
+CONTEXT_TOKENS = REGISTRY.register(Histogram(
+    "rag_context_tokens", "Tokens of the context sent to the LLM.",
+    buckets=(250, 500, 1000, 2000, 4000, 6000, 8000, 16000, 32000)))
+COMPLETION_TOKENS = REGISTRY.register(Counter("rag_completion_tokens_total", "Tokens generated by the LLM."))
+RETRIES = REGISTRY.register(Counter(
+    "rag_qdrant_retries_total", "Qdrant calls repeated after a transient error, by operation.", ("operation",)))
+LLM_ADMITTED = REGISTRY.register(Counter("rag_llm_admitted_total", "LLM calls admitted by the admission controller."))
+LLM_SHED = REGISTRY.register(Counter(
+    "rag_llm_shed_total", "LLM calls rejected with 503, by reason (queue_full, deadline, timeout).", ("reason",)))
+LLM_QUEUE_SECONDS = REGISTRY.register(Histogram(
+    "rag_llm_queue_wait_seconds", "Time LLM calls waited for an admission slot."))
+COALESCED = REGISTRY.register(Counter(
+    "rag_coalesced_questions_total", "Questions answered by joining an identical in-flight computation."))
+
+
+def new_trace_id(incoming: str = None) -> str:
+    """
+    Start a trace for the current request (thread or task).
+
+    Args:
+        incoming (str): Trace id received from the caller, if any.
+
+    Returns:
+        str: The trace id, also added to every log line of the request.
+    """
+    value = incoming or uuid.uuid4().hex[:16]
+    trace_id.set(value)
+    return value
+
+
+def current_trace_id() -> str:
+    return trace_id.get()
+
+
+@contextmanager
+def span(stage: str, timings: dict = None):
+    """
+    Time a stage into the stage histogram.
+
+    Args:
+        stage (str): Stage name, e.g. "dense_search" or "ingest_embed".
+        timings (dict): Optional per-request timings, where the duration is
+            added under "<stage>_ms".
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if timings is not None:
+            key = f"{stage}_ms"
+            timings[key] = round(timings.get(key, 0) + elapsed * 1000, 3)
+
+
+def timed_iter(iterable, stage: str):
+    """
+    Time the work of a producing iterator, observed once it is exhausted.
+
+    Only the time spent producing items is counted, not the time the
+    consumer spends between them.
+
+    Args:
+        iterable: The producer.
+        stage (str): Stage name.
+
+    Yields:
+        The items of iterable.
+    """
+    iterator = iter(iterable)
+    total = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                total += time.perf_counter() - started
+                return
+            total += time.perf_counter() - started
+            yield item
+    finally:
+        STAGE_SECONDS.observe(total, stage=stage)
@@ -1,7 +1,7 @@
 import sys
 from custom_logger import logger
 from exception import CustomException
-from sentence_transformers import SentenceTransformer
+from src import registry
 
 def format_docs(docs):
     """
@@ -55,6 +55,6 @@ def create_embeddings(texts):
     Returns:
         list of np.array: List of embedding vectors.
     """
-    model = SentenceTransformer("all-MiniLM-L6-v2")  # Load a pre-trained embedding model
+    model = registry.get_sentence_transformer("all-MiniLM-L6-v2")  # Shared pre-trained embedding model
     embeddings = model.encode(texts, show_progress_bar=True)  # Generate embeddings
     return embeddings
@@ -0,0 +1,719 @@
+import os
+import re
+import time
+import asyncio
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from qdrant_client.http import models as rest
+from src.retry import with_retries, awith_retries, is_not_found
+from src.filters import PAYLOAD_INDEXES
+from src.projection import Projection
+from custom_logger import logger
+
+load_dotenv()
+
+
+class VectorStore:
+    """
+    Interface of the vector stores behind ingestion and retrieval.
+
+    Points are identified by string ids and carry the LangChain payload
+    layout {"page_content": ..., "metadata": {...}}; the document id of a
+    point is read from metadata["document_id"]. Searches take an optional
+    SearchFilter (see src.filters), evaluated by the backend before ranking.
+    """
+
+    def exists(self) -> bool:
+        """Whether the collection exists (has been created and not dropped)."""
+        raise NotImplementedError
+
+    def ensure(self, vector_size: int = None):
+        """Create the collection if it does not exist yet, for vectors of vector_size (default: the store's)."""
+        raise NotImplementedError
+
+    def upsert(self, ids: list, vectors: list, payloads: list) -> int:
+        """Insert or replace points; returns the number written."""
+        raise NotImplementedError
+
+    def document_point_ids(self, document_id: str) -> set:
+        """Ids of the points stored for a document."""
+        raise NotImplementedError
+
+    def document_ids(self) -> list:
+        """The ids of the documents with stored points, sorted."""
+        raise NotImplementedError
+
+    def point_ids(self) -> set:
+        """The ids of every stored point."""
+        raise NotImplementedError
+
+    def present_ids(self, ids: list) -> set:
+        """The subset of ids that are stored."""
+        raise NotImplementedError
+
+    def delete(self, ids: list):
+        """Delete points by id."""
+        raise NotImplementedError
+
+    def search(self, vector, k: int, exact: bool = False, query_filter=None, projected: bool = False) -> list:
+        """
+        The k nearest points as (Document, score) pairs, best first; Document.id is the point id.
+
+        exact=True bypasses approximate indexes and quantization (for measuring recall).
+        With a query_filter only the points it matches are searched.
+        projected=True marks a vector already in the stored space (e.g. from
+        sample_vectors), which a projecting backend then searches as is.
+        """
+        raise NotImplementedError
+
+    def search_batch(self, vectors: list, k: int, query_filter=None) -> list:
+        """One search result list per query vector, as returned by search; backends may batch the round trip."""
+        return [self.search(vector, k, query_filter=query_filter) for vector in vectors]
+
+    def get(self, ids: list) -> list:
+        """The documents of the stored points among ids, with Document.id set."""
+        raise NotImplementedError
+
+    def sample_vectors(self, count: int):
+        """Up to count stored vectors as a float32 matrix (for measuring search quality)."""
+        raise NotImplementedError
+
+    def set_quantization(self, mode: str):
+        """Switch the collection to a quantization mode (none, int8 or binary)."""
+        raise NotImplementedError
+
+    def drop(self) -> bool:
+        """Delete the whole collection; returns False if it did not exist."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources held by the store."""
+
+    # Async access for the event loop; backends without an async client run
+    # the blocking call in a worker thread.
+
+    async def aexists(self) -> bool:
+        return await asyncio.to_thread(self.exists)
+
+    async def asearch(self, vector, k: int, exact: bool = False, query_filter=None) -> list:
+        return await asyncio.to_thread(self.search, vector, k, exact, query_filter)
+
+    async def asearch_batch(self, vectors: list, k: int, query_filter=None) -> list:
+        return await asyncio.to_thread(self.search_batch, vectors, k, query_filter)
+
+
+def payload_document(payload: dict, point_id: str = None) -> Document:
+    """
+    Rebuild the LangChain document stored in a point payload.
+
+    Args:
+        payload (dict): The point payload.
+        point_id (str): The id of the point, kept as Document.id.
+
+    Returns:
+        Document: The chunk.
+    """
+    return Document(id=point_id, page_content=payload.get("page_content", ""), metadata=payload.get("metadata") or {})
+
+
+def quantization_config(mode: str):
+    """
+    Qdrant quantization config of a quantization mode.
+
+    The quantized vectors are kept in RAM; the original vectors can then
+    live on disk and are only read to rescore candidates.
+
+    Args:
+        mode (str): none, int8 or binary.
+
+    Returns:
+        The config, or None for "none".
+    """
+    if mode == "int8":
+        return rest.ScalarQuantization(
+            scalar=rest.ScalarQuantizationConfig(type=rest.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if mode == "binary":
+        return rest.BinaryQuantization(binary=rest.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+# Reserved point of a projected collection version, holding its projection
+# (see QdrantStore.save_projection); scrolls and searches skip it.
+PROJECTION_POINT_ID = "00000000-0000-0000-0000-000000000000"
+WITHOUT_PROJECTION_POINT = rest.Filter(must_not=[rest.HasIdCondition(has_id=[PROJECTION_POINT_ID])])
+
+
+def version_name(collection_name: str, version: int) -> str:
+    """Name of a version of a collection, e.g. rag_v3."""
+    return f"{collection_name}_v{version}"
+
+
+def version_number(collection_name: str, name: str):
+    """The version a collection name is of collection_name, or None."""
+    match = re.fullmatch(re.escape(collection_name) + r"_v(\d+)", name)
+    return int(match.group(1)) if match else None
+
+
+class QdrantStore(VectorStore):
+    """
+    VectorStore backed by a (remote) Qdrant collection.
+
+    With quantization "int8" or "binary" the collection is created with
+    quantized vectors in RAM and originals on disk, and searches oversample
+    the quantized candidates and rescore them with the original vectors.
+
+    Calls are retried after transient errors (see with_retries). Whether the
+    collection exists and its vector schema are cached for metadata_ttl
+    seconds, so answering does not cost a metadata round trip per question;
+    the cache is updated when this store creates, converts or drops the
+    collection, and dropped when Qdrant reports the collection missing. The
+    TTL bounds how long changes made by other processes go unnoticed.
+
+    A versioned store reads and writes through an alias: collection_name
+    names the alias of the live version (collection_name_v<N>), which a
+    reindex builds next to it and then swaps in atomically (see
+    switch_alias). A store created on an empty server starts at version 1;
+    a plain collection of that name from before versioning keeps working
+    until the first reindex replaces it.
+
+    With a ProjectionStore, vectors written and searched are projected with
+    the projection fitted for the live version (see src.projection), so
+    callers always pass full-dimension embeddings. The projection is stored
+    in the version itself, in a reserved point, and is resolved together
+    with the alias target: searches address that version by name, so a
+    process that has not noticed a reindex yet (within metadata_ttl) keeps
+    searching the version its projection belongs to, while writes resolve
+    the alias afresh so that they reach the new version.
+
+    The fields searches can be filtered on carry payload indexes (see
+    src.filters.PAYLOAD_INDEXES), created with the collection so that the
+    HNSW graph gets the extra per-value links of filterable search. Qdrant
+    plans a filtered search from the index cardinality: a selective filter
+    scores just the matching points, a broad one walks the graph.
+    """
+
+    def __init__(self, client, collection_name: str, vector_size: int = 768, quantization: str = "none",
+                 oversampling: float = 3.0, async_client_factory=None, metadata_ttl: float = 30.0,
+                 versioned: bool = False, projections=None):
+        self.client = client
+        self.collection_name = collection_name
+        self.vector_size = vector_size
+        self.versioned = versioned
+        self.projections = projections
+        self.quantization = quantization
+        self.oversampling = oversampling
+        self.metadata_ttl = metadata_ttl
+        self._async_client_factory = async_client_factory
+        self._metadata = {}  # "exists" / "schema" / "target" -> (value, cached at)
+        self._indexed = False
+        self._lock = threading.Lock()
+
+    def _cached(self, key: str):
+        with self._lock:
+            entry = self._metadata.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.metadata_ttl:
+            return None
+        return entry[0]
+
+    def _remember(self, key: str, value):
+        with self._lock:
+            self._metadata[key] = (value, time.monotonic())
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._metadata.pop(key, None)
+
+    def invalidate(self):
+        """Forget the cached collection metadata."""
+        with self._lock:
+            self._metadata.clear()
+            self._indexed = False
+
+    def _call(self, method: str, *args, **kwargs):
+        try:
+            return with_retries(getattr(self.client, method), *args, **kwargs)
+        except Exception as e:
+            if is_not_found(e):
+                self.invalidate()
+            raise
+
+    async def _acall(self, method: str, *args, **kwargs):
+        try:
+            return await awith_retries(getattr(self._async_client_factory(), method), *args, **kwargs)
+        except Exception as e:
+            if is_not_found(e):
+                self.invalidate()
+            raise
+
+    def exists(self) -> bool:
+        exists = self._cached("exists")
+        if exists is None:
+            exists = self._call("collection_exists", self.collection_name)
+            self._remember("exists", exists)
+        return exists
+
+    async def aexists(self) -> bool:
+        if self._async_client_factory is None:
+            return await super().aexists()
+        exists = self._cached("exists")
+        if exists is None:
+            exists = await self._acall("collection_exists", self.collection_name)
+            self._remember("exists", exists)
+        return exists
+
+    def schema(self) -> dict:
+        """
+        Vector schema of the existing collection.
+
+        Returns:
+            dict: Vector "size", "distance" and "on_disk", and the "quantization" config.
+        """
+        schema = self._cached("schema")
+        if schema is None:
+            config = self._call("get_collection", self.collection_name).config
+            vectors = config.params.vectors
+            schema = {
+                "size": vectors.size,
+                "distance": str(vectors.distance),
+                "on_disk": bool(vectors.on_disk),
+                "quantization": config.quantization_config,
+            }
+            self._remember("schema", schema)
+        return schema
+
+    def create(self, collection_name: str, vector_size: int, bulk: bool = False):
+        """
+        Create a collection with the vector settings of this store.
+
+        Args:
+            collection_name (str): The collection.
+            vector_size (int): Dimension of its vectors.
+            bulk (bool): Defer building the HNSW graph until finish_bulk_load,
+                so that a bulk load only appends points.
+        """
+        self.client.create_collection(
+            collection_name=collection_name,
+            vectors_config=rest.VectorParams(
+                size=vector_size,
+                distance=rest.Distance.COSINE,
+                on_disk=self.quantization != "none",
+            ),
+            hnsw_config=rest.HnswConfigDiff(m=0) if bulk else None,
+            quantization_config=quantization_config(self.quantization),
+        )
+
+    def ensure(self, vector_size: int = None):
+        vector_size = vector_size or self.vector_size
+        if self.exists():
+            logger.info(f"Collection '{self.collection_name}' exists.")
+            size = self.schema()["size"]
+            # A projected version stores fewer dimensions than the model embeds
+            projection = self.projection()
+            vector_size = vector_size if projection is None else projection.dim
+            if size != vector_size:
+                raise ValueError(f"Collection '{self.collection_name}' holds {size}-dimensional vectors, "
+                                 f"not {vector_size}; reindex it for the current embedding model.")
+        else:
+            logger.info(f"Collection '{self.collection_name}' does not exist. Creating it...")
+            try:
+                if self.versioned:
+                    self._forget_projection(version_name(self.collection_name, 1))
+                    self.create(version_name(self.collection_name, 1), vector_size)
+                    self.switch_alias(version_name(self.collection_name, 1))
+                else:
+                    self._forget_projection(self.collection_name)
+                    self.create(self.collection_name, vector_size)
+            except Exception:
+                # Creation is not retried blindly: another writer may have won the race.
+                self.invalidate()
+                if not self.exists():
+                    raise
+            self.invalidate()
+            self._remember("exists", True)
+            logger.info(f"Collection '{self.collection_name}' created successfully (quantization: {self.quantization}).")
+        if not self._indexed:
+            # Re-ingestion looks points up by document and searches filter on
+            # these fields; creating an existing index is a no-op.
+            for field_name, field_schema in PAYLOAD_INDEXES.items():
+                self._call(
+                    "create_payload_index",
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                )
+            self._indexed = True
+
+    def upsert(self, ids: list, vectors: list, payloads: list, wait: bool = True) -> int:
+        """
+        Insert or replace points; returns the number written.
+
+        With wait=False Qdrant acknowledges the batch once it is logged,
+        without waiting for it to be applied (for bulk loads).
+        """
+        if self.versioned:
+            # Written to the version the alias points to now, not the cached one
+            self._forget("target")
+        collection_name, projection = self._resolve()
+        points = [
+            rest.PointStruct(id=point_id, vector=list(vector), payload=payload)
+            for point_id, vector, payload in zip(ids, self._vectors(vectors, projection), payloads)
+        ]
+        self._call("upsert", collection_name=collection_name, points=points, wait=wait)
+        return len(points)
+
+    def document_point_ids(self, document_id: str) -> set:
+        document_filter = rest.Filter(
+            must=[rest.FieldCondition(key="metadata.document_id", match=rest.MatchValue(value=document_id))]
+        )
+        ids = set()
+        offset = None
+        while True:
+            points, offset = self._call(
+                "scroll",
+                collection_name=self.collection_name,
+                scroll_filter=document_filter,
+                limit=1024,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+            ids.update(str(point.id) for point in points)
+            if offset is None:
+                return ids
+
+    def document_ids(self) -> list:
+        # Counted from the keyword index of the document ids
+        response = self._call("facet", collection_name=self.collection_name, key="metadata.document_id",
+                              limit=1_000_000, exact=True)
+        return sorted(str(hit.value) for hit in response.hits)
+
+    def iter_points(self, batch_size: int = 256, with_payload: bool = True):
+        """
+        Scroll through every stored point.
+
+        Args:
+            batch_size (int): Points per scroll request.
+            with_payload (bool): Fetch the payloads (else they are None).
+
+        Yields:
+            list: (point id, payload) pairs of one page.
+        """
+        offset = None
+        while True:
+            points, offset = self._call("scroll", collection_name=self.collection_name,
+                                        scroll_filter=WITHOUT_PROJECTION_POINT, limit=batch_size, offset=offset,
+                                        with_payload=with_payload, with_vectors=False)
+            if points:
+                yield [(str(point.id), point.payload) for point in points]
+            if offset is None:
+                return
+
+    def point_ids(self) -> set:
+        return {point_id for page in self.iter_points(1024, with_payload=False) for point_id, _ in page}
+
+    def present_ids(self, ids: list) -> set:
+        points = self._call(
+            "retrieve", collection_name=self.collection_name, ids=ids, with_payload=False, with_vectors=False
+        )
+        return {str(point.id) for point in points}
+
+    def delete(self, ids: list):
+        if ids:
+            self._call("delete", collection_name=self.collection_name, points_selector=rest.PointIdsList(points=list(ids)))
+
+    def set_quantization(self, mode: str, timeout: float = 600):
+        """
+        Convert the existing collection to another quantization mode in place.
+
+        Qdrant rebuilds the quantized vectors in the background while searches
+        keep working; this waits until the collection is optimized again.
+
+        Args:
+            mode (str): none, int8 or binary.
+            timeout (float): Seconds to wait for the conversion.
+        """
+        quantized = mode != "none"
+        self._call(
+            "update_collection",
+            collection_name=self.collection_name,
+            vectors_config={"": rest.VectorParamsDiff(on_disk=quantized)},
+            quantization_config=quantization_config(mode) if quantized else rest.Disabled.DISABLED,
+        )
+        self.quantization = mode
+        self.invalidate()
+        self._wait_optimized(self.collection_name, timeout)
+        logger.info(f"Collection '{self.collection_name}' set to quantization: {mode}")
+
+    def _wait_optimized(self, collection_name: str, timeout: float):
+        deadline = time.monotonic() + timeout
+        while self._call("get_collection", collection_name).status != rest.CollectionStatus.GREEN:
+            if time.monotonic() > deadline:
+                logger.warning(f"Collection '{collection_name}' is still being optimized.")
+                break
+            time.sleep(1)
+
+    def sibling(self, collection_name: str) -> "QdrantStore":
+        """An unversioned store of another collection, with the client and settings of this one."""
+        return QdrantStore(self.client, collection_name, vector_size=self.vector_size, quantization=self.quantization,
+                           oversampling=self.oversampling, metadata_ttl=self.metadata_ttl, projections=self.projections)
+
+    def finish_bulk_load(self, collection_name: str, m: int = 16, timeout: float = 3600):
+        """
+        Build the HNSW graph of a collection created with bulk=True, and wait until it is searchable at full speed.
+
+        Args:
+            collection_name (str): The collection.
+            m (int): Graph degree (Qdrant's default is 16).
+            timeout (float): Seconds to wait for indexing.
+        """
+        self._call("update_collection", collection_name=collection_name, hnsw_config=rest.HnswConfigDiff(m=m))
+        self._wait_optimized(collection_name, timeout)
+
+    def target(self):
+        """The collection the alias points to, or None (no alias, or an unversioned store)."""
+        if not self.versioned:
+            return None
+        target = self._cached("target")
+        if target is None:
+            aliases = self._call("get_aliases").aliases
+            target = next((alias.collection_name for alias in aliases if alias.alias_name == self.collection_name), "")
+            self._remember("target", target)
+        return target or None
+
+    def versions(self) -> list:
+        """The existing version numbers of the collection, in increasing order."""
+        names = [collection.name for collection in self._call("get_collections").collections]
+        return sorted(number for number in (version_number(self.collection_name, name) for name in names)
+                      if number is not None)
+
+    def switch_alias(self, collection_name: str):
+        """
+        Point the alias at another version in one atomic request.
+
+        Searches in flight finish on the old version; later ones use the new
+        one. A plain collection holding the alias name (from before
+        versioning) is deleted first, which leaves a short window without data.
+
+        Args:
+            collection_name (str): The version to serve.
+        """
+        operations = []
+        if self.target() is not None:
+            operations.append(rest.DeleteAliasOperation(delete_alias=rest.DeleteAlias(alias_name=self.collection_name)))
+        elif self._call("collection_exists", self.collection_name):
+            logger.warning(f"Replacing unversioned collection '{self.collection_name}' by an alias.")
+            self._call("delete_collection", self.collection_name)
+        operations.append(rest.CreateAliasOperation(
+            create_alias=rest.CreateAlias(collection_name=collection_name, alias_name=self.collection_name)))
+        self._call("update_collection_aliases", change_aliases_operations=operations)
+        self.invalidate()
+        logger.info(f"Alias '{self.collection_name}' now points to '{collection_name}'.")
+
+    def collect_garbage(self, keep: int = 1) -> list:
+        """
+        Delete old versions, keeping the live one and the keep newest others (for rollback).
+
+        Versions newer than the live one (a reindex in progress) are kept.
+
+        Args:
+            keep (int): Previous versions to keep.
+
+        Returns:
+            list: Names of the deleted collections.
+        """
+        live = version_number(self.collection_name, self.target() or "")
+        if live is None:
+            return []
+        older = [number for number in self.versions() if number < live]
+        deleted = [version_name(self.collection_name, number) for number in older[:max(0, len(older) - keep)]]
+        for name in deleted:
+            self._call("delete_collection", name)
+            self._forget_projection(name)
+            logger.info(f"Deleted old collection version '{name}'.")
+        return deleted
+
+    def projection(self):
+        """The projection of the live version, or None when it stores full-dimension vectors."""
+        return self._resolve()[1]
+
+    def _resolve(self):
+        """The collection requests are addressed to and its projection (None without one)."""
+        if self.projections is None:
+            return self.collection_name, None
+        collection_name = self.target() or self.collection_name
+        return collection_name, self.projections.get(collection_name, lambda: self._load_projection(collection_name))
+
+    def _load_projection(self, collection_name: str):
+        points = self._call("retrieve", collection_name=collection_name, ids=[PROJECTION_POINT_ID],
+                            with_payload=True, with_vectors=False)
+        return Projection.from_payload(points[0].payload["projection"]) if points else None
+
+    def save_projection(self, projection: Projection):
+        """
+        Store the projection of this collection in its reserved point.
+
+        Called on a new version before any chunk is written to it, so that
+        every process that reads the version finds its projection.
+
+        Args:
+            projection (Projection): The fitted projection.
+        """
+        # Any unit vector: the point is never searched
+        vector = [1.0] + [0.0] * (projection.dim - 1)
+        self._call("upsert", collection_name=self.collection_name, points=[
+            rest.PointStruct(id=PROJECTION_POINT_ID, vector=vector, payload={"projection": projection.to_payload()})
+        ])
+        self.projections.put(self.collection_name, projection)
+        logger.info("Saved %s projection to %d dimensions for '%s'", projection.method, projection.dim,
+                    self.collection_name)
+
+    @staticmethod
+    def _vectors(vectors, projection, projected: bool = False):
+        if projection is None or projected or not len(vectors):
+            return vectors
+        return projection.apply(vectors).tolist()
+
+    @staticmethod
+    def _filter(query_filter, projection):
+        qdrant_filter = query_filter.to_qdrant() if query_filter else None
+        if projection is None:
+            return qdrant_filter
+        # Only projected versions hold the reserved point
+        qdrant_filter = qdrant_filter or rest.Filter()
+        qdrant_filter.must_not = WITHOUT_PROJECTION_POINT.must_not
+        return qdrant_filter
+
+    def _searching(self, method: str, request, *args):
+        """Call a search method with the request built by request(collection, projection, *args)."""
+        try:
+            return self._call(method, **request(*self._resolve(), *args))
+        except Exception as e:
+            if self.projections is None or not is_not_found(e):
+                raise
+            # The version cached for this store was deleted by a reindex: resolve the alias again
+            return self._call(method, **request(*self._resolve(), *args))
+
+    async def _asearching(self, method: str, request, *args):
+        try:
+            return await self._acall(method, **request(*self._resolve(), *args))
+        except Exception as e:
+            if self.projections is None or not is_not_found(e):
+                raise
+            return await self._acall(method, **request(*self._resolve(), *args))
+
+    def _forget_projection(self, collection_name: str):
+        if self.projections is not None:
+            self.projections.delete(collection_name)
+
+    def _search_params(self, exact: bool):
+        if exact:
+            return rest.SearchParams(exact=True, quantization=rest.QuantizationSearchParams(ignore=True))
+        if self.quantization == "none":
+            return None
+        return rest.SearchParams(
+            quantization=rest.QuantizationSearchParams(rescore=True, oversampling=self.oversampling)
+        )
+
+    def _query(self, collection_name: str, projection, vector, k: int, exact: bool, query_filter,
+               projected: bool = False) -> dict:
+        return {
+            "collection_name": collection_name,
+            "query": list(self._vectors([vector], projection, projected)[0]),
+            "query_filter": self._filter(query_filter, projection),
+            "limit": k,
+            "with_payload": True,
+            "search_params": self._search_params(exact),
+        }
+
+    def _batch_query(self, collection_name: str, projection, vectors: list, k: int, query_filter) -> dict:
+        qdrant_filter = self._filter(query_filter, projection)
+        requests = [
+            rest.QueryRequest(query=list(vector), filter=qdrant_filter, limit=k, with_payload=True,
+                              params=self._search_params(False))
+            for vector in self._vectors(vectors, projection)
+        ]
+        return {"collection_name": collection_name, "requests": requests}
+
+    @staticmethod
+    def _results(response) -> list:
+        return [(payload_document(point.payload, str(point.id)), point.score) for point in response.points]
+
+    def search(self, vector, k: int, exact: bool = False, query_filter=None, projected: bool = False) -> list:
+        return self._results(self._searching("query_points", self._query, vector, k, exact, query_filter, projected))
+
+    async def asearch(self, vector, k: int, exact: bool = False, query_filter=None) -> list:
+        if self._async_client_factory is None:
+            return await super().asearch(vector, k, exact, query_filter)
+        return self._results(await self._asearching("query_points", self._query, vector, k, exact, query_filter))
+
+    def search_batch(self, vectors: list, k: int, query_filter=None) -> list:
+        if not len(vectors):
+            return []
+        responses = self._searching("query_batch_points", self._batch_query, vectors, k, query_filter)
+        return [self._results(response) for response in responses]
+
+    async def asearch_batch(self, vectors: list, k: int, query_filter=None) -> list:
+        if self._async_client_factory is None:
+            return await super().asearch_batch(vectors, k, query_filter)
+        if not len(vectors):
+            return []
+        responses = await self._asearching("query_batch_points", self._batch_query, vectors, k, query_filter)
+        return [self._results(response) for response in responses]
+
+    def get(self, ids: list) -> list:
+        points = self._call(
+            "retrieve", collection_name=self.collection_name, ids=list(ids), with_payload=True, with_vectors=False
+        )
+        return [payload_document(point.payload, str(point.id)) for point in points]
+
+    def sample_vectors(self, count: int):
+        points, _ = self._call(
+            "scroll", collection_name=self.collection_name, scroll_filter=WITHOUT_PROJECTION_POINT, limit=count,
+            with_payload=False, with_vectors=True
+        )
+        return np.asarray([point.vector for point in points], dtype=np.float32).reshape(len(points), -1)
+
+    def drop(self) -> bool:
+        if not self.exists():
+            return False
+        if self.target() is not None:
+            # Deleting the versions also removes the alias
+            for number in self.versions():
+                self._call("delete_collection", version_name(self.collection_name, number))
+                self._forget_projection(version_name(self.collection_name, number))
+        else:
+            self._call("delete_collection", self.collection_name)
+            self._forget_projection(self.collection_name)
+        self.invalidate()
+        self._remember("exists", False)
+        return True
+
+
+def vector_backend() -> str:
+    """
+    Configured vector store backend.
+
+    Returns:
+        str: "qdrant" (default) or "local".
+    """
+    backend = os.getenv('vector_store', "qdrant").strip().lower()
+    if backend not in ("qdrant", "local"):
+        raise ValueError(f"Unknown vector_store backend: {backend}")
+    return backend
+
+
+def qdrant_settings_missing(qdrant_url: str, qdrant_api_key: str) -> bool:
+    """
+    Whether the Qdrant backend is selected without its connection settings.
+
+    Args:
+        qdrant_url (str): The URL of the Qdrant instance.
+        qdrant_api_key (str): The API key for authentication.
+
+    Returns:
+        bool: True if the settings are required but missing.
+    """
+    return vector_backend() == "qdrant" and not all([qdrant_url, qdrant_api_key])
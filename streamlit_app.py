@@ -1,46 +1,98 @@
 import os 
 import shutil
+from datetime import datetime, time, timedelta
 import streamlit as st
 from dotenv import load_dotenv
-from src.preprocessing import load_documents, split_documents, upload_to_qdrant
-from src.retrieve import retrieve_answer_from_docs, clear_qdrant_data
+from src.preprocessing import ingest_document
+from src.retrieve import stream_answer_from_docs, list_documents, delete_document
+from src import registry
+from src.vector_store import qdrant_settings_missing
+from src.filters import SearchFilter
 from custom_logger import logger
 from exception import CustomException
 
 # Load environment variables
 load_dotenv()
 
+def answer_tokens(question, query_filter=None):
+    """Yield the answer tokens of a question, skipping the sources event."""
+    for event, data in stream_answer_from_docs(question, query_filter):
+        if event == "token":
+            yield data
+
+def parse_pages(text):
+    """
+    Page numbers as shown in the PDF viewer, e.g. "2, 5-7", as the 0-based pages of the chunk metadata.
+
+    Raises:
+        ValueError: If the text is not a list of page numbers and ranges.
+    """
+    pages = set()
+    for part in filter(None, (item.strip() for item in text.split(","))):
+        first, _, last = part.partition("-")
+        if not first.strip().isdigit() or (last and not last.strip().isdigit()):
+            raise ValueError(f"Not a page or page range: {part}")
+        pages.update(range(int(first), int(last or first) + 1))
+    return [page - 1 for page in sorted(pages) if page >= 1]
+
+def upload_range(days):
+    """Unix timestamps (after, before) of a date range from st.date_input, in server time; None where open."""
+    if not days:
+        return None, None
+    start, end = days[0], days[-1]
+    return (datetime.combine(start, time.min).timestamp(),
+            datetime.combine(end + timedelta(days=1), time.min).timestamp())
+
+@st.cache_resource
+def warm_up_registry():
+    """Warm the shared model registry and sync the lexical index once per Streamlit server process."""
+    registry.warm_up()
+    registry.sync_lexical_index()
+    return True
+
+warm_up_registry()
+
 # Streamlit UI components
 st.title("Document Processing and Querying App")
 
 # Sidebar buttons
 st.sidebar.title("Options")
-delete_data = st.sidebar.button("Delete Existing Data")
+try:
+    documents = [] if qdrant_settings_missing(os.getenv('qdrant_url'), os.getenv('qdrant_api')) else list_documents()
+except Exception as e:
+    documents = []
+    logger.error("Error listing documents: %s", str(e))
+document_to_delete = st.sidebar.selectbox("Stored documents", documents, index=None,
+                                          placeholder="Select a document to delete")
+delete_data = st.sidebar.button("Delete Document", disabled=document_to_delete is None)
 uploaded_file = st.sidebar.file_uploader("Upload a PDF file", type=["pdf"])
+# Uploading under an existing id replaces that document, so different files sharing a name need their own ids
+upload_document_id = st.sidebar.text_input("Document id", placeholder="Defaults to the file name",
+                                           help="Uploading under an existing id replaces that document.")
 
 if delete_data:
     try:
-        st.write("Deleting existing documents from the database...")
+        st.write(f"Deleting {document_to_delete} from the database...")
 
-        # Call the function to clear Qdrant data
+        # Delete only this document's chunks; the others stay searchable
         qdrant_url = os.getenv('qdrant_url')
         qdrant_api_key = os.getenv('qdrant_api')
-        collection_name = "rag"  
+        collection_name = "rag"
 
-        if not all([qdrant_url, qdrant_api_key]):
+        if qdrant_settings_missing(qdrant_url, qdrant_api_key):
             raise ValueError("One or more environment variables are missing.")
 
-        cleared = clear_qdrant_data(qdrant_url, qdrant_api_key, collection_name)
+        deleted = delete_document(document_to_delete, qdrant_url, qdrant_api_key, collection_name)
 
-        if cleared:
-            st.success("All documents have been deleted from the database. Ready for new uploads.")
+        if deleted:
+            st.success(f"{document_to_delete} has been deleted from the database ({deleted} chunks).")
             st.session_state["question"] = ""
         else:
-            st.warning("Collection is already empty or does not exist.")
+            st.warning(f"{document_to_delete} is not stored in the database.")
 
     except Exception as e:
-        st.error(f"Error clearing database: {str(e)}")
-        logger.error("Error clearing Qdrant data: %s", str(e))
+        st.error(f"Error deleting document: {str(e)}")
+        logger.error("Error deleting document: %s", str(e))
 
 # File upload section for PDF
 if uploaded_file is not None:
@@ -50,23 +102,18 @@ if uploaded_file is not None:
         with open(temp_filename, "wb") as buffer:
             shutil.copyfileobj(uploaded_file, buffer)
 
-        # Step 1: Load documents from the uploaded PDF
-        st.write("Processing the document...")
-        documents = load_documents(temp_filename)
-
-        # Step 2: Split the documents into chunks
-        chunk_size = 2000  # Adjust as necessary
-        chunk_overlap = 400  # Adjust as necessary
-        chunks = split_documents(documents, chunk_size, chunk_overlap)
-
-        # Step 3: Upload chunks to Qdrant
         qdrant_url = os.getenv('qdrant_url')
         qdrant_api_key = os.getenv('qdrant_api')
 
-        if not all([qdrant_url, qdrant_api_key]):
+        if qdrant_settings_missing(qdrant_url, qdrant_api_key):
             raise ValueError("One or more environment variables are missing.")
 
-        upload_to_qdrant(chunks, qdrant_url, qdrant_api_key)
+        # Load, split and upload the PDF page by page
+        st.write("Processing the document...")
+        chunk_size = 2000  # Adjust as necessary
+        chunk_overlap = 400  # Adjust as necessary
+        ingest_document(temp_filename, qdrant_url, qdrant_api_key, chunk_size, chunk_overlap,
+                        document_id=upload_document_id.strip() or uploaded_file.name)
 
         # Optionally, remove the temporary file after processing
         os.remove(temp_filename)
@@ -87,11 +134,23 @@ if uploaded_file is not None:
 st.subheader("Ask a Question")
 
 question = st.text_input("Enter your question:")
+# The search is restricted by the filters that are set; empty ones do not restrict
+with st.expander("Filters"):
+    searched_documents = st.multiselect("Search only in", documents, placeholder="All documents")
+    pages_column, dates_column = st.columns(2)
+    searched_pages = pages_column.text_input("Pages", placeholder="All pages, or e.g. 2, 5-7")
+    upload_days = dates_column.date_input("Uploaded between", value=(), format="YYYY-MM-DD")
 
 if question:
     try:
-        answer = retrieve_answer_from_docs(question)
-        st.write(f"Answer: {answer}")
+        uploaded_after, uploaded_before = upload_range(upload_days)
+        query_filter = SearchFilter(document_ids=searched_documents, pages=parse_pages(searched_pages),
+                                    ingested_after=uploaded_after, ingested_before=uploaded_before)
+        st.write("Answer:")
+        st.write_stream(answer_tokens(question, query_filter or None))
+
+    except ValueError as ve:
+        st.error(f"Error: {str(ve)}")
 
     except CustomException as ce:
         st.warning(str(ce))  # Display a friendly message for CustomException
@@ -0,0 +1,19 @@
+import os
+import sys
+
+# Make the top-level modules (custom_logger, exception) and the src package importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from benchmarks.corpus import write_pdf
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Factory writing synthetic PDFs into the test's temporary directory."""
+    def make(name: str, pages: list) -> str:
+        path = str(tmp_path / name)
+        write_pdf(path, pages)
+        return path
+    return make
@@ -0,0 +1,163 @@
+import time
+import asyncio
+import threading
+import pytest
+from src.admission import AdmissionController, OverloadedError, SingleFlight
+from src.telemetry import COALESCED, LLM_SHED
+
+
+def test_single_flight_shares_one_computation():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"answer": 42}
+
+    coalesced = COALESCED.value()
+    leader = threading.Thread(target=lambda: results.append(flight.do("q", work)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("q", work))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    while COALESCED.value() - coalesced < 4:
+        time.sleep(0.005)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"answer": 42}] * 5
+    assert flight.in_flight() == 0
+    # Once finished, the next call computes again
+    assert flight.do("q", lambda: "fresh") == "fresh"
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("q", fail)
+    assert flight.in_flight() == 0
+
+
+def test_limit_queue_and_shedding():
+    controller = AdmissionController(limit=1, max_queue=1, timeout=5)
+    release = threading.Event()
+    order = []
+
+    def hold(name):
+        with controller.admit():
+            order.append(name)
+            release.wait(5)
+
+    first = threading.Thread(target=hold, args=("first",))
+    first.start()
+    while controller.stats()["in_flight"] < 1:
+        time.sleep(0.005)
+    second = threading.Thread(target=hold, args=("second",))
+    second.start()
+    while controller.stats()["queued"] < 1:
+        time.sleep(0.005)
+
+    shed = LLM_SHED.value(reason="queue_full")
+    with pytest.raises(OverloadedError):
+        with controller.admit():
+            pass
+    assert LLM_SHED.value(reason="queue_full") == shed + 1
+
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert order == ["first", "second"]
+    assert controller.stats() == {"limit": 1, "in_flight": 0, "queued": 0, "max_queue": 1}
+
+
+def test_queued_call_times_out_at_its_deadline():
+    controller = AdmissionController(limit=1, max_queue=4, timeout=0.05)
+    with controller.admit():
+        started = time.monotonic()
+        with pytest.raises(OverloadedError):
+            with controller.admit():
+                pass
+        assert time.monotonic() - started < 1
+    assert controller.stats()["queued"] == 0
+    with controller.admit():
+        pass
+
+
+def test_expected_wait_beyond_deadline_is_shed_at_once():
+    controller = AdmissionController(limit=1, max_queue=4, timeout=5)
+    controller._service_seconds = 2.0  # calls have been taking 2s
+    with controller.admit():
+        shed = LLM_SHED.value(reason="deadline")
+        started = time.monotonic()
+        with pytest.raises(OverloadedError):
+            with controller.admit(deadline=time.monotonic() + 0.5):
+                pass
+        assert time.monotonic() - started < 0.1
+        assert LLM_SHED.value(reason="deadline") == shed + 1
+
+
+def test_async_waiter_gets_the_released_slot():
+    controller = AdmissionController(limit=1, max_queue=2, timeout=5)
+
+    async def run():
+        order = []
+
+        async def call(name, seconds):
+            async with controller.aadmit():
+                order.append(name)
+                await asyncio.sleep(seconds)
+
+        await asyncio.gather(call("a", 0.05), call("b", 0), call("c", 0))
+        return order
+
+    assert asyncio.run(run()) == ["a", "b", "c"]
+    assert controller.stats()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("granted_first", [False, True])
+def test_cancelled_async_waiter_does_not_keep_a_slot(granted_first):
+    controller = AdmissionController(limit=1, max_queue=2, timeout=5)
+
+    async def run():
+        holding, release = asyncio.Event(), asyncio.Event()
+        tasks = {}
+
+        async def holder():
+            async with controller.aadmit():
+                holding.set()
+                await release.wait()
+            if granted_first:
+                # The slot was just handed over, but the waiter has not resumed yet.
+                tasks["waiter"].cancel()
+
+        async def queued():
+            async with controller.aadmit():
+                pass
+
+        first = asyncio.create_task(holder())
+        await holding.wait()
+        tasks["waiter"] = asyncio.create_task(queued())
+        await asyncio.sleep(0.01)
+        assert controller.stats()["queued"] == 1
+        if not granted_first:
+            tasks["waiter"].cancel()
+            await asyncio.sleep(0)
+        release.set()
+        await first
+        with pytest.raises(asyncio.CancelledError):
+            await tasks["waiter"]
+        assert controller.stats() == {"limit": 1, "in_flight": 0, "queued": 0, "max_queue": 2}
+        async with controller.aadmit():
+            return controller.stats()["in_flight"]
+
+    assert asyncio.run(run()) == 1
@@ -0,0 +1,89 @@
+from src import answer_cache as answer_cache_module
+from src.answer_cache import AnswerCache, normalize_question
+
+
+def test_normalize_question():
+    assert normalize_question("  What IS\tclause 4.2? ") == "what is clause 4.2?"
+
+
+def test_exact_hit_needs_no_vector():
+    cache = AnswerCache()
+    cache.store("What is clause 4.2?", None, "An answer")
+
+    assert cache.lookup_exact("what is   clause 4.2?") == {"answer": "An answer", "sources": []}
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_semantic_threshold():
+    cache = AnswerCache(threshold=0.9)
+    cache.store("first", [1.0, 0.0, 0.0], "A")
+
+    assert cache.lookup_similar([0.99, 0.1, 0.0])["answer"] == "A"
+    assert cache.lookup_similar([0.5, 0.5, 0.0]) is None
+    assert cache.lookup_similar([0.0, 0.0, 0.0]) is None
+    stats = cache.stats()
+    assert (stats["semantic_hits"], stats["misses"]) == (1, 1)
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, "monotonic", lambda: now[0])
+    cache = AnswerCache(ttl_seconds=10)
+    cache.store("q", [1.0, 0.0], "A")
+
+    now[0] += 5
+    assert cache.lookup_exact("q")["answer"] == "A"
+    now[0] += 6
+    assert cache.lookup_exact("q") is None
+    cache.store("q", [1.0, 0.0], "A")
+    now[0] += 11
+    assert cache.lookup_similar([1.0, 0.0]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction():
+    cache = AnswerCache(max_entries=2)
+    cache.store("a", None, "A")
+    cache.store("b", None, "B")
+    cache.lookup_exact("a")
+    cache.store("c", None, "C")
+
+    assert cache.lookup_exact("b") is None
+    assert cache.lookup_exact("a")["answer"] == "A"
+    assert cache.lookup_exact("c")["answer"] == "C"
+
+
+def test_store_dropped_after_invalidation():
+    cache = AnswerCache()
+    generation = cache.generation
+    cache.invalidate()
+    cache.store("q", [1.0, 0.0], "stale", generation)
+
+    assert cache.lookup_exact("q") is None
+    cache.store("q", [1.0, 0.0], "fresh", cache.generation)
+    assert cache.lookup_exact("q")["answer"] == "fresh"
+
+
+def test_invalidation_is_shared_through_generation_file(tmp_path):
+    path = str(tmp_path / "rag.generation")
+    api_cache = AnswerCache(generation_path=path)
+    ui_cache = AnswerCache(generation_path=path)
+    api_cache.store("q", [1.0, 0.0], "A", api_cache.generation)
+    generation = api_cache.generation
+
+    ui_cache.invalidate()
+
+    assert api_cache.lookup_exact("q") is None
+    assert api_cache.lookup_similar([1.0, 0.0]) is None
+    api_cache.store("q", [1.0, 0.0], "stale", generation)
+    assert api_cache.lookup_exact("q") is None
+    assert AnswerCache(generation_path=path).generation == 1
+
+
+def test_sources_are_kept_with_the_answer():
+    cache = AnswerCache(threshold=0.9)
+    sources = [{"source": "contract.pdf", "page": 3}]
+    cache.store("q", [1.0, 0.0], "A", cache.generation, sources)
+
+    assert cache.lookup_exact("q")["sources"] == sources
+    assert cache.lookup_similar([1.0, 0.05])["sources"] == sources
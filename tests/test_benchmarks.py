@@ -0,0 +1,41 @@
+import numpy as np
+import pypdf
+
+from benchmarks.corpus import make_corpus, synthetic_pages
+from benchmarks.fakes import FakeChatModel, HashingEmbeddings
+from benchmarks.run import latency_summary, make_questions
+
+
+def test_corpus_is_deterministic_and_readable(tmp_path):
+    assert synthetic_pages(3, seed=1) == synthetic_pages(3, seed=1)
+    assert synthetic_pages(3, seed=1) != synthetic_pages(3, seed=2)
+
+    paths = make_corpus(str(tmp_path), [2, 5])
+    reader = pypdf.PdfReader(paths[5])
+    assert len(reader.pages) == 5
+    assert "5.1" in reader.pages[4].extract_text()
+
+
+def test_hashing_embeddings_are_stable_and_normalized():
+    embeddings = HashingEmbeddings(size=64)
+    first, second, other = embeddings.embed_documents(["payment terms", "payment terms", "network backup"])
+    assert first == second
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert np.dot(first, embeddings.embed_query("late payment terms")) > np.dot(other, embeddings.embed_query("late payment terms"))
+
+
+def test_fake_chat_model_streams_its_answer():
+    llm = FakeChatModel(latency_ms=0, tokens_per_second=10000, answer_tokens=5)
+    chunks = [chunk.content for chunk in llm.stream("question")]
+    assert len(chunks) == 5
+    assert "".join(chunks) == llm.invoke("question").content
+
+
+def test_questions_are_distinct_and_latencies_summarized():
+    questions = make_questions(10)
+    assert len({next(questions) for _ in range(100)}) == 100
+
+    summary = latency_summary([i / 1000 for i in range(1, 101)])
+    assert summary["p50_ms"] == 50.5
+    assert summary["max_ms"] == 100.0
+    assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"]
@@ -0,0 +1,38 @@
+from langchain_core.documents import Document
+
+from src.chunk_ids import assign_chunk_ids, chunk_id, document_id_of
+
+
+def chunks(*texts, source="/tmp/temp_abc_report.pdf"):
+    return [Document(page_content=text, metadata={"source": source, "page": i}) for i, text in enumerate(texts)]
+
+
+def test_ids_are_stable_across_runs():
+    first = [point_id for _, point_id in assign_chunk_ids(chunks("alpha", "beta"), "report.pdf")]
+    second = [point_id for _, point_id in assign_chunk_ids(chunks("alpha", "beta"), "report.pdf")]
+    assert first == second and len(set(first)) == 2
+
+
+def test_changed_chunk_gets_new_id_and_others_keep_theirs():
+    before = [point_id for _, point_id in assign_chunk_ids(chunks("alpha", "beta", "gamma"), "report.pdf")]
+    after = [point_id for _, point_id in assign_chunk_ids(chunks("alpha", "BETA", "gamma"), "report.pdf")]
+    assert before[0] == after[0] and before[2] == after[2]
+    assert before[1] != after[1]
+
+
+def test_repeated_chunks_are_distinct_points():
+    ids = [point_id for _, point_id in assign_chunk_ids(chunks("same", "same", "same"), "report.pdf")]
+    assert len(set(ids)) == 3
+
+
+def test_document_id_scopes_ids_and_is_recorded():
+    paired = list(assign_chunk_ids(chunks("alpha"), "a.pdf"))
+    other = list(assign_chunk_ids(chunks("alpha"), "b.pdf"))
+    assert paired[0][1] != other[0][1]
+    assert paired[0][0].metadata["document_id"] == "a.pdf"
+
+
+def test_default_document_id_is_source_file_name():
+    chunk = chunks("alpha")[0]
+    assert document_id_of(chunk) == "temp_abc_report.pdf"
+    assert chunk_id("x", "y") == chunk_id("x", "y", 0) != chunk_id("x", "y", 1)
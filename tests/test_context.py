@@ -0,0 +1,63 @@
+from langchain_core.documents import Document
+
+from src.context import merge_overlapping, pack_context
+
+
+def words(count):
+    return [f"w{i}" for i in range(count)]
+
+
+def page_chunks(text, size, overlap, **metadata):
+    """Fixed-size character chunks of text with their start_index, like the splitter."""
+    chunks, start = [], 0
+    while start < len(text):
+        chunks.append(Document(page_content=text[start:start + size],
+                               metadata={"source": "a.pdf", "page": 0, "start_index": start, **metadata}))
+        if start + size >= len(text):
+            break
+        start += size - overlap
+    return chunks
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_overlapping_chunks_merge_back_into_the_page_text():
+    text = " ".join(words(100))
+    chunks = page_chunks(text, 120, 40)
+    packed = pack_context(list(reversed(chunks)), max_tokens=1000, count_tokens=count_words)
+    assert [doc.page_content for doc in packed] == [text]
+
+
+def test_chunks_without_start_index_merge_on_overlapping_text():
+    text = " ".join(words(60))
+    chunks = page_chunks(text, 150, 50)
+    for chunk in chunks:
+        del chunk.metadata["start_index"]
+    passages = merge_overlapping([chunks[1], chunks[0]])
+    assert len(passages) == 1
+    assert passages[0][0].page_content == text[:len(chunks[0].page_content) + len(chunks[1].page_content) - 50]
+    assert passages[0][1] == 0
+
+
+def test_near_duplicates_are_dropped_and_result_is_in_document_order():
+    body = " ".join(words(50))
+    docs = [
+        Document(page_content=body + " tail", metadata={"source": "a.pdf", "page": 3}),
+        Document(page_content="intro " + " ".join(words(20)), metadata={"source": "a.pdf", "page": 1}),
+        Document(page_content=body, metadata={"source": "b.pdf", "page": 0}),
+    ]
+    packed = pack_context(docs, max_tokens=1000, count_tokens=count_words)
+    assert [doc.metadata["page"] for doc in packed] == [1, 3]
+
+
+def test_budget_is_respected_by_relevance_and_best_passage_is_truncated():
+    docs = [Document(page_content=" ".join(f"d{i}w{j}" for j in range(10)), metadata={"source": f"{i}.pdf", "page": 0})
+            for i in range(5)]
+    packed = pack_context(docs, max_tokens=25, count_tokens=count_words)
+    assert [doc.metadata["source"] for doc in packed] == ["0.pdf", "1.pdf"]
+
+    huge = [Document(page_content=" ".join(words(100)), metadata={"source": "a.pdf", "page": 0})]
+    packed = pack_context(huge, max_tokens=10, count_tokens=count_words)
+    assert count_words(packed[0].page_content) <= 10
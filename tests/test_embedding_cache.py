@@ -0,0 +1,126 @@
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src.embedding_cache import EmbeddingCache, CachedEmbeddings, text_hash
+
+DIM = 8
+
+
+def vector(seed):
+    return np.random.default_rng(seed).random(DIM, dtype=np.float32)
+
+
+def make_cache(tmp_path, capacity=16, dtype="float16"):
+    return EmbeddingCache(str(tmp_path), "org/model", dtype=dtype, max_bytes=capacity * DIM * np.dtype(dtype).itemsize)
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return super().embed_documents(texts)
+
+
+def test_round_trip_and_reload(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put_many(["a", "b"], [vector(1), vector(2)])
+
+    reopened = make_cache(tmp_path)
+    found = reopened.get_many(["a", "missing", "b"])
+    assert sorted(found) == [0, 2]
+    np.testing.assert_allclose(found[0], vector(1), atol=1e-3)
+    np.testing.assert_allclose(found[2], vector(2), atol=1e-3)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, capacity=2)
+    cache.put_many(["a", "b"], [vector(1), vector(2)])
+    cache.get_many(["a"])
+    cache.put_many(["c"], [vector(3)])
+
+    assert len(cache) == 2
+    assert sorted(cache.get_many(["a", "b", "c"])) == [0, 2]
+    # The recency of "a" was persisted, so a reload evicts the same way.
+    assert sorted(make_cache(tmp_path, capacity=2).get_many(["a", "b", "c"])) == [0, 2]
+
+
+def test_batch_larger_than_capacity_keeps_latest(tmp_path):
+    cache = make_cache(tmp_path, capacity=2)
+    cache.put_many(["a", "b", "c"], [vector(1), vector(2), vector(3)])
+
+    found = cache.get_many(["a", "b", "c"])
+    assert sorted(found) == [1, 2]
+    np.testing.assert_allclose(found[2], vector(3), atol=1e-3)
+
+
+def test_two_instances_on_one_directory_do_not_clobber(tmp_path):
+    first = make_cache(tmp_path)
+    second = make_cache(tmp_path)
+    first.put_many(["x"], [vector(1)])
+    second.put_many(["y"], [vector(2)])
+
+    np.testing.assert_allclose(first.get_many(["x"])[0], vector(1), atol=1e-3)
+    np.testing.assert_allclose(first.get_many(["y"])[0], vector(2), atol=1e-3)
+    assert len(make_cache(tmp_path)) == 2
+
+
+def test_dimension_change_resets(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put_many(["a"], [vector(1)])
+    cache.put_many(["b"], [np.ones(DIM * 2, dtype=np.float32)])
+
+    assert cache.dim == DIM * 2
+    assert cache.get_many(["a"]) == {}
+    assert sorted(cache.get_many(["b"])) == [0]
+
+
+def test_dtype_change_resets(tmp_path):
+    make_cache(tmp_path, dtype="float16").put_many(["a"], [vector(1)])
+
+    cache = make_cache(tmp_path, dtype="float32")
+    assert len(cache) == 0
+    cache.put_many(["a"], [vector(1)])
+    np.testing.assert_allclose(cache.get_many(["a"])[0], vector(1))
+
+
+def test_orphaned_vector_file_is_reset(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put_many(["a"], [vector(1)])
+    (tmp_path / "org__model" / "index.log").unlink()
+
+    cache = make_cache(tmp_path, capacity=32)
+    assert len(cache) == 0
+    cache.put_many(["b"], [vector(2)])
+    assert sorted(cache.get_many(["b"])) == [0]
+
+
+def test_changed_size_limit_keeps_persisted_capacity(tmp_path):
+    make_cache(tmp_path, capacity=4).put_many(["a"], [vector(1)])
+
+    cache = make_cache(tmp_path, capacity=64)
+    assert cache.capacity == 4
+    cache.put_many(["b"], [vector(2)])
+    assert sorted(cache.get_many(["a", "b"])) == [0, 1]
+
+
+def test_torn_log_record_is_dropped(tmp_path):
+    make_cache(tmp_path).put_many(["a"], [vector(1)])
+    with open(tmp_path / "org__model" / "index.log", "a", encoding="utf-8") as f:
+        f.write("P half")
+
+    cache = make_cache(tmp_path)
+    cache.put_many(["b"], [vector(2)])
+    assert sorted(make_cache(tmp_path).get_many(["a", "b"])) == [0, 1]
+
+
+def test_cached_embeddings_only_embed_misses(tmp_path):
+    model = CountingEmbeddings(size=DIM)
+    embeddings = CachedEmbeddings(model, make_cache(tmp_path))
+
+    first = embeddings.embed_documents(["one", "two", "one"])
+    assert model.calls == 2
+    second = embeddings.embed_documents(["one", "three"])
+    assert model.calls == 3
+    np.testing.assert_allclose(second[0], first[0], atol=1e-2)
+    assert len(embeddings.cache) == 3
+    assert text_hash("one") in embeddings.cache._entries
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from src.embedding_scheduler import MicroBatchEmbeddings
+
+
+class RecordingEmbeddings(Embeddings):
+    """Embeds a text as [len(text)] and records every forward pass."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.started = threading.Event()
+
+    def embed_documents(self, texts):
+        self.started.set()
+        time.sleep(self.delay)
+        self.calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_concurrent_queries_share_one_forward_pass():
+    model = RecordingEmbeddings()
+    scheduler = MicroBatchEmbeddings(model, max_batch_size=8, max_wait_ms=200)
+    results = {}
+
+    def ask(text):
+        results[text] = scheduler.embed_query(text)
+
+    threads = [threading.Thread(target=ask, args=("q" * n,)) for n in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    scheduler.close()
+
+    assert results == {"q" * n: [float(n)] for n in range(1, 9)}
+    assert len(model.calls) == 1 and sorted(model.calls[0]) == sorted(results)
+
+
+def test_documents_are_split_into_batches_in_order():
+    model = RecordingEmbeddings()
+    scheduler = MicroBatchEmbeddings(model, max_batch_size=3, max_wait_ms=1)
+    texts = ["a" * n for n in range(1, 8)]
+    assert scheduler.embed_documents(texts) == [[float(n)] for n in range(1, 8)]
+    scheduler.close()
+    assert [len(call) for call in model.calls] == [3, 3, 1]
+
+
+def test_queries_jump_ahead_of_queued_ingestion():
+    model = RecordingEmbeddings(delay=0.05)
+    scheduler = MicroBatchEmbeddings(model, max_batch_size=2, max_wait_ms=0)
+    ingest = threading.Thread(target=scheduler.embed_documents, args=([f"doc{i}" for i in range(6)],))
+    ingest.start()
+    model.started.wait()
+    scheduler.embed_query("question")
+    ingest.join()
+    scheduler.close()
+
+    query_batch = next(i for i, call in enumerate(model.calls) if "question" in call)
+    assert query_batch == 1
+    assert scheduler.stats()["query_texts"] == 1
+
+
+def test_model_errors_reach_every_caller():
+    class Broken(Embeddings):
+        def embed_documents(self, texts):
+            raise ValueError("model failed")
+
+        def embed_query(self, text):
+            raise ValueError("model failed")
+
+    scheduler = MicroBatchEmbeddings(Broken(), max_wait_ms=1)
+    with pytest.raises(ValueError):
+        scheduler.embed_query("q")
+    scheduler.close()
+    with pytest.raises(RuntimeError):
+        scheduler.embed_query("q")
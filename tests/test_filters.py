@@ -0,0 +1,30 @@
+from src.filters import SearchFilter
+
+
+def test_empty_filter_matches_everything_and_is_falsy():
+    assert not SearchFilter()
+    assert not SearchFilter(document_ids=[], pages=[])
+    assert SearchFilter().matches({})
+    assert SearchFilter(pages=[0])
+
+
+def test_conditions_must_all_hold():
+    query_filter = SearchFilter(document_ids=["a.pdf", "b.pdf"], pages=[1, 3], ingested_after=10, ingested_before=20)
+    assert query_filter.matches({"document_id": "b.pdf", "page": 3, "ingested_at": 10.0})
+    assert not query_filter.matches({"document_id": "c.pdf", "page": 3, "ingested_at": 15.0})
+    assert not query_filter.matches({"document_id": "a.pdf", "page": 2, "ingested_at": 15.0})
+    assert not query_filter.matches({"document_id": "a.pdf", "page": 1, "ingested_at": 20.0})
+    # Chunks stored before ingest times were recorded match no time condition
+    assert not query_filter.matches({"document_id": "a.pdf", "page": 1})
+
+
+def test_equal_filters_share_a_key_and_translate_to_qdrant():
+    first = SearchFilter(document_ids=["b.pdf", "a.pdf", "a.pdf"], ingested_before=5)
+    second = SearchFilter(document_ids=["a.pdf", "b.pdf"], ingested_before=5.0)
+    assert first.key() == second.key()
+    assert first.key() != SearchFilter(document_ids=["a.pdf"]).key()
+
+    conditions = first.to_qdrant().must
+    assert [condition.key for condition in conditions] == ["metadata.document_id", "metadata.ingested_at"]
+    assert conditions[0].match.any == ["a.pdf", "b.pdf"]
+    assert (conditions[1].range.gte, conditions[1].range.lt) == (None, 5.0)
@@ -0,0 +1,30 @@
+from src.ingest_checkpoint import IngestCheckpoint, file_digest
+
+
+def test_done_files_are_skipped_only_at_the_same_digest(tmp_path):
+    path = str(tmp_path / "checkpoint.sqlite3")
+    checkpoint = IngestCheckpoint(path)
+    checkpoint.mark_done("a.pdf", "hash-1", pages=3, upserted=10, skipped=0, deleted=0)
+    checkpoint.mark_failed("b.pdf", "hash-2", "invalid pdf")
+    assert checkpoint.is_done("a.pdf", "hash-1")
+    assert not checkpoint.is_done("a.pdf", "hash-changed")
+    assert not checkpoint.is_done("b.pdf", "hash-2")
+    assert not checkpoint.is_done("c.pdf", "hash-3")
+    checkpoint.close()
+
+    # The record survives the process and a retry replaces the failure
+    reopened = IngestCheckpoint(path)
+    assert reopened.is_done("a.pdf", "hash-1")
+    assert reopened.failures() == [("b.pdf", "invalid pdf")]
+    reopened.mark_done("b.pdf", "hash-2", pages=1, upserted=2, skipped=0, deleted=0)
+    assert reopened.status_counts() == {"done": 2}
+    reopened.close()
+
+
+def test_file_digest_reads_in_blocks(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"x" * 10_000)
+    before = file_digest(str(path), block_size=1000)
+    assert before == file_digest(str(path))
+    path.write_bytes(b"x" * 9_999 + b"y")
+    assert file_digest(str(path)) == file_digest(str(path), block_size=7) != before
@@ -0,0 +1,86 @@
+import threading
+import time
+import pytest
+from src.jobs import JobQueue, QueueFullError
+
+
+def wait_for(queue, job_id, status, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}: {queue.get(job_id)}")
+
+
+def blocking_job(release, progress=None):
+    release.wait(5)
+    return "done"
+
+
+def test_progress_and_result():
+    queue = JobQueue(max_workers=1, max_pending=1)
+
+    def work(progress=None):
+        progress.update(pages_parsed=3)
+        progress.update(chunks_embedded=5)
+        progress.update(points_upserted=5)
+        return {"chunks": 5}
+
+    job = wait_for(queue, queue.submit("work", work), "succeeded")
+    assert (job["pages_parsed"], job["chunks_embedded"], job["points_upserted"]) == (3, 5, 5)
+    assert job["result"] == {"chunks": 5}
+    assert job["started_at"] <= job["finished_at"]
+    queue.shutdown()
+
+
+def test_failure_is_reported_and_cleanup_runs():
+    queue = JobQueue(max_workers=1, max_pending=1)
+    cleaned = []
+
+    def work(progress=None):
+        raise RuntimeError("bad pdf")
+
+    job = wait_for(queue, queue.submit("work", work, cleanup=lambda: cleaned.append(True)), "failed")
+    assert job["error"] == "bad pdf"
+    assert cleaned == [True]
+    queue.shutdown()
+
+
+def test_queue_full_raises_and_frees_capacity():
+    queue = JobQueue(max_workers=1, max_pending=1)
+    release = threading.Event()
+    first = queue.submit("running", blocking_job, release)
+    queue.submit("queued", blocking_job, release)
+
+    with pytest.raises(QueueFullError):
+        queue.submit("rejected", blocking_job, release)
+
+    release.set()
+    wait_for(queue, first, "succeeded")
+    queue.shutdown()
+
+
+def test_unknown_job():
+    queue = JobQueue()
+    assert queue.get("missing") is None
+    queue.shutdown()
+
+
+def test_shutdown_fails_queued_jobs_and_cleans_up():
+    queue = JobQueue(max_workers=1, max_pending=2)
+    release = threading.Event()
+    cleaned = []
+    running = queue.submit("running", blocking_job, release, cleanup=lambda: cleaned.append("running"))
+    wait_for(queue, running, "running")
+    queued = queue.submit("queued", blocking_job, release, cleanup=lambda: cleaned.append("queued"))
+
+    threading.Timer(0.1, release.set).start()
+    queue.shutdown()
+
+    assert queue.get(running)["status"] == "succeeded"
+    job = queue.get(queued)
+    assert job["status"] == "failed"
+    assert "Cancelled" in job["error"]
+    assert sorted(cleaned) == ["queued", "running"]
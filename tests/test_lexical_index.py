@@ -0,0 +1,93 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from src.filters import SearchFilter
+from src.hybrid import fuse_results, reciprocal_rank_fusion
+from src.lexical_index import BM25Index, sync_lexical_index, tokenize
+from src.local_store import LocalVectorStore
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("See Clause 4.2.1 and part AB-123.") == [
+        "see", "clause", "4.2.1", "4", "2", "1", "and", "part", "ab-123", "ab", "123",
+    ]
+
+
+def test_exact_identifier_ranks_first(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.add(["a", "b", "c"], [
+        "The warranty terms are described in clause 4.2.",
+        "Clause 7.1 covers termination of the agreement.",
+        "Payment is due within thirty days.",
+    ])
+    results = index.search("what does clause 7.1 say", k=3)
+    assert results[0][0] == "b"
+    assert {point_id for point_id, _ in results} == {"a", "b"}
+
+
+def test_updates_and_deletes_are_incremental_and_persisted(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.add(["a", "b"], ["alpha beta", "gamma delta"])
+    index.add(["a"], ["epsilon"])
+    index.delete(["b"])
+    assert index.search("alpha", k=5) == []
+    assert index.search("gamma", k=5) == []
+
+    reopened = BM25Index(str(tmp_path))
+    assert len(reopened) == 1
+    assert reopened.search("epsilon", k=5)[0][0] == "a"
+    assert reopened.present_ids(["a", "b"]) == {"a"}
+
+
+def test_compaction_and_drop(tmp_path):
+    index = BM25Index(str(tmp_path))
+    ids = [f"p{i}" for i in range(1500)]
+    index.add(ids, [f"chunk number {i} text" for i in range(1500)])
+    index.delete(ids[:1300])
+    assert len(index._ids) == 200
+    assert index.search("1400", k=1)[0][0] == "p1400"
+    index.drop()
+    assert len(index) == 0 and index.search("chunk", k=1) == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d", "a"]])
+    assert [item for item, _ in fused][:2] == ["a", "c"]
+
+
+def test_fuse_results_fetches_lexical_only_hits():
+    class Store:
+        def get(self, ids):
+            return [Document(id=point_id, page_content=f"fetched {point_id}") for point_id in ids if point_id != "gone"]
+
+    dense = [(Document(id="a", page_content="a"), 0.9), (Document(id="b", page_content="b"), 0.8)]
+    lexical = [("x", 7.0), ("a", 3.0), ("gone", 1.0)]
+    docs = fuse_results(dense, lexical, Store(), k=4)
+    assert [doc.id for doc in docs] == ["a", "x", "b"]
+    assert docs[1].page_content == "fetched x"
+
+
+def test_fuse_results_drops_lexical_hits_outside_the_filter():
+    class Store:
+        def get(self, ids):
+            return [Document(id=point_id, page_content=point_id, metadata={"document_id": f"{point_id}.pdf"})
+                    for point_id in ids]
+
+    dense = [(Document(id="a", page_content="a", metadata={"document_id": "a.pdf"}), 0.9)]
+    lexical = [("x", 7.0), ("y", 5.0), ("a", 3.0)]
+    docs = fuse_results(dense, lexical, Store(), k=2, query_filter=SearchFilter(document_ids=["a.pdf", "y.pdf"]))
+    assert [doc.id for doc in docs] == ["a", "y"]
+
+
+def test_sync_rebuilds_a_missing_index_from_the_vector_store(tmp_path):
+    store = LocalVectorStore(str(tmp_path / "store"))
+    texts = ["alpha clause", "beta clause", "gamma clause"]
+    store.upsert(["a", "b", "c"], np.eye(3, dtype=np.float32),
+                 [{"page_content": text, "metadata": {}} for text in texts])
+    index = BM25Index(str(tmp_path / "index"))
+    index.add(["gone"], ["alpha leftover"])
+
+    assert sync_lexical_index(index, store, batch_size=2) == {"added": 3, "deleted": 1}
+    assert index.ids() == {"a", "b", "c"}
+    assert index.search("beta", k=3)[0][0] == "b"
+    assert sync_lexical_index(index, store) == {"added": 0, "deleted": 0}
@@ -0,0 +1,158 @@
+import numpy as np
+
+from src.filters import SearchFilter
+from src.local_store import GraphIndex, LocalVectorStore
+
+
+def payload(text, document_id="doc.pdf"):
+    return {"page_content": text, "metadata": {"document_id": document_id}}
+
+
+def unit_vectors(count, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_exact_search_returns_nearest_first(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    assert not store.exists()
+    vectors = unit_vectors(50)
+    store.upsert([f"p{i}" for i in range(50)], vectors, [payload(f"text {i}") for i in range(50)])
+
+    results = store.search(vectors[7], k=3)
+    assert store.exists()
+    assert results[0][0].page_content == "text 7"
+    assert results[0][1] > results[1][1] >= results[2][1]
+
+
+def test_store_reloads_from_disk_and_tracks_documents(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    vectors = unit_vectors(4)
+    store.upsert(["a", "b", "c"], vectors[:3], [payload("a"), payload("b"), payload("c", "other.pdf")])
+    store.upsert(["b"], vectors[3:], [payload("b2")])
+    store.delete(["a"])
+
+    reopened = LocalVectorStore(str(tmp_path))
+    assert len(reopened) == 2
+    assert reopened.document_point_ids("doc.pdf") == {"b"}
+    assert reopened.present_ids(["a", "b", "c"]) == {"b", "c"}
+    assert reopened.search(vectors[3], k=1)[0][0].page_content == "b2"
+
+
+def test_writes_from_another_instance_are_visible(tmp_path):
+    first = LocalVectorStore(str(tmp_path))
+    second = LocalVectorStore(str(tmp_path))
+    vectors = unit_vectors(2)
+    first.upsert(["a"], vectors[:1], [payload("a")])
+    second.upsert(["b"], vectors[1:], [payload("b")])
+    assert first.present_ids(["a", "b"]) == {"a", "b"}
+    assert [doc.page_content for doc, _ in first.search(vectors[1], k=2)][0] == "b"
+
+
+def test_compaction_keeps_live_points(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    vectors = unit_vectors(1500)
+    ids = [f"p{i}" for i in range(1500)]
+    store.upsert(ids, vectors, [payload(f"text {i}") for i in range(1500)])
+    store.delete(ids[:1200])
+
+    assert store.vectors_name == "vectors.1.f32"
+    assert len(store) == 300
+    assert store.search(vectors[1400], k=1)[0][0].page_content == "text 1400"
+    assert LocalVectorStore(str(tmp_path)).search(vectors[1300], k=1)[0][0].page_content == "text 1300"
+
+
+def test_drop_removes_the_collection(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    store.upsert(["a"], unit_vectors(1), [payload("a")])
+    assert store.drop() is True
+    assert not store.exists() and store.search(unit_vectors(1)[0], k=1) == []
+    assert store.drop() is False
+
+
+def test_graph_index_recall():
+    vectors = unit_vectors(1000, dim=32, seed=1)
+    queries = unit_vectors(50, dim=32, seed=2)
+    graph = GraphIndex(degree=16)
+    graph.add(vectors, len(vectors))
+
+    recall = []
+    for query in queries:
+        exact = set(np.argsort(-(vectors @ query))[:10].tolist())
+        rows, _ = graph.search(vectors, query, k=10, ef=64)
+        recall.append(len(exact & set(rows[:10].tolist())) / 10)
+    assert np.mean(recall) >= 0.9
+
+
+def test_store_uses_persisted_graph_above_threshold(tmp_path):
+    store = LocalVectorStore(str(tmp_path), graph_threshold=100)
+    vectors = unit_vectors(300)
+    store.upsert([f"p{i}" for i in range(300)], vectors, [payload(f"text {i}") for i in range(300)])
+    store.wait_for_graph()
+    assert (tmp_path / "graph.vectors.0.f32.npy").exists()
+    assert store.search(vectors[42], k=5)[0][0].page_content == "text 42"
+
+    reopened = LocalVectorStore(str(tmp_path), graph_threshold=100)
+    assert reopened.search(vectors[7], k=1)[0][0].page_content == "text 7"
+    assert reopened._graph.size == 300
+    store.close()
+
+
+def test_search_does_not_wait_for_the_graph(tmp_path):
+    store = LocalVectorStore(str(tmp_path), graph_threshold=100)
+    vectors = unit_vectors(300)
+    store._start_graph_build = lambda: None
+    store.upsert([f"p{i}" for i in range(300)], vectors, [payload(f"text {i}") for i in range(300)])
+    # Until the graph covers them, rows are searched exactly
+    assert [doc.id for doc, _ in store.search(vectors[42], k=5)] == \
+        [doc.id for doc, _ in store.search(vectors[42], k=5, exact=True)]
+    assert store._graph.size == 0
+
+
+def test_search_batch_matches_single_searches(tmp_path):
+    store = LocalVectorStore(str(tmp_path))
+    vectors = unit_vectors(200)
+    store.upsert([f"p{i}" for i in range(200)], vectors, [payload(f"text {i}") for i in range(200)])
+    store.delete(["p3"])
+    queries = unit_vectors(70, seed=5)
+
+    batched = store.search_batch(queries, k=4)
+    assert len(batched) == 70
+    for query, results in zip(queries, batched):
+        expected = store.search(query, k=4)
+        assert [doc.id for doc, _ in results] == [doc.id for doc, _ in expected]
+        assert np.allclose([s for _, s in results], [s for _, s in expected], atol=1e-5)
+    assert all("p3" not in [doc.id for doc, _ in results] for results in store.search_batch(vectors[3:4], k=5))
+    assert store.search_batch([], k=4) == []
+
+
+def test_filtered_search_scores_only_matching_rows(tmp_path):
+    vectors = unit_vectors(120)
+    payloads = [{"page_content": f"text {i}", "metadata": {
+        "document_id": f"doc{i % 4}.pdf", "source": f"doc{i % 4}.pdf", "page": i % 6, "ingested_at": 100.0 + i,
+    }} for i in range(120)]
+    ids = [f"p{i}" for i in range(120)]
+    exact = LocalVectorStore(str(tmp_path / "exact"))
+    graph = LocalVectorStore(str(tmp_path / "graph"), graph_threshold=10)
+    for store in (exact, graph):
+        store.upsert(ids, vectors, payloads)
+    # Replaced and deleted points leave the payload index
+    exact.upsert(["p1"], vectors[1:2], [{"page_content": "moved", "metadata": {"document_id": "doc2.pdf"}}])
+    exact.delete(["p5"])
+
+    query_filter = SearchFilter(document_ids=["doc1.pdf"], ingested_before=200.0)
+    matching = [i for i in range(100) if i % 4 == 1 and i not in (1, 5)]
+    hits = exact.search(vectors[9], k=len(matching) + 5, query_filter=query_filter)
+    assert sorted(int(doc.id[1:]) for doc, _ in hits) == matching
+    assert hits[0][0].id == "p9"
+
+    reopened = LocalVectorStore(str(tmp_path / "exact"))
+    assert [doc.id for doc, _ in reopened.search(vectors[9], k=3, query_filter=query_filter)] == \
+        [doc.id for doc, _ in hits[:3]]
+    assert reopened.search_batch(vectors[9:10], k=3, query_filter=query_filter)[0] == \
+        reopened.search(vectors[9], k=3, query_filter=query_filter)
+
+    pages = SearchFilter(pages=[2], sources=["doc2.pdf", "doc0.pdf"])
+    expected = [doc.id for doc, _ in exact.search(vectors[20], k=5, exact=True, query_filter=pages)]
+    assert [doc.id for doc, _ in graph.search(vectors[20], k=5, query_filter=pages)] == expected
+    assert exact.search(vectors[0], k=5, query_filter=SearchFilter(pages=[42])) == []
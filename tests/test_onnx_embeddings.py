@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from src.onnx_embeddings import length_sorted_batches, mean_pool
+
+
+def test_length_sorted_batches_cover_every_item_once():
+    lengths = [30, 5, 12, 5, 40, 7, 18]
+    batches = length_sorted_batches(lengths, 3)
+    assert sorted(i for batch in batches for i in batch) == list(range(7))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    widths = [max(lengths[i] for i in batch) for batch in batches]
+    assert widths == sorted(widths)
+    # Padding to each batch's own longest text wastes less than one global width
+    assert sum(width * len(batch) for width, batch in zip(widths, batches)) < max(lengths) * len(lengths)
+
+
+def test_mean_pool_ignores_padding():
+    rng = np.random.default_rng(0)
+    hidden = rng.standard_normal((2, 4, 3)).astype(np.float32)
+    mask = np.array([[1, 1, 1, 1], [1, 1, 0, 0]])
+    pooled = mean_pool(hidden, mask, normalize=False)
+    assert np.allclose(pooled[0], hidden[0].mean(axis=0), atol=1e-6)
+    assert np.allclose(pooled[1], hidden[1, :2].mean(axis=0), atol=1e-6)
+    assert np.allclose(np.linalg.norm(mean_pool(hidden, mask), axis=1), 1.0)
+
+
+def tiny_encoder(directory):
+    """A small randomly initialized BERT and its tokenizer, saved without network access."""
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+
+    words = ["payment", "terms", "invoice", "network", "backup", "late", "fee", "days", "the", "are", "what"]
+    vocab = directory / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words))
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(vocab))
+    torch.manual_seed(0)
+    config = transformers.BertConfig(vocab_size=len(words) + 5, hidden_size=32, num_hidden_layers=2,
+                                     num_attention_heads=2, intermediate_size=64)
+    model = transformers.BertModel(config).eval()
+    model_dir = directory / "tiny-bert"
+    model.save_pretrained(model_dir)
+    tokenizer.save_pretrained(model_dir)
+    return torch, tokenizer, model, str(model_dir)
+
+
+TEXTS = ["what are the payment terms", "late fee", "network backup days", "invoice",
+         "the payment terms are thirty days after the invoice"]
+
+
+def test_onnx_embeddings_match_pytorch(tmp_path):
+    torch, tokenizer, model, model_dir = tiny_encoder(tmp_path)
+    from src.onnx_embeddings import OnnxEmbeddings, export_onnx
+
+    with torch.no_grad():
+        encoded = tokenizer(TEXTS, padding=True, return_tensors="pt")
+        hidden = model(**encoded).last_hidden_state.numpy()
+    expected = mean_pool(hidden, encoded["attention_mask"].numpy())
+
+    directory = export_onnx(model_dir, str(tmp_path / "exports"), quantize=True)
+    for quantized, tolerance in ((False, 0.9999), (True, 0.98)):
+        embeddings = OnnxEmbeddings(directory, quantized=quantized, batch_size=2, threads=1)
+        vectors = np.asarray(embeddings.embed_documents(TEXTS))
+        cosine = (vectors * expected).sum(axis=1)
+        assert cosine.min() >= tolerance
+        # Length-sorted batching returns the embeddings in input order
+        assert np.dot(embeddings.embed_query(TEXTS[2]), vectors[2]) >= tolerance
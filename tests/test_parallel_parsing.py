@@ -0,0 +1,60 @@
+from langchain_community.document_loaders import PyPDFLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from src.parallel_parsing import parse_and_split_parallel, plan_shards, iter_parse_and_split_parallel, iter_parse_files_parallel
+
+
+def page_texts(prefix: str, count: int) -> list:
+    return [
+        "\n".join(f"{prefix} page {page} line {line} about retrieval and vector search." for line in range(30))
+        for page in range(count)
+    ]
+
+
+def serial_chunks(file_paths, chunk_size, chunk_overlap):
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+    )
+    chunks = []
+    for file_path in file_paths:
+        chunks.extend(splitter.split_documents(PyPDFLoader(file_path).load()))
+    return chunks
+
+
+def test_plan_shards_covers_every_page_in_order(make_pdf):
+    first = make_pdf("a.pdf", page_texts("a", 5))
+    second = make_pdf("b.pdf", page_texts("b", 2))
+    assert plan_shards([first, second], 2) == [
+        (first, 0, 2), (first, 2, 4), (first, 4, 5), (second, 0, 2),
+    ]
+
+
+def test_parallel_output_matches_serial_loader(make_pdf):
+    files = [make_pdf("a.pdf", page_texts("a", 7)), make_pdf("b.pdf", page_texts("b", 3))]
+    parallel = parse_and_split_parallel(files, chunk_size=300, chunk_overlap=50, workers=2, pages_per_shard=2)
+    serial = serial_chunks(files, 300, 50)
+    assert [(c.page_content, c.metadata) for c in parallel] == [(c.page_content, c.metadata) for c in serial]
+
+
+def test_page_progress_is_reported_per_shard(make_pdf):
+    path = make_pdf("a.pdf", page_texts("a", 5))
+    reported = []
+    list(iter_parse_and_split_parallel([path], 300, 50, workers=2, pages_per_shard=2, on_pages=reported.append))
+    assert reported == [2, 2, 1]
+
+
+def test_files_are_yielded_in_order_with_errors_in_place(make_pdf, tmp_path):
+    first = make_pdf("a.pdf", page_texts("a", 5))
+    broken = str(tmp_path / "broken.pdf")
+    with open(broken, "wb") as f:
+        f.write(b"not a pdf")
+    second = make_pdf("b.pdf", page_texts("b", 2))
+
+    results = list(iter_parse_files_parallel([first, broken, second], chunk_size=300, chunk_overlap=50, workers=2,
+                                             pages_per_shard=2))
+    assert [(path, pages, error is None) for path, _, pages, error in results] == [
+        (first, 5, True), (broken, 0, False), (second, 2, True),
+    ]
+    assert results[1][1] is None
+    for path, chunks, _, _ in (results[0], results[2]):
+        assert [c.page_content for c in chunks] == [c.page_content for c in serial_chunks([path], 300, 50)]
@@ -0,0 +1,56 @@
+import threading
+import time
+import pytest
+from src.pipeline import iter_batches, prefetch
+
+
+def test_iter_batches():
+    assert list(iter_batches(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(iter_batches([], 3)) == []
+
+
+def test_prefetch_preserves_order():
+    assert list(prefetch(iter(range(100)), maxsize=3)) == list(range(100))
+
+
+def test_prefetch_bounds_buffering():
+    produced = []
+
+    def source():
+        for i in range(50):
+            produced.append(i)
+            yield i
+
+    consumer = prefetch(source(), maxsize=2)
+    assert next(consumer) == 0
+    time.sleep(0.2)
+    # One item handed over, at most two buffered and one waiting to be put.
+    assert len(produced) <= 4
+    consumer.close()
+
+
+def test_prefetch_reraises_producer_errors():
+    def source():
+        yield 1
+        raise ValueError("broken page")
+
+    consumer = prefetch(source())
+    assert next(consumer) == 1
+    with pytest.raises(ValueError, match="broken page"):
+        next(consumer)
+
+
+def test_prefetch_stops_producer_when_consumer_stops():
+    stopped = threading.Event()
+
+    def source():
+        try:
+            for i in range(1000):
+                yield i
+        finally:
+            stopped.set()
+
+    consumer = prefetch(source(), maxsize=1)
+    next(consumer)
+    consumer.close()
+    assert stopped.wait(2)
@@ -0,0 +1,72 @@
+import json
+import numpy as np
+import pytest
+
+from src.projection import Projection, ProjectionStore, parse_projection, projection_report
+
+
+def low_rank_vectors(count, dim=64, rank=8, seed=0):
+    # Embeddings concentrate their variance in few directions; PCA relies on that.
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, rank)) @ rng.normal(size=(rank, dim)) + 0.05 * rng.normal(size=(count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_parse_projection():
+    assert parse_projection("none") is None
+    assert parse_projection(None) is None
+    assert parse_projection("PCA:256") == ("pca", 256)
+    assert parse_projection("truncate:64") == ("truncate", 64)
+    for spec in ("pca", "pca:0", "svd:64"):
+        with pytest.raises(ValueError):
+            parse_projection(spec)
+
+
+def test_fit_and_apply():
+    vectors = low_rank_vectors(500)
+    pca = Projection.fit("pca", 16, vectors)
+    projected = pca.apply(vectors)
+    assert projected.shape == (500, 16)
+    assert np.allclose(np.linalg.norm(projected, axis=1), 1, atol=1e-5)
+    assert pca.apply(vectors[0]).shape == (16,)
+
+    truncate = Projection.fit("truncate", 8, vectors)
+    expected = vectors[:3, :8] / np.linalg.norm(vectors[:3, :8], axis=1, keepdims=True)
+    assert np.allclose(truncate.apply(vectors[:3]), expected, atol=1e-6)
+
+    with pytest.raises(ValueError):
+        Projection.fit("pca", 64, vectors)
+    with pytest.raises(ValueError):
+        Projection.fit("pca", 16, vectors[:10])
+
+
+def test_payload_round_trip_and_cache():
+    vectors = low_rank_vectors(200)
+    projection = Projection.fit("pca", 16, vectors)
+    loaded = Projection.from_payload(json.loads(json.dumps(projection.to_payload())))
+    assert (loaded.method, loaded.dim) == ("pca", 16)
+    assert np.allclose(loaded.apply(vectors), projection.apply(vectors), atol=1e-6)
+    assert Projection.from_payload(Projection("truncate", 8).to_payload()).components is None
+
+    store, loads = ProjectionStore(), []
+
+    def load():
+        loads.append(1)
+        return loaded
+
+    assert store.get("rag_v2", load) is loaded
+    assert store.get("rag_v2", load) is loaded
+    assert len(loads) == 1
+    store.delete("rag_v2")
+    assert store.get("rag_v2", lambda: None) is None
+
+
+def test_report_recall_rises_with_dimension():
+    vectors = low_rank_vectors(1000)
+    projections = [Projection.fit("pca", dim, vectors) for dim in (2, 8, 32)]
+    report = projection_report(vectors, projections, k=10, noise=0.1)
+    assert [row["projection"] for row in report] == ["pca:2", "pca:8", "pca:32"]
+    recalls = [row["recall_at_k"] for row in report]
+    assert recalls[0] < recalls[1] <= recalls[2]
+    assert recalls[1] >= 0.8
+    assert report[1]["bytes_per_vector"] == 32 and report[1]["reduction"] == 8.0
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from src.local_store import LocalVectorStore
+from src.quantization import BinaryCodes, Int8Codes, bytes_per_vector, recall_at_k, rescored_top_k
+
+
+def unit_vectors(count, dim=64, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def clustered_vectors(count, dim=64, clusters=200, seed=0):
+    # Embeddings of real text cluster by topic; binary codes rely on that.
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, count)] + 0.5 * rng.normal(size=(count, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32), centers
+
+
+def exact_top_k(vectors, query, k):
+    return np.argsort(-(vectors @ query))[:k].tolist()
+
+
+@pytest.mark.parametrize("codes_class, minimum_recall", [(Int8Codes, 0.99), (BinaryCodes, 0.85)])
+def test_rescored_search_keeps_recall(codes_class, minimum_recall):
+    vectors, centers = clustered_vectors(2000)
+    queries = centers[:50] + 0.5 * np.random.default_rng(1).normal(size=(50, vectors.shape[1]))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    codes = codes_class(vectors.shape[1])
+    codes.add(vectors[:1000])
+    codes.add(vectors[1000:])
+
+    exact = [exact_top_k(vectors, query, 10) for query in queries]
+    found = [rescored_top_k(codes, vectors, query, 10, oversampling=4)[0].tolist() for query in queries]
+    assert recall_at_k(exact, found, 10) >= minimum_recall
+
+
+def test_rescored_search_skips_dead_rows_and_scores_exactly():
+    vectors = unit_vectors(100)
+    alive = np.ones(100, dtype=bool)
+    alive[5] = False
+    codes = Int8Codes(vectors.shape[1])
+    codes.add(vectors)
+
+    rows, similarities = rescored_top_k(codes, vectors, vectors[5], 3, oversampling=2, alive=alive)
+    assert 5 not in rows.tolist()
+    assert np.allclose(similarities, vectors[rows] @ vectors[5])
+    assert rescored_top_k(codes, vectors, vectors[0], 3, 2, alive=np.zeros(100, dtype=bool))[0].size == 0
+
+
+def test_bytes_per_vector_shrinks_4_to_32_times():
+    assert bytes_per_vector("none", 768) == 3072
+    assert 3072 / bytes_per_vector("int8", 768) > 3.9
+    assert 3072 / bytes_per_vector("binary", 768) == 32
+
+
+def test_local_store_quantized_search_matches_exact(tmp_path):
+    store = LocalVectorStore(str(tmp_path), quantization="int8", oversampling=4)
+    vectors = unit_vectors(300)
+    store.upsert([f"p{i}" for i in range(300)], vectors, [{"page_content": str(i)} for i in range(300)])
+    store.delete(["p1"])
+
+    assert store.search(vectors[1], k=1, exact=False)[0][0].id != "p1"
+    assert [doc.id for doc, _ in store.search(vectors[7], k=5)] == [doc.id for doc, _ in store.search(vectors[7], k=5, exact=True)]
+
+    store.set_quantization("binary")
+    store.upsert(["new"], unit_vectors(1, seed=9), [{"page_content": "new"}])
+    assert store.search(unit_vectors(1, seed=9)[0], k=1)[0][0].id == "new"
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import threading
+
+from benchmarks.fakes import FakeChatModel, HashingEmbeddings, install_fakes
+from src import registry
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_readiness_follows_warm_up(monkeypatch, tmp_path):
+    monkeypatch.setenv("vector_store", "local")
+    monkeypatch.setenv("local_store_dir", str(tmp_path / "vector_store"))
+    monkeypatch.setenv("embedding_cache_dir", str(tmp_path / "embedding_cache"))
+    monkeypatch.setenv("prewarm", "background")
+    monkeypatch.delenv("groq_api", raising=False)
+    registry.shutdown()
+    try:
+        state = registry.readiness()
+        assert not state["ready"] and state["status"] == "cold"
+
+        install_fakes(HashingEmbeddings(size=16), FakeChatModel(), "test")
+        assert registry.warm_up()
+        state = registry.readiness()
+        assert state["ready"] and state["status"] == "ready" and not state["degraded"]
+        assert state["warm_up_seconds"] >= 0
+        assert state["loaded"]["embeddings"] == [registry.EMBEDDING_MODEL_NAME]
+
+        monkeypatch.setenv("prewarm", "off")
+        registry.shutdown()
+        assert registry.readiness()["ready"]
+    finally:
+        registry.shutdown()
+
+
+def test_importing_the_app_loads_no_model_stack():
+    code = ("import sys, src.app; heavy = ('torch', 'transformers', 'sentence_transformers', 'langchain_groq',"
+            " 'langchain_community', 'onnxruntime'); print([name for name in heavy if name in sys.modules])")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=REPO_ROOT)
+    assert output.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_failed_warm_up_reports_ready_but_degraded(monkeypatch):
+    monkeypatch.setenv("prewarm", "background")
+    registry.shutdown()
+    monkeypatch.setattr(registry, "get_embeddings", lambda *args: 1 / 0)
+    try:
+        assert not registry.warm_up()
+        state = registry.readiness()
+        assert state["ready"] and state["degraded"] and state["status"] == "failed"
+    finally:
+        registry.shutdown()
+
+
+def test_slow_factory_does_not_block_other_entries():
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "slow"
+
+    store = {}
+    thread = threading.Thread(target=registry._get_or_create, args=(store, "slow", slow))
+    thread.start()
+    try:
+        assert started.wait(5)
+        assert registry._get_or_create(store, "fast", lambda: "fast") == "fast"
+        registry.component_stats()
+    finally:
+        release.set()
+        thread.join()
+    assert store == {"slow": "slow", "fast": "fast"}
@@ -0,0 +1,151 @@
+import pytest
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient
+
+from benchmarks.fakes import FakeChatModel, HashingEmbeddings, install_fakes
+from src import registry
+from src.preprocessing import upload_to_qdrant
+from src.filters import SearchFilter
+from src.reindex import reindex
+from src.projection import ProjectionStore
+from src.vector_store import PROJECTION_POINT_ID, QdrantStore
+from src.retrieve import answer_question, delete_document, list_documents
+
+
+@pytest.fixture
+def qdrant(monkeypatch, tmp_path):
+    """The registry on an in-memory Qdrant server, with hashing embeddings."""
+    for name in ("lexical_index", "embedding_cache", "answer_cache"):
+        monkeypatch.setenv(f"{name}_dir", str(tmp_path / name))
+    monkeypatch.setenv("vector_store", "qdrant")
+    monkeypatch.setenv("qdrant_url", "http://qdrant.test")
+    monkeypatch.setenv("qdrant_api", "key")
+    monkeypatch.setenv("qdrant_prefer_grpc", "false")
+    registry.shutdown()
+    client = QdrantClient(":memory:")
+    registry._qdrant_clients[("http://qdrant.test", "key", False)] = client
+    install_fakes(HashingEmbeddings(size=16), FakeChatModel(), "test")
+    yield client
+    registry.shutdown()
+
+
+def upload(document_id: str, texts: list):
+    chunks = [Document(page_content=text, metadata={"document_id": document_id}) for text in texts]
+    return upload_to_qdrant(chunks, None, None, document_id=document_id)
+
+
+def aliases(client) -> dict:
+    return {alias.alias_name: alias.collection_name for alias in client.get_aliases().aliases}
+
+
+def test_reindex_swaps_alias_and_collects_old_versions(qdrant):
+    upload("a.pdf", ["alpha one", "alpha two"])
+    upload("b.pdf", ["beta one"])
+    assert aliases(qdrant) == {"rag": "rag_v1"}
+    assert qdrant.get_collection("rag_v1").config.params.vectors.size == 16
+
+    summary = reindex(keep=1)
+    assert (summary["previous"], summary["version"], summary["points"]) == ("rag_v1", "rag_v2", 3)
+    assert aliases(qdrant) == {"rag": "rag_v2"}
+    assert list_documents() == ["a.pdf", "b.pdf"]
+
+    reindex(keep=0)
+    assert aliases(qdrant) == {"rag": "rag_v3"}
+    assert sorted(collection.name for collection in qdrant.get_collections().collections) == ["rag_v3"]
+
+
+def test_reindex_replaces_unversioned_collection(qdrant):
+    store = registry.get_store()
+    store.sibling("rag").ensure(16)
+    store.sibling("rag").upsert(["00000000-0000-0000-0000-000000000001"], [[1.0] * 16],
+                                [{"page_content": "legacy", "metadata": {"document_id": "old.pdf"}}])
+    store.invalidate()
+
+    assert reindex()["previous"] == "rag"
+    assert aliases(qdrant) == {"rag": "rag_v1"}
+    assert [doc.page_content for doc in store.get(["00000000-0000-0000-0000-000000000001"])] == ["legacy"]
+
+
+def test_delete_document_keeps_the_others(qdrant):
+    upload("a.pdf", ["alpha one", "alpha two"])
+    upload("b.pdf", ["beta one"])
+
+    assert delete_document("a.pdf") == 2
+    assert delete_document("a.pdf") == 0
+    assert list_documents() == ["b.pdf"]
+    assert registry.get_lexical_index().search("alpha", 5) == []
+
+
+def test_reindex_with_projection(qdrant):
+    upload("a.pdf", [f"alpha chunk {index} about topic {index % 3}" for index in range(12)])
+
+    summary = reindex(projection="pca:8")
+    assert (summary["version"], summary["dim"]) == ("rag_v2", 8)
+    assert summary["projection"]["projection"] == "pca:8"
+    assert qdrant.get_collection("rag_v2").config.params.vectors.size == 8
+    assert qdrant.retrieve("rag_v2", [PROJECTION_POINT_ID])
+
+    store = registry.get_store()
+    upload("b.pdf", ["beta chunk"])
+    assert list_documents() == ["a.pdf", "b.pdf"]
+    assert len(store.point_ids()) == 13
+    query = registry.get_cached_embeddings().embed_query("alpha chunk 3 about topic 0")
+    assert store.search(query, 1)[0][0].page_content == "alpha chunk 3 about topic 0"
+    assert PROJECTION_POINT_ID not in [doc.id for doc, _ in store.search(query, 20)]
+
+    # Another host reads the projection from the version itself
+    other = QdrantStore(qdrant, "rag", versioned=True, projections=ProjectionStore(), metadata_ttl=60)
+    assert other.projection().dim == 8
+    assert other.search(query, 1)[0][0].page_content == "alpha chunk 3 about topic 0"
+
+    reindex(projection="none", keep=1)
+    assert qdrant.get_collection("rag_v3").config.params.vectors.size == 16
+    assert store.projection() is None
+    assert len(store.point_ids()) == 13
+    # Until it notices the switch, the other host keeps searching the version its projection belongs to
+    assert other.search(query, 1)[0][0].page_content == "alpha chunk 3 about topic 0"
+    other.invalidate()
+    assert other.projection() is None
+    assert other.search(query, 1)[0][0].page_content == "alpha chunk 3 about topic 0"
+
+
+def test_filtered_question_only_searches_the_chosen_document(qdrant, monkeypatch):
+    monkeypatch.setenv("groq_api", "test")
+    upload("a.pdf", ["alpha one", "alpha two"])
+    upload("b.pdf", ["beta one", "beta two"])
+    assert all(doc.metadata["ingested_at"] > 0 for doc in registry.get_store().get(
+        sorted(registry.get_store().document_point_ids("a.pdf"))))
+
+    only_b = SearchFilter(document_ids=["b.pdf"])
+    result = answer_question("alpha one", only_b)
+    assert {source["document_id"] for source in result["sources"]} == {"b.pdf"}
+    # Filtered answers are not cached for unfiltered questions
+    assert registry.get_answer_cache().lookup_exact("alpha one") is None
+    assert "a.pdf" in {source["document_id"] for source in answer_question("alpha one")["sources"]}
+
+
+def test_sync_restores_the_lexical_index_of_a_new_replica(qdrant):
+    upload("a.pdf", ["alpha one", "alpha two"])
+    registry.get_lexical_index().drop()
+
+    assert registry.sync_lexical_index() == {"added": 2, "deleted": 0}
+    assert len(registry.get_lexical_index().search("alpha", 5)) == 2
+
+
+def test_reindex_catches_up_with_writes_during_indexing(qdrant, monkeypatch):
+    upload("a.pdf", ["alpha one", "alpha two"])
+    upload("b.pdf", ["beta one"])
+    finish_bulk_load = QdrantStore.finish_bulk_load
+
+    def write_meanwhile(self, collection_name, **kwargs):
+        finish_bulk_load(self, collection_name, **kwargs)
+        # Still served by the previous version: the alias is not switched yet
+        upload("c.pdf", ["gamma one"])
+        delete_document("a.pdf")
+
+    monkeypatch.setattr(QdrantStore, "finish_bulk_load", write_meanwhile)
+    summary = reindex(keep=0)
+    assert aliases(qdrant) == {"rag": "rag_v2"}
+    assert (summary["points"], summary["removed"]) == (2, 2)
+    assert list_documents() == ["b.pdf", "c.pdf"]
+    assert qdrant.count("rag_v2").count == 2
@@ -0,0 +1,30 @@
+from langchain_core.documents import Document
+
+from src.rerank import rerank
+
+
+class KeywordCrossEncoder:
+    """Scores a pair by how often the question's last word occurs in the chunk."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, pairs, batch_size=32):
+        self.calls += 1
+        return [text.count(question.split()[-1]) for question, text in pairs]
+
+
+def test_rerank_keeps_best_in_one_batch():
+    docs = [Document(page_content=text) for text in ["cat", "dog dog", "dog", "dog dog dog"]]
+    model = KeywordCrossEncoder()
+    kept, scores, elapsed_ms = rerank(model, "about the dog", docs, top_n=2)
+    assert [doc.page_content for doc in kept] == ["dog dog dog", "dog dog"]
+    assert scores == [3.0, 2.0]
+    assert model.calls == 1 and elapsed_ms >= 0
+
+
+def test_rerank_is_stable_and_handles_empty_input():
+    docs = [Document(page_content=text) for text in ["a", "b", "c"]]
+    kept, _, _ = rerank(KeywordCrossEncoder(), "q z", docs, top_n=5)
+    assert [doc.page_content for doc in kept] == ["a", "b", "c"]
+    assert rerank(KeywordCrossEncoder(), "q", [], top_n=3) == ([], [], 0.0)
@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+import pytest
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+from src.retry import awith_retries, backoff_delay, is_transient, with_retries
+
+FAST = {"attempts": 4, "base": 0.001, "cap": 0.002}
+
+
+def response_error(status: int) -> UnexpectedResponse:
+    return UnexpectedResponse(status, "error", b"", httpx.Headers())
+
+
+def flaky(errors: list):
+    calls = []
+
+    def call():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+    return call, calls
+
+
+def test_transient_errors_are_retried_until_success():
+    call, calls = flaky([httpx.ConnectError("refused"), response_error(503)])
+    assert with_retries(call, settings=FAST) == "ok"
+    assert len(calls) == 3
+
+
+def test_client_errors_and_exhausted_attempts_are_raised():
+    call, calls = flaky([response_error(400)])
+    with pytest.raises(UnexpectedResponse):
+        with_retries(call, settings=FAST)
+    assert len(calls) == 1
+
+    call, calls = flaky([TimeoutError()] * 5)
+    with pytest.raises(TimeoutError):
+        with_retries(call, settings=FAST)
+    assert len(calls) == 4
+
+
+def test_async_retries_and_jittered_backoff():
+    errors = [response_error(429)]
+
+    async def call():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+    assert asyncio.run(awith_retries(call, settings=FAST)) == "ok"
+
+    delays = [backoff_delay(attempt, 0.1, 1.0) for attempt in (1, 2, 3, 4, 5, 6) for _ in range(50)]
+    assert all(0 <= delay <= 1.0 for delay in delays)
+    assert len(set(delays)) > 1
+    assert is_transient(response_error(502)) and not is_transient(response_error(404))
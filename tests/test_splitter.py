@@ -0,0 +1,94 @@
+import re
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from benchmarks.corpus import synthetic_pages
+from src.splitter import EstimatedTokenizer, TextScan, TokenTextSplitter, make_text_splitter
+
+
+class CharacterTokenizer:
+    """Every non-space character is a token."""
+
+    name = "characters"
+
+    def token_starts(self, scan):
+        return np.flatnonzero([not char.isspace() for char in "\n".join(scan.texts)])
+
+
+def pages(count=20):
+    return [Document(page_content=text, metadata={"source": "a.pdf", "page": page})
+            for page, text in enumerate(synthetic_pages(count))]
+
+
+def token_count(text: str) -> int:
+    scan = TextScan([text])
+    return len(EstimatedTokenizer().token_starts(scan))
+
+
+def test_estimate_counts_words_by_six_characters_and_marks():
+    texts = ["Payment terms, internationalization!", "", "  a_b  été. 中文 x"]
+    scan = TextScan(texts)
+    starts = EstimatedTokenizer().token_starts(scan)
+    for text, offset in zip(texts, scan.offsets):
+        found = [start - offset for start in starts if offset <= start < offset + len(text)]
+        assert found == [match.start() for match in re.finditer(r"\w{1,6}|[^\w\s]", text)]
+
+
+def test_chunks_fit_cover_the_text_and_keep_metadata():
+    documents = pages()
+    chunks = TokenTextSplitter(60, 10).split_documents(documents)
+    assert all(token_count(chunk.page_content) <= 60 for chunk in chunks)
+    for document in documents:
+        own = [chunk for chunk in chunks if chunk.metadata["page"] == document.metadata["page"]]
+        assert {key: value for key, value in own[0].metadata.items() if key != "start_index"} == document.metadata
+        text = document.page_content
+        covered = np.zeros(len(text), dtype=bool)
+        for chunk in own:
+            start = chunk.metadata["start_index"]
+            assert text[start:start + len(chunk.page_content)] == chunk.page_content
+            covered[start:start + len(chunk.page_content)] = True
+        assert all(covered[index] for index, char in enumerate(text) if not char.isspace())
+        # Consecutive chunks overlap by whole lines of at most 10 tokens
+        for first, second in zip(own, own[1:]):
+            overlap = first.metadata["start_index"] + len(first.page_content) - second.metadata["start_index"]
+            assert overlap <= 0 or token_count(second.page_content[:overlap]) <= 10
+
+
+def test_batches_split_like_single_documents():
+    splitter = TokenTextSplitter(60, 10)
+    documents = pages(8)
+    single = [chunk for document in documents for chunk in splitter.split_documents([document])]
+    batched = splitter.split_documents(documents)
+    assert [(c.page_content, c.metadata) for c in batched] == [(c.page_content, c.metadata) for c in single]
+
+
+def test_long_sentences_and_words_are_cut():
+    text = "one two three four five six seven eight nine ten. " + "x" * 40
+    chunks = TokenTextSplitter(4, 0).split_documents([Document(page_content=text)])
+    assert all(token_count(chunk.page_content) <= 4 for chunk in chunks)
+    assert chunks[0].page_content == "one two three four"
+    assert "".join(chunk.page_content for chunk in chunks).replace(" ", "") == text.replace(" ", "")
+    with pytest.raises(ValueError):
+        TokenTextSplitter(10, 10)
+
+
+def test_tokenizer_is_pluggable():
+    chunks = TokenTextSplitter(30, 0, CharacterTokenizer()).split_documents(pages(2))
+    assert all(len(chunk.page_content.replace(" ", "").replace("\n", "")) <= 30 for chunk in chunks)
+
+
+def test_make_text_splitter_follows_settings(monkeypatch):
+    assert isinstance(make_text_splitter(2000, 400), RecursiveCharacterTextSplitter)
+    monkeypatch.setenv("text_splitter", "token")
+    monkeypatch.setenv("splitter_chunk_tokens", "128")
+    monkeypatch.setenv("splitter_overlap_tokens", "16")
+    monkeypatch.setenv("splitter_tokenizer", "no-such/tokenizer")
+    splitter = make_text_splitter(2000, 400)
+    assert (splitter.chunk_tokens, splitter.chunk_overlap) == (128, 16)
+    assert isinstance(splitter.tokenizer, EstimatedTokenizer)
+    monkeypatch.setenv("text_splitter", "words")
+    with pytest.raises(ValueError):
+        make_text_splitter(2000, 400)
@@ -0,0 +1,51 @@
+import logging
+
+from custom_logger import TraceIdFilter
+from src.pipeline import prefetch
+from src.telemetry import Counter, Histogram, MetricsRegistry, STAGE_SECONDS, current_trace_id, new_trace_id, span, timed_iter
+
+
+def test_metrics_render_in_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("requests_total", "Requests.", ("route",)))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0)))
+    registry.add_collector(lambda: [("entries", "gauge", "Entries.", [({"cache": "answers"}, 3)])])
+    requests.inc(route="/ask/")
+    requests.inc(2, route="/ask/")
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/ask/"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert "latency_seconds_count 2" in text
+    assert 'entries{cache="answers"} 3' in text
+
+
+def test_span_records_histogram_and_request_timings():
+    timings = {}
+    before = STAGE_SECONDS.count(stage="test_stage")
+    with span("test_stage", timings):
+        pass
+    with span("test_stage", timings):
+        pass
+    assert STAGE_SECONDS.count(stage="test_stage") == before + 2
+    assert timings["test_stage_ms"] >= 0
+
+
+def test_timed_iter_observes_once_when_exhausted():
+    before = STAGE_SECONDS.count(stage="test_producer")
+    assert list(timed_iter(range(5), "test_producer")) == [0, 1, 2, 3, 4]
+    assert STAGE_SECONDS.count(stage="test_producer") == before + 1
+
+
+def test_trace_id_reaches_log_records_and_pipeline_threads():
+    trace = new_trace_id("request-1")
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", None, None)
+    TraceIdFilter().filter(record)
+    assert record.trace_id == trace == "request-1"
+
+    assert list(prefetch(current_trace_id() for _ in range(3))) == ["request-1"] * 3
@@ -0,0 +1,107 @@
+import asyncio
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from src.filters import PAYLOAD_INDEXES, SearchFilter
+from src.vector_store import QdrantStore
+
+
+class CountingClient:
+    """Wraps a client and counts the calls made through it."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = {}
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            return attribute(*args, **kwargs)
+        call.__name__ = name
+        return call
+
+
+def vectors(count: int, dim: int = 8, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((count, dim)).astype(np.float32)
+
+
+def test_collection_metadata_is_cached_and_invalidated():
+    client = CountingClient(QdrantClient(":memory:"))
+    store = QdrantStore(client, "docs", vector_size=8)
+
+    assert not store.exists()
+    assert not store.exists()
+    assert client.calls["collection_exists"] == 1
+
+    store.ensure()
+    assert store.exists()
+    assert client.calls["collection_exists"] == 1
+    store.ensure()
+    assert client.calls["create_payload_index"] == len(PAYLOAD_INDEXES)
+    assert store.schema()["size"] == 8
+
+    assert store.drop()
+    assert not store.exists()
+    assert client.calls["collection_exists"] == 1
+
+    # Changes made by other processes are seen once the TTL expires
+    store.metadata_ttl = 0
+    store.exists()
+    assert client.calls["collection_exists"] == 2
+
+
+def test_async_search_matches_blocking_search(tmp_path):
+    path = str(tmp_path / "qdrant")
+    client = QdrantClient(path=path)
+    store = QdrantStore(client, "docs", vector_size=8)
+    store.ensure()
+    points = vectors(50)
+    store.upsert([f"00000000-0000-0000-0000-{i:012d}" for i in range(50)], points,
+                 [{"page_content": f"text {i}", "metadata": {}} for i in range(50)])
+    expected = [[doc.id for doc, _ in hits] for hits in store.search_batch(points[:3], k=5)]
+    client.close()
+
+    async def search():
+        async_client = AsyncQdrantClient(path=path)
+        async_store = QdrantStore(QdrantClient(":memory:"), "docs", vector_size=8,
+                                  async_client_factory=lambda: async_client)
+        try:
+            assert await async_store.aexists()
+            single = await async_store.asearch(points[0], k=5)
+            batch = await async_store.asearch_batch(points[:3], k=5)
+        finally:
+            await async_client.close()
+        return [doc.id for doc, _ in single], [[doc.id for doc, _ in hits] for hits in batch]
+
+    single, batch = asyncio.run(search())
+    assert single == expected[0]
+    assert batch == expected
+
+
+def test_filtered_search_only_returns_matching_points():
+    store = QdrantStore(QdrantClient(":memory:"), "docs", vector_size=8)
+    store.ensure()
+    points = vectors(60)
+    payloads = [{"page_content": f"text {i}", "metadata": {
+        "document_id": f"doc{i % 3}.pdf", "source": f"doc{i % 3}.pdf", "page": i % 5, "ingested_at": 1000.0 + i,
+    }} for i in range(60)]
+    ids = [f"00000000-0000-0000-0000-{i:012d}" for i in range(60)]
+    store.upsert(ids, points, payloads)
+
+    query_filter = SearchFilter(document_ids=["doc1.pdf"], pages=[0, 2])
+    hits = store.search(points[0], k=10, query_filter=query_filter)
+    expected = [ids[i] for i in range(60) if i % 3 == 1 and i % 5 in (0, 2)]
+    assert sorted(doc.id for doc, _ in hits) == sorted(expected)
+    assert all(query_filter.matches(doc.metadata) for doc, _ in hits)
+
+    recent = SearchFilter(ingested_after=1050.0)
+    batch = store.search_batch(points[:2], k=5, query_filter=recent)
+    assert all(doc.metadata["ingested_at"] >= 1050.0 for hits in batch for doc, _ in hits)
+    assert [len(hits) for hits in batch] == [5, 5]
+    assert store.search(points[0], k=5, query_filter=SearchFilter(document_ids=["missing.pdf"])) == []